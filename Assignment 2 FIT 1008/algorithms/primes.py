@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+# Witnesses making Miller-Rabin deterministic for every n < 3.3 * 10^24.
+WITNESSES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+def is_prime(n: int) -> bool:
+    """
+    Deterministic Miller-Rabin primality test.
+
+    :complexity: O(log(n)^3)
+    """
+    if n < 2:
+        return False
+    for p in WITNESSES:
+        if n % p == 0:
+            return n == p
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for a in WITNESSES:
+        x = pow(a, d, n)
+        if x == 1 or x == n - 1:
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+def next_prime(n: int) -> int:
+    """
+    Returns the smallest prime greater than or equal to n.
+
+    :complexity: O(log(n)^4) on average, since primes near n are O(log(n)) apart.
+    """
+    if n <= 2:
+        return 2
+    if n % 2 == 0:
+        n += 1
+    while not is_prime(n):
+        n += 2
+    return n
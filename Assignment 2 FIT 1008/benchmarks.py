@@ -0,0 +1,274 @@
+"""
+Benchmarks for the hash tables.
+
+`python benchmarks.py` runs every benchmark,
+`python benchmarks.py probing` runs just the one named.
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from data_structures.hash_table import LinearProbeTable
+from data_structures.dense_hash_table import DenseProbeTable
+from data_structures.cuckoo_hash_table import CuckooHashTable
+from data_structures.swiss_hash_table import SwissProbeTable
+from double_key_table import DoubleKeyTable
+from flat_double_key_table import FlatDoubleKeyTable
+from infinite_hash_table import InfiniteHashTable
+
+
+def workloads(n: int) -> dict[str, list[str]]:
+    """
+    Key sets shaped like the mountain names we see in practice.
+    """
+    rng = random.Random(1008)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return {
+        "default-xxxx": [f"default-{i:04x}" for i in rng.sample(range(16 ** 4), n)],
+        "north-ridge-nnnn": [f"north-ridge-{i:04}" for i in range(n)],
+        "random": list({"".join(rng.choices(letters, k=rng.randint(4, 12))) for _ in range(n)}),
+    }
+
+
+def bench_probing(n: int) -> None:
+    """
+    Probe lengths and timings for every LinearProbeTable probing strategy.
+    """
+    print(f"{'workload':<18}{'strategy':<12}{'hit avg':>9}{'hit max':>9}{'miss avg':>10}{'insert s':>10}{'lookup s':>10}")
+    for name, keys in workloads(n).items():
+        missing = [key + "~" for key in keys]
+        for probing in LinearProbeTable.PROBING_STRATEGIES:
+            table = LinearProbeTable(probing=probing)
+            start = time.perf_counter()
+            for key in keys:
+                table[key] = key
+            insert_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for key in keys:
+                table[key]
+            lookup_time = time.perf_counter() - start
+
+            hits = [table.probe_length(key) for key in keys]
+            misses = [table.probe_length(key) for key in missing]
+            print(
+                f"{name:<18}{probing:<12}"
+                f"{sum(hits) / len(hits):>9.2f}{max(hits):>9}{sum(misses) / len(misses):>10.2f}"
+                f"{insert_time:>10.3f}{lookup_time:>10.3f}"
+            )
+
+
+def bench_dense(n: int) -> None:
+    """
+    Memory and iteration cost of the dense and Swiss layouts against LinearProbeTable.
+    """
+    keys = workloads(n)["default-xxxx"]
+    print(f"{'table':<18}{'size':>9}{'KiB':>10}{'insert s':>10}{'lookup s':>10}{'keys() s':>10}")
+    for table_type in (LinearProbeTable, DenseProbeTable, SwissProbeTable):
+        tracemalloc.start()
+        start = time.perf_counter()
+        table = table_type()
+        for key in keys:
+            table[key] = None
+        insert_time = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for key in keys:
+            table[key]
+        lookup_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(20):
+            table.keys()
+        keys_time = (time.perf_counter() - start) / 20
+        print(f"{table_type.__name__:<18}{table.table_size:>9}{memory / 1024:>10.0f}{insert_time:>10.3f}{lookup_time:>10.3f}{keys_time:>10.4f}")
+
+
+def bench_stats(n: int) -> None:
+    """
+    Cost of collecting statistics, and what they show for each workload.
+    """
+    print(f"{'workload':<18}{'off s':>8}{'on s':>8}{'get mean':>10}{'get max':>9}{'cluster':>9}{'rehash s':>10}")
+    for name, keys in workloads(n).items():
+        times = []
+        for enabled in (False, True):
+            table = LinearProbeTable()
+            if enabled:
+                table.enable_stats()
+            start = time.perf_counter()
+            for key in keys:
+                table[key] = key
+            for key in keys:
+                table[key]
+            times.append(time.perf_counter() - start)
+        stats = table.stats()
+        get = stats["probes"]["get"]
+        print(
+            f"{name:<18}{times[0]:>8.3f}{times[1]:>8.3f}{get['mean']:>10.2f}{get['max']:>9}"
+            f"{stats['longest_cluster']:>9}{stats['rehash_time']:>10.3f}"
+        )
+
+
+def percentile(samples: list[float], p: float) -> float:
+    """
+    Returns the p-th percentile of some samples, by nearest rank.
+    """
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(p / 100 * len(samples)))]
+
+
+def bench_cuckoo(n: int) -> None:
+    """
+    Lookup latency percentiles of cuckoo hashing against linear probing.
+    Every lookup is timed on its own, so the tail shows long probe chains.
+    """
+    print(f"{'workload':<18}{'table':<18}{'p50 ns':>8}{'p99 ns':>8}{'max probe':>11}{'insert s':>10}")
+    for name, keys in workloads(n).items():
+        for table_type in (LinearProbeTable, CuckooHashTable):
+            table = table_type()
+            start = time.perf_counter()
+            for key in keys:
+                table[key] = key
+            insert_time = time.perf_counter() - start
+
+            timings = []
+            for key in keys:
+                start = time.perf_counter_ns()
+                table[key]
+                timings.append(time.perf_counter_ns() - start)
+            max_probe = max(table.probe_length(key) for key in keys)
+            print(
+                f"{name:<18}{table_type.__name__:<18}"
+                f"{percentile(timings, 50):>8}{percentile(timings, 99):>8}{max_probe:>11}{insert_time:>10.3f}"
+            )
+
+
+def bench_flat(n: int) -> None:
+    """
+    Memory and lookup time of DoubleKeyTable against FlatDoubleKeyTable,
+    for n pairs spread over fewer and fewer top-level keys. One internal
+    table per top-level key only pays off once each holds enough pairs.
+    """
+    print(f"{'per key':>8}  {'table':<20}{'KiB':>10}{'insert s':>10}{'lookup s':>10}{'keys(k) s':>11}")
+    for per_key in (1, 2, 4, 8, 32, 128):
+        pairs = [(f"r{i // per_key}", f"m{i}") for i in range(n)]
+        top_keys = [f"r{i}" for i in range(0, n // per_key)]
+        for table_type in (DoubleKeyTable, FlatDoubleKeyTable):
+            tracemalloc.start()
+            start = time.perf_counter()
+            table = table_type()
+            for key in pairs:
+                table[key] = None
+            insert_time = time.perf_counter() - start
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            for key in pairs:
+                table[key]
+            lookup_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for key in top_keys:
+                list(table.values(key))
+            keys_time = time.perf_counter() - start
+            print(f"{per_key:>8}  {table_type.__name__:<20}{memory / 1024:>10.0f}{insert_time:>10.3f}{lookup_time:>10.3f}{keys_time:>11.3f}")
+
+
+def bench_bloom(n: int) -> None:
+    """
+    Time to look up n keys that aren't in a table of n keys,
+    with and without a Bloom filter in front of the table.
+    """
+    print(f"{'table':<20}{'bloom':>6}{'insert s':>10}{'miss s':>10}{'fp rate':>9}")
+    # Half the misses share a top-level key (or a prefix) with a key in the table.
+    pairs = [(f"r{i % 100}", f"m{i}") for i in range(n)]
+    missing_pairs = [(f"r{i % 200}", f"x{i}") for i in range(n)]
+    keys = {
+        DoubleKeyTable: (pairs, missing_pairs),
+        InfiniteHashTable: (["".join(pair) for pair in pairs], ["".join(pair) for pair in missing_pairs]),
+    }
+    for table_type, (present, absent) in keys.items():
+        for bloom in (False, True):
+            table = table_type(bloom=bloom)
+            start = time.perf_counter()
+            for key in present:
+                table[key] = None
+            insert_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for key in absent:
+                table.get(key)
+            miss_time = time.perf_counter() - start
+            rate = table.stats()["bloom"]["false_positive_rate"] if bloom else 0.0
+            print(f"{table_type.__name__:<20}{str(bloom):>6}{insert_time:>10.3f}{miss_time:>10.3f}{rate:>9.3f}")
+
+
+def bench_trie(n: int) -> None:
+    """
+    Memory and lookup time of InfiniteHashTable with full and bitmap
+    levels, with and without path compression, for n long, similar names.
+    Also times building the same table with `from_sorted`.
+    """
+    print(f"{'levels':<8}{'paths':<12}{'KiB':>10}{'nodes':>8}{'slots':>9}{'depth':>7}{'insert s':>10}{'bulk s':>8}{'lookup s':>10}{'sort s':>8}")
+    names = [f"north-ridge-{i:04d}" for i in range(n)]
+    for bitmap, compressed in ((False, False), (True, False), (False, True), (True, True)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        table = InfiniteHashTable(bitmap=bitmap, compressed=compressed)
+        for name in names:
+            table[name] = None
+        insert_time = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for name in names:
+            table[name]
+        lookup_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        table.sort_keys()
+        sort_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        InfiniteHashTable.from_sorted(((name, None) for name in sorted(names)), bitmap=bitmap, compressed=compressed)
+        bulk_time = time.perf_counter() - start
+        stats = table.stats()
+        print(f"{'bitmap' if bitmap else 'full':<8}{'compressed' if compressed else 'per char':<12}{memory / 1024:>10.0f}{stats['nodes']:>8}{stats['slots']:>9}{stats['max_depth']:>7}{insert_time:>10.3f}{bulk_time:>8.3f}{lookup_time:>10.3f}{sort_time:>8.3f}")
+
+
+BENCHMARKS = {
+    "probing": bench_probing,
+    "dense": bench_dense,
+    "stats": bench_stats,
+    "cuckoo": bench_cuckoo,
+    "flat": bench_flat,
+    "bloom": bench_bloom,
+    "trie": bench_trie,
+}
+
+if __name__ == "__main__":
+
+    p = argparse.ArgumentParser()
+    p.add_argument(
+        "benchmark",
+        help="The benchmark to run. Leave blank for all benchmarks.",
+        choices=list(BENCHMARKS),
+        nargs="?",
+    )
+    p.add_argument(
+        "-n",
+        help="Number of keys per workload.",
+        type=int,
+        default=20000,
+    )
+    args = p.parse_args()
+
+    for name, benchmark in BENCHMARKS.items():
+        if args.benchmark in (None, name):
+            print(f"== {name} ==")
+            benchmark(args.n)
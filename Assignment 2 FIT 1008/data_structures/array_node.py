@@ -0,0 +1,34 @@
+""" Array Node
+
+Defines the `ArrayR` used for the levels of a hash trie (see
+`InfiniteHashTable`) when they are not sparse `BitmapNode`s: a fixed-size
+array of references that also keeps count of the slots in use and, in a
+path-compressed trie, the compressed path to it.
+"""
+from __future__ import annotations
+
+from typing import TypeVar
+
+from data_structures.referential_array import ArrayR
+
+T = TypeVar('T')
+
+
+class ArrayNode(ArrayR[T]):
+    """
+    An `ArrayR` level of a hash trie. The trie keeps `entries` up to date
+    as it writes to the node, so that an empty level is found in O(1).
+    """
+
+    __slots__ = ("entries", "skip")
+
+    def __init__(self, length: int) -> None:
+        """
+        :complexity: O(length) to initialise to None
+        :pre: length > 0
+        """
+        super().__init__(length)
+        # How many slots are in use.
+        self.entries = 0
+        # The compressed path to this node, in a path-compressed trie.
+        self.skip = ""
@@ -0,0 +1,83 @@
+""" Bitmap Node
+
+Defines a sparse stand-in for a fixed-size `ArrayR`, as used for the levels
+of a hash trie (see `InfiniteHashTable`). Rather than one slot per position,
+a node keeps a bitmap of the positions in use and a packed tuple holding
+just those references, in position order, as in a hash array mapped trie.
+A level shared by two keys then costs two references rather than 27.
+"""
+from __future__ import annotations
+
+from typing import Generic, Iterator, TypeVar
+
+T = TypeVar('T')
+
+
+class BitmapNode(Generic[T]):
+    """
+    Sparse array of references, indexed like an `ArrayR` of up to 64
+    positions. Positions not in use read as None, and setting a position
+    to None frees it.
+
+    Unlike `ArrayR`, iterating yields only the references in use, in
+    position order, and the length is how many there are.
+
+    Unless stated otherwise, all methods have O(1) complexity.
+    """
+
+    __slots__ = ("bitmap", "children", "skip")
+
+    def __init__(self) -> None:
+        self.bitmap = 0
+        self.children: tuple[T, ...] = ()
+        # The compressed path to this node, in a path-compressed trie.
+        self.skip = ""
+
+    def _index(self, bit: int) -> int:
+        """
+        Returns where the reference for a position's bit is, or would be, in children.
+        """
+        return (self.bitmap & (bit - 1)).bit_count()
+
+    def __getitem__(self, position: int) -> T|None:
+        bit = 1 << position
+        if not self.bitmap & bit:
+            return None
+        return self.children[self._index(bit)]
+
+    def __setitem__(self, position: int, value: T|None) -> None:
+        """
+        :complexity: O(len(self)), since children are repacked.
+        """
+        bit = 1 << position
+        index = self._index(bit)
+        children = self.children
+        if self.bitmap & bit:
+            if value is None:
+                self.bitmap &= ~bit
+                self.children = children[:index] + children[index + 1:]
+            else:
+                self.children = children[:index] + (value,) + children[index + 1:]
+        elif value is not None:
+            self.bitmap |= bit
+            self.children = children[:index] + (value,) + children[index:]
+
+    def __len__(self) -> int:
+        return len(self.children)
+
+    def __iter__(self) -> Iterator[T]:
+        """
+        :complexity: O(len(self)) to iterate fully.
+        """
+        return iter(self.children)
+
+    def fill(self, entries: list[tuple[int, T]]) -> None:
+        """
+        Sets every (position, reference) of an empty node at once, packing
+        them once rather than per reference. Positions must be increasing.
+
+        :complexity: O(len(entries))
+        """
+        for position, _ in entries:
+            self.bitmap |= 1 << position
+        self.children = tuple(child for _, child in entries)
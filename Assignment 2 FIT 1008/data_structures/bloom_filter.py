@@ -0,0 +1,158 @@
+""" Counting Bloom Filter
+
+Defines a counting Bloom filter that tables keep in front of their arrays,
+so that most lookups of keys that aren't in the table are rejected without
+probing. Each key increments several counters rather than setting bits,
+so keys can be removed again by decrementing them.
+
+Keys are hashed with Python's built-in `hash`. The filter only ever lives
+in memory alongside its table, so hashes never need to be stable across runs.
+"""
+from __future__ import annotations
+
+from copy import copy
+from math import ceil, log
+from typing import Hashable, Iterable
+
+from algorithms.primes import next_prime
+
+
+class CountingBloomFilter:
+    """
+    Counting Bloom filter sized for a number of keys and a target
+    false-positive rate.
+
+    `might_contain` never answers False for a key that was added and not
+    since removed. It answers True for a key that wasn't added with
+    probability about error_rate, as long as no more than capacity keys
+    are in the filter; tables rebuild their filter larger before then.
+
+    Unless stated otherwise, all methods have O(hash_count) complexity.
+    """
+
+    # Counters are single bytes. A saturated counter is never decremented
+    # again, since it no longer knows how many keys it counts.
+    MAX_COUNT = 255
+
+    # 2^64 / golden ratio, spreading built-in hashes (which are the
+    # identity on small integers) over the whole 64 bits.
+    MULTIPLIER = 0x9E3779B97F4A7C15
+    MASK = (1 << 64) - 1
+
+    def __init__(self, capacity: int, error_rate: float=0.01) -> None:
+        """
+        :param capacity: How many keys the filter is sized for.
+        :param error_rate: False-positive rate at capacity.
+        :complexity: O(size) where size is about 9.6 counters per key at a 1% error rate.
+        """
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        # A prime number of counters, so that every step of the double
+        # hashing in _positions visits hash_count different counters.
+        size = next_prime(ceil(-self.capacity * log(error_rate) / log(2) ** 2))
+        self.hash_count = max(1, round(size / self.capacity * log(2)))
+        self.counters = bytearray(size)
+        self.count = 0
+        # Lookups checked, lookups rejected, and lookups let through that
+        # the table then missed (reported by the table).
+        self.checks = 0
+        self.rejections = 0
+        self.false_positives = 0
+
+    def _positions(self, key: Hashable) -> list[int]:
+        """
+        Returns the counters for a key, by double hashing one built-in hash.
+        """
+        mixed = (hash(key) * self.MULTIPLIER) & self.MASK
+        size = len(self.counters)
+        first = mixed % size
+        step = 1 + (mixed >> 32) % (size - 1)
+        return [(first + i * step) % size for i in range(self.hash_count)]
+
+    def add(self, key: Hashable) -> None:
+        """
+        Adds a key, which must not already be in the table.
+        """
+        counters = self.counters
+        for position in self._positions(key):
+            if counters[position] < self.MAX_COUNT:
+                counters[position] += 1
+        self.count += 1
+
+    def remove(self, key: Hashable) -> None:
+        """
+        Removes a key that was added.
+        """
+        counters = self.counters
+        for position in self._positions(key):
+            if counters[position] < self.MAX_COUNT:
+                counters[position] -= 1
+        self.count -= 1
+
+    def might_contain(self, key: Hashable) -> bool:
+        """
+        Returns False if the key is certainly not in the table, and True if it may be.
+        """
+        self.checks += 1
+        counters = self.counters
+        for position in self._positions(key):
+            if not counters[position]:
+                self.rejections += 1
+                return False
+        return True
+
+    def is_full(self) -> bool:
+        """
+        Whether the filter holds more keys than it was sized for.
+        """
+        return self.count > self.capacity
+
+    def resized(self, capacity: int, keys: Iterable[Hashable]) -> CountingBloomFilter:
+        """
+        Returns a filter sized for a new capacity holding the given keys
+        (every key in the table), carrying over how many lookups were checked.
+
+        :complexity: O(size + N*hash_count) where N is the number of keys.
+        """
+        bloom = CountingBloomFilter(capacity, self.error_rate)
+        for key in keys:
+            bloom.add(key)
+        bloom.checks = self.checks
+        bloom.rejections = self.rejections
+        bloom.false_positives = self.false_positives
+        return bloom
+
+    def view(self) -> CountingBloomFilter:
+        """
+        Returns a filter sharing these counters but counting lookups separately,
+        for a snapshot of the table. Neither may add or remove keys until
+        the table has copied its counters, see `copy_counters`.
+        """
+        view = copy(self)
+        view.checks = view.rejections = view.false_positives = 0
+        return view
+
+    def copy_counters(self) -> None:
+        """
+        Gives the filter its own copy of its counters.
+
+        :complexity: O(size)
+        """
+        self.counters = bytearray(self.counters)
+
+    def as_dict(self) -> dict:
+        """
+        Returns the filter's size and how well it has worked so far.
+        The false-positive rate is over lookups of keys not in the table.
+        """
+        misses = self.rejections + self.false_positives
+        return {
+            "capacity": self.capacity,
+            "size": len(self.counters),
+            "hash_count": self.hash_count,
+            "count": self.count,
+            "checks": self.checks,
+            "rejections": self.rejections,
+            "false_positives": self.false_positives,
+            "false_positive_rate": self.false_positives / misses if misses else 0.0,
+        }
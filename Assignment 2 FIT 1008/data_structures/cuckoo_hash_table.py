@@ -0,0 +1,244 @@
+""" Cuckoo Hash Table
+
+Defines a Hash Table with the same interface as LinearProbeTable, where
+every key can only ever live in one of two slots, or in a small stash.
+Lookups inspect at most 2 + STASH_SIZE slots, however full the table is.
+"""
+from __future__ import annotations
+
+from typing import TypeVar
+
+from data_structures.referential_array import ArrayR
+from data_structures.hash_table import LinearProbeTable, FullError
+
+K = TypeVar('K')
+V = TypeVar('V')
+
+
+class CuckooHashTable(LinearProbeTable[K, V]):
+    """
+    Cuckoo Hash Table.
+
+    A key's two slots come from the same size-independent hash as
+    LinearProbeTable: the first is `hash(key)`, the second is derived from
+    the higher digits of hash_key(key) and always differs from the first.
+    Inserting into two full slots evicts one occupant to its other slot,
+    and so on, up to MAX_KICKS times; whatever is left over goes into the
+    stash, and the table grows once the stash is full too. A table that
+    can't grow any further is full at that point.
+
+    Positions returned by `_linear_probe` below table_size are slots in
+    the array, the rest are slots in the stash.
+
+    Type Arguments:
+        - K:    Key Type. In most cases should be string.
+                Otherwise `hash` should be overwritten.
+        - V:    Value Type.
+
+    Unless stated otherwise, all methods have O(1) complexity.
+    """
+
+    STASH_SIZE = 4
+    # Evictions tried before an insert falls back on the stash.
+    MAX_KICKS = 32
+
+    def __init__(self, sizes=None, tombstones: bool=False, probing: str="linear", incremental: bool=False) -> None:
+        """
+        Initialise the Hash Table.
+
+        :param tombstones: Ignored, there are no probe chains to keep intact.
+        :param probing: Ignored, every key has exactly two slots.
+        :param incremental: Not supported, since an insert may need to move
+            entries anywhere in the array.
+        :raises ValueError: for an unknown strategy or incremental resizing.
+        """
+        if probing not in self.PROBING_STRATEGIES:
+            raise ValueError(f"Unknown probing strategy {probing!r}.")
+        if incremental:
+            raise ValueError("Cuckoo tables do not resize incrementally.")
+        super().__init__(sizes)
+        self.stash:ArrayR[tuple[K, V, int|None]] = ArrayR(self.STASH_SIZE)
+
+    def _homes(self, key: K, key_hash: int|None, size: int) -> tuple[int, int]:
+        """
+        Returns the two slots a key may live in, in an array of the given size.
+        A key_hash of None is only valid for the current array.
+        """
+        first = self._home(key, key_hash, size)
+        if key_hash is None:
+            key_hash = self.hash_key(key)
+        return first, (first + 1 + (key_hash // size) % max(size - 1, 1)) % size
+
+    def _slot(self, position: int) -> tuple[K, V, int|None]|None:
+        """
+        Returns the entry at a position in the array or the stash.
+        """
+        if position < self.table_size:
+            return self.array[position]
+        return self.stash[position - self.table_size]
+
+    def _set_slot(self, position: int, item: tuple[K, V, int|None]|None) -> None:
+        if position < self.table_size:
+            self.array[position] = item
+        else:
+            self.stash[position - self.table_size] = item
+
+    def _search(self, key: K, key_hash: int|None, is_insert: bool, array: ArrayR|None=None) -> int|None:
+        """
+        Looks for a key in its two slots, then in the stash.
+        An insert of a new key returns its first slot, though `_store`
+        may place it anywhere.
+
+        :complexity: O(STASH_SIZE*comp(K))
+        """
+        size = self.table_size
+        for position in self._homes(key, key_hash, size):
+            item = self.array[position]
+            if item is not None and item[0] == key:
+                return position
+        for x in range(len(self.stash)):
+            item = self.stash[x]
+            if item is not None and item[0] == key:
+                return size + x
+        if is_insert:
+            return self._home(key, key_hash, size)
+        return None
+
+    def _holds(self, position: int, key: K) -> bool:
+        item = self._slot(position)
+        return item is not None and item[0] == key
+
+    def _value(self, position: int) -> V:
+        return self._slot(position)[1]
+
+    def _store(self, position: int, key: K, data: V, key_hash: int|None) -> None:
+        """
+        Updates the key at the position returned by an inserting probe,
+        or inserts it as a new entry, growing the table if it can't be placed.
+
+        :complexity best: O(1) one of the key's slots is empty.
+        :complexity worst: O(N) the table has to grow, where N is len(self).
+        :raises FullError: When the key can't be placed and the table can't grow.
+        """
+        if self._holds(position, key):
+            self._set_slot(position, (key, data, key_hash))
+            return
+        evicted = []
+        homeless = self._insert((key, data, key_hash), evicted)
+        size = None if homeless is None else self._size_at(self.size_index + 1)
+        if size is not None:
+            start = self._rehash_started()
+            self.size_index += 1
+            try:
+                self._rebuild(size, [homeless])
+                homeless = None
+            except FullError:
+                self.size_index -= 1
+            self._rehash_finished(start)
+        if homeless is not None:
+            # Undo the evictions, leaving the table as it was.
+            for position in reversed(evicted):
+                homeless, self.array[position] = self.array[position], homeless
+            raise FullError("Table is full!")
+        self.count += 1
+
+    def _insert(self, item: tuple[K, V, int|None], evicted: list[int]|None=None) -> tuple[K, V, int|None]|None:
+        """
+        Places a new entry, evicting entries to their other slot as needed.
+        Returns whichever entry is left without a slot if both MAX_KICKS
+        and the stash run out, or None if every entry was placed.
+        The positions written to are appended to evicted, if given, so
+        that the insert can be undone.
+
+        :complexity: O(MAX_KICKS + STASH_SIZE)
+        """
+        size = self.table_size
+        first, second = self._homes(item[0], item[2], size)
+        position = second if self.array[first] is not None and self.array[second] is None else first
+        for _ in range(self.MAX_KICKS):
+            if evicted is not None:
+                evicted.append(position)
+            item, self.array[position] = self.array[position], item
+            if item is None:
+                return None
+            first, second = self._homes(item[0], item[2], size)
+            position = second if position == first else first
+        for x in range(len(self.stash)):
+            if self.stash[x] is None:
+                self.stash[x] = item
+                return None
+        return item
+
+    def _remove(self, position: int) -> None:
+        """
+        Deletes the entry at a position holding a key. Nothing else moves.
+        """
+        self._set_slot(position, None)
+        self.count -= 1
+
+    def _probe_length(self, key: K, key_hash: int|None) -> int:
+        """
+        probe_length for a key whose hash has already been computed:
+        1 or 2 for keys in the array, otherwise 2 plus the stash slots inspected.
+        """
+        first, second = self._homes(key, key_hash, self.table_size)
+        item = self.array[first]
+        if item is not None and item[0] == key:
+            return 1
+        item = self.array[second]
+        if item is not None and item[0] == key:
+            return 2
+        for x in range(len(self.stash)):
+            item = self.stash[x]
+            if item is not None and item[0] == key:
+                return 3 + x
+        return 2 + len(self.stash)
+
+    def _copy_arrays(self) -> None:
+        super()._copy_arrays()
+        self.stash = self.stash.copy()
+
+    def _entries(self):
+        """
+        Yields every (key, value, hash) entry in the array and then the stash.
+
+        :complexity: O(N) where N is self.table_size.
+        """
+        for x in range(self.table_size):
+            if self.array[x] is not None:
+                yield self.array[x]
+        for x in range(len(self.stash)):
+            if self.stash[x] is not None:
+                yield self.stash[x]
+
+    def _rebuild(self, size: int, extra: list[tuple[K, V, int|None]]=()) -> None:
+        """
+        Reinserts every entry, and any extra ones, into a new array of the
+        given size, growing further whenever one can't be placed.
+
+        :complexity: O(N) expected, where N is len(self).
+        :raises FullError: When the entries can't be placed and the table
+            can't grow any further. The table is then left as it was.
+        """
+        entries = list(self._entries()) + list(extra)
+        array, stash, size_index = self.array, self.stash, self.size_index
+        while True:
+            self.array = ArrayR(size)
+            self.stash = ArrayR(self.STASH_SIZE)
+            if all(self._insert(item) is None for item in entries):
+                return
+            next_size = self._size_at(self.size_index + 1)
+            if next_size is None:
+                self.array, self.stash, self.size_index = array, stash, size_index
+                raise FullError("Table is full!")
+            self.size_index += 1
+            size = next_size
+
+    def _structure_stats(self) -> dict:
+        """
+        Describes the current array, see `LinearProbeTable._structure_stats`,
+        and how much of the stash is in use.
+        """
+        stats = super()._structure_stats()
+        stats["stash"] = sum(1 for x in range(len(self.stash)) if self.stash[x] is not None)
+        return stats
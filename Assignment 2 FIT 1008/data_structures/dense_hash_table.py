@@ -0,0 +1,301 @@
+""" Dense Hash Table
+
+Defines a Hash Table with the same interface as LinearProbeTable, laid out
+like CPython's dict: the probed array only holds small integers, which index
+into dense, insertion-ordered arrays of keys, values and cached hashes.
+"""
+from __future__ import annotations
+
+from array import array
+from typing import TypeVar
+
+from data_structures.referential_array import ArrayR
+from data_structures.hash_table import LinearProbeTable, FullError, TOMBSTONE
+from data_structures.table_stats import longest_cluster
+
+K = TypeVar('K')
+V = TypeVar('V')
+
+# Values stored in the index array besides entry numbers.
+EMPTY = -1
+DUMMY = -2
+# Cached hash stored for keys hashed by an overwritten `hash`.
+NO_HASH = -1
+
+
+class DenseProbeTable(LinearProbeTable[K, V]):
+    """
+    Dense Probe Table.
+
+    Positions returned by `_linear_probe` are slots in the index array.
+    Iteration (keys, values, __str__) is O(len(self)) and follows insertion order.
+    Deletes always leave a DUMMY in the index and a hole in the entry arrays;
+    both are cleared whenever the index is rebuilt.
+
+    Type Arguments:
+        - K:    Key Type. In most cases should be string.
+                Otherwise `hash` should be overwritten.
+        - V:    Value Type.
+
+    Unless stated otherwise, all methods have O(1) complexity.
+    """
+
+    def __init__(self, sizes=None, tombstones: bool=True, probing: str="linear", incremental: bool=False) -> None:
+        """
+        Initialise the Hash Table.
+
+        :param tombstones: Ignored, deletes always leave a DUMMY index.
+        :param probing: linear, quadratic or double. See `LinearProbeTable`.
+        :param incremental: Not supported, since growing only rebuilds the index.
+        :raises ValueError: for Robin Hood probing or incremental resizing.
+        """
+        if probing not in ("linear", "quadratic", "double"):
+            raise ValueError(f"Unsupported probing strategy {probing!r}.")
+        if incremental:
+            raise ValueError("Dense tables do not resize incrementally.")
+        if sizes is not None:
+            self.TABLE_SIZES = sizes
+        self.unbounded = sizes is None
+        self.size_index = 0
+        self.count = 0
+        self.probing = probing
+        self.use_tombstones = True
+        # Number of DUMMY slots in the index.
+        self.tombstones = 0
+        self.incremental = False
+        self.old_array = None
+        self.migrated = 0
+        self._allocate(self.TABLE_SIZES[self.size_index])
+
+    def _allocate(self, size: int) -> None:
+        """
+        Creates an empty index of the given size, and entry arrays with room
+        for as many entries as the index can hold before it must grow, or for
+        a full index once it can't grow any further. self.size_index must
+        already be the index of size.
+
+        :complexity: O(size)
+        """
+        capacity = size // 2 + 1
+        if self._size_at(self.size_index + 1) is None:
+            capacity = size
+        self.index = array(self._typecode(capacity), [EMPTY]) * size
+        self.entry_keys: ArrayR[K] = ArrayR(capacity)
+        self.entry_values: ArrayR[V] = ArrayR(capacity)
+        self.entry_hashes = array("q", [NO_HASH]) * capacity
+        # Entry slots used so far, including holes left by deletes.
+        self.used = 0
+
+    def _copy_arrays(self) -> None:
+        """
+        Gives the table its own index and entry arrays.
+        """
+        self.index = self.index[:]
+        self.entry_keys = self.entry_keys.copy()
+        self.entry_values = self.entry_values.copy()
+        self.entry_hashes = self.entry_hashes[:]
+
+    @staticmethod
+    def _typecode(capacity: int) -> str:
+        """
+        Returns the smallest signed array typecode able to hold every entry number.
+        """
+        for typecode in ("b", "h", "i"):
+            if capacity < 1 << (8 * array(typecode).itemsize - 1):
+                return typecode
+        return "q"
+
+    @property
+    def table_size(self) -> int:
+        return len(self.index)
+
+    def _search(self, key: K, key_hash: int|None, is_insert: bool, array: ArrayR|None=None) -> int|None:
+        """
+        Probe the index for a key whose hash has already been computed,
+        returning None if the key is not in the table and is_insert is False.
+        Cached hashes are compared before keys.
+
+        :complexity best: O(1) first position is empty
+        :complexity worst: O(N*comp(K)) when we've searched the entire table
+        :raises FullError: When a table is full and cannot be inserted.
+        """
+        size = len(self.index)
+        position = self._home(key, key_hash, size)
+        step, increment = self._step(key, key_hash, size)
+        if key_hash is None:
+            key_hash = NO_HASH
+
+        # First DUMMY seen, which an insert can reuse.
+        free = None
+        for _ in range(size):
+            entry = self.index[position]
+            if entry == EMPTY:
+                if is_insert:
+                    return position if free is None else free
+                else:
+                    return None
+            elif entry == DUMMY:
+                if free is None:
+                    free = position
+            elif self.entry_hashes[entry] == key_hash and self.entry_keys[entry] == key:
+                return position
+            position = (position + step) % size
+            step += increment
+
+        if is_insert and free is not None:
+            return free
+        elif is_insert:
+            raise FullError("Table is full!")
+        else:
+            return None
+
+    def probe_length(self, key: K) -> int:
+        """
+        Returns how many index slots are inspected to look up a key,
+        whether or not it is in the table.
+
+        :complexity: See linear probe.
+        """
+        return self._probe_length(key, self._key_hash(key))
+
+    def _probe_length(self, key: K, key_hash: int|None) -> int:
+        """
+        probe_length for a key whose hash has already been computed.
+        """
+        size = len(self.index)
+        position = self._home(key, key_hash, size)
+        step, increment = self._step(key, key_hash, size)
+        for i in range(size):
+            entry = self.index[position]
+            if entry == EMPTY or (entry >= 0 and self.entry_keys[entry] == key):
+                return i + 1
+            position = (position + step) % size
+            step += increment
+        return size
+
+    def _entries(self):
+        """
+        Yields every (key, value, hash) entry in insertion order.
+
+        :complexity: O(N) where N is the number of entry slots used.
+        """
+        for x in range(self.used):
+            key = self.entry_keys[x]
+            if key is not TOMBSTONE:
+                key_hash = self.entry_hashes[x]
+                yield (key, self.entry_values[x], None if key_hash == NO_HASH else key_hash)
+
+    def keys(self) -> list[K]:
+        """
+        Returns all keys in the hash table, in insertion order.
+
+        :complexity: O(N) where N is the number of entry slots used.
+        """
+        return [self.entry_keys[x] for x in range(self.used) if self.entry_keys[x] is not TOMBSTONE]
+
+    def values(self) -> list[V]:
+        """
+        Returns all values in the hash table, in insertion order.
+
+        :complexity: O(N) where N is the number of entry slots used.
+        """
+        return [self.entry_values[x] for x in range(self.used) if self.entry_keys[x] is not TOMBSTONE]
+
+    def _holds(self, position: int, key: K) -> bool:
+        entry = self.index[position]
+        return entry >= 0 and self.entry_keys[entry] == key
+
+    def _value(self, position: int) -> V:
+        return self.entry_values[self.index[position]]
+
+    def _store(self, position: int, key: K, data: V, key_hash: int|None) -> None:
+        """
+        Stores a pair at the index slot returned by an inserting probe.
+        New keys are appended to the entry arrays.
+        """
+        entry = self.index[position]
+        if entry >= 0 and self.entry_keys[entry] == key:
+            self.entry_values[entry] = data
+            return
+
+        if self.used == len(self.entry_keys):
+            # Only holes can fill the entry arrays before the index grows.
+            self._compact()
+            position = self._probe(key, key_hash, True)
+            entry = self.index[position]
+        if entry == DUMMY:
+            self.tombstones -= 1
+        self.index[position] = self.used
+        self.entry_keys[self.used] = key
+        self.entry_values[self.used] = data
+        self.entry_hashes[self.used] = NO_HASH if key_hash is None else key_hash
+        self.used += 1
+        self.count += 1
+
+    def _remove(self, position: int) -> None:
+        """
+        Deletes the entry at an index slot holding a key, leaving a DUMMY in
+        the index and a hole in the entry arrays. The index is rebuilt at the
+        same size once DUMMY slots pass TOMBSTONE_LIMIT.
+        """
+        entry = self.index[position]
+        self.index[position] = DUMMY
+        self.entry_keys[entry] = TOMBSTONE
+        self.entry_values[entry] = None
+        self.count -= 1
+        self.tombstones += 1
+        if self.tombstones > self.table_size * self.TOMBSTONE_LIMIT:
+            self._compact()
+
+    def _compact(self) -> None:
+        """
+        Clears all DUMMY slots and holes, keeping the current table size.
+
+        :complexity: See _rebuild.
+        """
+        if self.recorder is not None:
+            self.recorder.compactions += 1
+        self._rebuild(self.table_size)
+
+    def _structure_stats(self) -> dict:
+        """
+        Describes the current index, see `LinearProbeTable._structure_stats`.
+        Holes are entry slots left behind by deletes.
+
+        :complexity: O(N) where N is self.table_size.
+        """
+        return {
+            "table_size": self.table_size,
+            "count": len(self),
+            "load_factor": len(self) / self.table_size,
+            "tombstones": self.tombstones,
+            "longest_cluster": longest_cluster(entry != EMPTY for entry in self.index),
+            "holes": self.used - len(self),
+            # Never resizes incrementally, reported for parity with LinearProbeTable.
+            "migrating": False,
+        }
+
+    def _rebuild(self, size: int) -> None:
+        """
+        Rebuilds the index at the given size, closing up holes in the entry
+        arrays while keeping insertion order. Keys are only hashed again
+        if `hash` has been overwritten.
+
+        :complexity best: O(N) No probing.
+        :complexity worst: O(N^2) Lots of probing.
+        Where N is the number of entry slots used.
+        """
+        entries = list(self._entries())
+        self._allocate(size)
+        self.tombstones = 0
+        for key, value, key_hash in entries:
+            position = self._home(key, key_hash, size)
+            step, increment = self._step(key, key_hash, size)
+            while self.index[position] != EMPTY:
+                position = (position + step) % size
+                step += increment
+            self.index[position] = self.used
+            self.entry_keys[self.used] = key
+            self.entry_values[self.used] = value
+            self.entry_hashes[self.used] = NO_HASH if key_hash is None else key_hash
+            self.used += 1
@@ -1,14 +1,20 @@
 """ Hash Table ADT
 
 Defines a Hash Table using Linear Probing for conflict resolution.
+Quadratic probing, double hashing and Robin Hood probing can be
+selected instead through the `probing` argument.
 """
 from __future__ import annotations
 __author__ = 'Jackson Goerner'
 __since__ = '07/02/2023'
 
 
-from typing import TypeVar, Generic
+from copy import copy as shallow_copy
+from typing import TypeVar, Generic, Iterable
 from data_structures.referential_array import ArrayR
+from data_structures.table_stats import Instrumented, longest_cluster
+from data_structures.snapshots import CopyOnWrite
+from algorithms.primes import next_prime
 
 K = TypeVar('K')
 V = TypeVar('V')
@@ -17,10 +23,28 @@ class FullError(Exception):
     pass
 
 
-class LinearProbeTable(Generic[K, V]):
+class Tombstone:
+    """
+    Marks a slot whose entry has been deleted, so that probe chains
+    passing through it stay intact.
+    """
+
+    def __repr__(self) -> str:
+        return "TOMBSTONE"
+
+TOMBSTONE = Tombstone()
+
+# Default for `pop`, telling "no default given" apart from a default of None.
+MISSING = object()
+
+
+class LinearProbeTable(Instrumented, CopyOnWrite, Generic[K, V]):
     """
     Linear Probe Table.
 
+    Statistics can be collected at runtime, see `Instrumented`.
+    `snapshot()` returns a read-only copy-on-write view, see `CopyOnWrite`.
+
     Type Arguments:
         - K:    Key Type. In most cases should be string.
                 Otherwise `hash` should be overwritten.
@@ -29,24 +53,120 @@ class LinearProbeTable(Generic[K, V]):
     Unless stated otherwise, all methods have O(1) complexity.
     """
 
-    # No test case should exceed 1 million entries.
+    # Tables built without explicit sizes keep growing past the end of this
+    # list, roughly doubling to the next prime each time.
     TABLE_SIZES = [5, 13, 29, 53, 97, 193, 389, 769, 1543, 3079, 6151, 12289, 24593, 49157, 98317, 196613, 393241, 786433, 1572869]
 
     HASH_BASE = 31
+    # Mersenne prime used to keep the cached key hashes bounded.
+    HASH_MODULUS = (1 << 61) - 1
+
+    # See `CopyOnWrite.SNAPSHOT_HASHES`.
+    SNAPSHOT_HASHES = ("hash",)
+
+    # Fraction of the table that may be filled before it grows.
+    MAX_LOAD = 0.5
+
+    # Fraction of the table that may hold tombstones before it is compacted.
+    TOMBSTONE_LIMIT = 0.25
+
+    # Fraction of MAX_LOAD below which `shrink` moves to a smaller array.
+    SHRINK_LOAD = 0.25
+
+    PROBING_STRATEGIES = ("linear", "quadratic", "double", "robin_hood")
+
+    # Old slots moved across per operation during an incremental resize.
+    MIGRATE_STEP = 8
 
-    def __init__(self, sizes=None) -> None:
+    def __init__(self, sizes=None, tombstones: bool=False, probing: str="linear", incremental: bool=False) -> None:
         """
         Initialise the Hash Table.
+
+        :param tombstones: Delete by leaving a tombstone rather than
+            reinserting the rest of the cluster.
+        :param probing: One of PROBING_STRATEGIES.
+            Quadratic probing and double hashing always delete with tombstones,
+            since their probe chains are not contiguous.
+            Robin Hood probing deletes by shifting the rest of the cluster back.
+        :param incremental: Resize incrementally. The old array is kept
+            alongside the new one, and each operation moves MIGRATE_STEP of its
+            slots across, rather than one insert moving everything at once.
+            Needs the default `hash`; with it overwritten, resizes happen all at once.
+        :raises ValueError: for an unknown strategy, or Robin Hood with tombstones.
         """
+        if probing not in self.PROBING_STRATEGIES:
+            raise ValueError(f"Unknown probing strategy {probing!r}.")
+        if probing == "robin_hood" and tombstones:
+            raise ValueError("Robin Hood probing cannot delete with tombstones.")
         if sizes is not None:
             self.TABLE_SIZES = sizes
+        # Only the default sizes are extended, explicit sizes are a hard limit.
+        self.unbounded = sizes is None
         self.size_index = 0
-        self.array:ArrayR[tuple[K, V]] = ArrayR(self.TABLE_SIZES[self.size_index])
+        self.array:ArrayR[tuple[K, V, int|None]|Tombstone] = ArrayR(self.TABLE_SIZES[self.size_index])
         self.count = 0
+        self.probing = probing
+        self.use_tombstones = tombstones or probing in ("quadratic", "double")
+        self.tombstones = 0
+        self.incremental = incremental
+        # The array being migrated from during an incremental resize, and
+        # how many of its slots have been moved across so far.
+        self.old_array:ArrayR[tuple[K, V, int|None]|Tombstone]|None = None
+        self.migrated = 0
+
+    @classmethod
+    def from_items(cls, items: Iterable[tuple[K, V]], sizes=None, tombstones: bool=False, probing: str="linear", incremental: bool=False) -> LinearProbeTable[K, V]:
+        """
+        Builds a table from (key, value) pairs, choosing the final table size
+        up front so that no rehash happens while inserting.
+        Later pairs overwrite earlier ones with the same key.
 
-    def hash(self, key: K) -> int:
+        :complexity: O(N*hash(K)) with no probing, where N is len(items).
         """
-        Hash a key for insert/retrieve/update into the hashtable.
+        items = list(items)
+        table = cls(sizes, tombstones, probing, incremental)
+        table.reserve(len(items))
+        for key, value in items:
+            table[key] = value
+        return table
+
+    def reserve(self, n: int) -> None:
+        """
+        Grows the table, if needed, so that it can hold n entries without rehashing.
+
+        :complexity: O(1) if no growth is needed, otherwise see _rehash.
+        """
+        size_index = self.size_index
+        while n > self.TABLE_SIZES[size_index] * self.MAX_LOAD and self._size_at(size_index + 1) is not None:
+            size_index += 1
+        if size_index > self.size_index:
+            self._unshare()
+            start = self._rehash_started()
+            self.size_index = size_index
+            self._rebuild(self.TABLE_SIZES[size_index])
+            self._rehash_finished(start)
+
+    def _size_at(self, size_index: int) -> int|None:
+        """
+        Returns TABLE_SIZES[size_index], or None if the table cannot grow that far.
+        Unbounded tables extend their own copy of TABLE_SIZES with the next
+        prime past double the last size, so growth stays amortised O(1).
+
+        :complexity: O(1) for listed sizes, otherwise see next_prime.
+        """
+        if size_index < len(self.TABLE_SIZES):
+            return self.TABLE_SIZES[size_index]
+        if not self.unbounded:
+            return None
+        self.TABLE_SIZES = self.TABLE_SIZES + [next_prime(2 * self.TABLE_SIZES[-1] + 1)]
+        return self.TABLE_SIZES[size_index]
+
+    def hash_key(self, key: K) -> int:
+        """
+        Hash a key independently of the current table size.
+
+        The result is stored alongside each entry, so growing the table only
+        has to reduce it modulo the new size rather than hash the key again.
 
         :complexity: O(len(key))
         """
@@ -54,10 +174,37 @@ class LinearProbeTable(Generic[K, V]):
         value = 0
         a = 31415
         for char in key:
-            value = (ord(char) + a * value) % self.table_size
-            a = a * self.HASH_BASE % (self.table_size - 1)
+            value = (ord(char) + a * value) % self.HASH_MODULUS
+            a = a * self.HASH_BASE % self.HASH_MODULUS
         return value
 
+    def hash(self, key: K) -> int:
+        """
+        Hash a key for insert/retrieve/update into the hashtable.
+
+        :complexity: O(len(key))
+        """
+        return self.hash_key(key) % self.table_size
+
+    def _key_hash(self, key: K) -> int|None:
+        """
+        Returns the cacheable hash of a key, or None if `hash` has been
+        overwritten (in which case positions can only come from `hash`).
+
+        :complexity: O(len(key))
+        """
+        if self._hash_overridden():
+            return None
+        if self.recorder is not None:
+            self.recorder.hashes += 1
+        return self.hash_key(key)
+
+    def _hash_overridden(self) -> bool:
+        """
+        Whether `hash` has been overwritten, on the class or the instance.
+        """
+        return "hash" in self.__dict__ or type(self).hash is not LinearProbeTable.hash
+
     @property
     def table_size(self) -> int:
         return len(self.array)
@@ -68,35 +215,234 @@ class LinearProbeTable(Generic[K, V]):
         """
         return self.count
 
+    def _home(self, key: K, key_hash: int|None, size: int) -> int:
+        """
+        Returns the first position probed for a key in an array of the given size.
+        A key_hash of None is only valid for the current array.
+        """
+        if key_hash is None:
+            return self.hash(key)
+        return key_hash % size
+
+    def _distance(self, item: tuple[K, V, int|None], position: int, size: int) -> int:
+        """
+        Returns how far along an array an entry sits from its home position.
+        Only meaningful for linear and Robin Hood probing.
+        """
+        return (position - self._home(item[0], item[2], size)) % size
+
+    def _step(self, key: K, key_hash: int|None, size: int) -> tuple[int, int]:
+        """
+        Returns the first step and the step increment of the probe sequence.
+
+        Linear / Robin Hood: +1, +1, +1, ...
+        Quadratic:           +1, +3, +5, ... (so offsets are 1, 4, 9, ...)
+        Double hashing:      +s, +s, +s, ... where s comes from hash_key(key)
+        """
+        if self.probing == "quadratic":
+            return 1, 2
+        elif self.probing == "double":
+            if key_hash is None:
+                key_hash = self.hash_key(key)
+            return 1 + (key_hash // size) % max(size - 1, 1), 0
+        return 1, 0
+
     def _linear_probe(self, key: K, is_insert: bool) -> int:
         """
-        Find the correct position for this key in the hash table using linear probing.
+        Find the correct position for this key in the hash table using
+        the table's probing strategy (linear probing by default).
         :complexity best: O(hash(key)) first position is empty
         :complexity worst: O(hash(key) + N*comp(K)) when we've searched the entire table
                         where N is the tablesize
         :raises KeyError: When the key is not in the table, but is_insert is False.
         :raises FullError: When a table is full and cannot be inserted.
         """
-        # Initial position
-        position = self.hash(key)
+        return self._find(key, self._key_hash(key), is_insert)
 
-        for _ in range(self.table_size):
-            if self.array[position] is None:
+    def _find(self, key: K, key_hash: int|None, is_insert: bool) -> int:
+        """
+        Like _probe, but during an incremental resize it also migrates.
+        A key still in the old array is moved across to the new one first,
+        so the position returned is always in self.array.
+
+        :complexity: See _probe.
+        :raises KeyError: When the key is not in the table, but is_insert is False.
+        :raises FullError: When a table is full and cannot be inserted.
+        """
+        position = self._locate(key, key_hash, is_insert)
+        if position is None:
+            raise KeyError(key)
+        return position
+
+    def _locate(self, key: K, key_hash: int|None, is_insert: bool) -> int|None:
+        """
+        _find, returning None rather than raising when the key is not in the table.
+
+        :complexity: See _probe.
+        :raises FullError: When a table is full and cannot be inserted.
+        """
+        if self.old_array is None:
+            return self._search(key, key_hash, is_insert)
+        self._migrate(self.MIGRATE_STEP)
+        position = self._search(key, key_hash, True)
+        if self.old_array is not None and not self._holds(position, key):
+            old_position = self._search(key, key_hash, False, self.old_array)
+            if old_position is not None:
+                if self.array[position] is TOMBSTONE:
+                    self.tombstones -= 1
+                self._place(self.old_array[old_position], position)
+                self.old_array[old_position] = TOMBSTONE
+                return position
+        if not is_insert and not self._holds(position, key):
+            return None
+        return position
+
+    def _probe(self, key: K, key_hash: int|None, is_insert: bool, array: ArrayR|None=None) -> int:
+        """
+        Probe for a key whose hash has already been computed.
+        A key_hash of None means the position comes from `hash` instead.
+        Probes self.array unless another array is given.
+
+        For Robin Hood probing, an insert of a new key returns the position
+        it should take over, which may still hold another entry (see `_place`).
+
+        :complexity best: O(1) first position is empty
+        :complexity worst: O(N*comp(K)) when we've searched the entire table
+        :raises KeyError: When the key is not in the table, but is_insert is False.
+        :raises FullError: When a table is full and cannot be inserted.
+        """
+        position = self._search(key, key_hash, is_insert, array)
+        if position is None:
+            raise KeyError(key)
+        return position
+
+    def _search(self, key: K, key_hash: int|None, is_insert: bool, array: ArrayR|None=None) -> int|None:
+        """
+        _probe, returning None rather than raising when the key is not in the table.
+
+        :complexity: See _probe.
+        :raises FullError: When a table is full and cannot be inserted.
+        """
+        if array is None:
+            array = self.array
+        size = len(array)
+        position = self._home(key, key_hash, size)
+        step, increment = self._step(key, key_hash, size)
+        robin_hood = self.probing == "robin_hood"
+
+        # First tombstone seen, which an insert can reuse.
+        free = None
+        for i in range(size):
+            item = array[position]
+            if item is None:
                 # Empty spot. Am I upserting or retrieving?
                 if is_insert:
-                    return position
+                    return position if free is None else free
                 else:
-                    raise KeyError(key)
-            elif self.array[position][0] == key:
+                    return None
+            elif item is TOMBSTONE:
+                if free is None:
+                    free = position
+            elif item[0] == key:
                 return position
-            else:
-                # Taken by something else. Time to linear probe.
-                position = (position + 1) % self.table_size
-
-        if is_insert:
+            elif robin_hood and self._distance(item, position, size) < i:
+                # The key would have displaced this item, so it isn't here.
+                if is_insert:
+                    return position
+                else:
+                    return None
+            # Taken by something else. Time to probe.
+            position = (position + step) % size
+            step += increment
+
+        if is_insert and free is not None:
+            return free
+        elif is_insert:
             raise FullError("Table is full!")
         else:
-            raise KeyError(key)
+            return None
+
+    def _place(self, item: tuple[K, V, int|None], position: int) -> None:
+        """
+        Stores a new entry at the position returned by an inserting probe.
+        Under Robin Hood probing, any entry already there is displaced
+        further along the cluster, and so on.
+
+        :complexity: O(1), or O(N) for Robin Hood where N is the cluster length.
+        :raises FullError: When displaced entries have no empty slot to end in.
+        """
+        if self.probing == "robin_hood":
+            end = self._cluster_end(self.array, position)
+            distance = self._distance(item, position, self.table_size)
+            while position != end:
+                resident = self.array[position]
+                resident_distance = self._distance(resident, position, self.table_size)
+                if resident_distance < distance:
+                    self.array[position] = item
+                    item, distance = resident, resident_distance
+                position = (position + 1) % self.table_size
+                distance += 1
+        self.array[position] = item
+
+    @staticmethod
+    def _cluster_end(array: ArrayR, position: int) -> int:
+        """
+        Returns the first empty slot from a position on, wrapping around.
+
+        :complexity: O(N) where N is the cluster length.
+        :raises FullError: When the array has no empty slot.
+        """
+        size = len(array)
+        for _ in range(size):
+            if array[position] is None:
+                return position
+            position = (position + 1) % size
+        raise FullError("Table is full!")
+
+    def probe_length(self, key: K) -> int:
+        """
+        Returns how many slots of the current array are inspected to look
+        up a key, whether or not it is in the table.
+
+        :complexity: See linear probe.
+        """
+        return self._probe_length(key, self._key_hash(key))
+
+    def _probe_length(self, key: K, key_hash: int|None) -> int:
+        """
+        probe_length for a key whose hash has already been computed.
+        """
+        position = self._home(key, key_hash, self.table_size)
+        step, increment = self._step(key, key_hash, self.table_size)
+        for i in range(self.table_size):
+            item = self.array[position]
+            if item is None:
+                return i + 1
+            elif item is not TOMBSTONE:
+                if item[0] == key:
+                    return i + 1
+                if self.probing == "robin_hood" and self._distance(item, position, self.table_size) < i:
+                    return i + 1
+            position = (position + step) % self.table_size
+            step += increment
+        return self.table_size
+
+    def _entries(self):
+        """
+        Yields every (key, value, hash) entry in the table,
+        including those not yet migrated out of an old array.
+
+        :complexity: O(N) where N is self.table_size.
+        """
+        for x in range(self.table_size):
+            item = self.array[x]
+            if item is not None and item is not TOMBSTONE:
+                yield item
+        if self.old_array is not None:
+            for x in range(self.migrated, len(self.old_array)):
+                item = self.old_array[x]
+                if item is not None and item is not TOMBSTONE:
+                    yield item
 
     def keys(self) -> list[K]:
         """
@@ -104,11 +450,7 @@ class LinearProbeTable(Generic[K, V]):
 
         :complexity: O(N) where N is self.table_size.
         """
-        res = []
-        for x in range(self.table_size):
-            if self.array[x] is not None:
-                res.append(self.array[x][0])
-        return res
+        return [item[0] for item in self._entries()]
 
     def values(self) -> list[V]:
         """
@@ -116,11 +458,15 @@ class LinearProbeTable(Generic[K, V]):
 
         :complexity: O(N) where N is self.table_size.
         """
-        res = []
-        for x in range(self.table_size):
-            if self.array[x] is not None:
-                res.append(self.array[x][1])
-        return res
+        return [item[1] for item in self._entries()]
+
+    def items(self) -> list[tuple[K, V]]:
+        """
+        Returns all (key, value) pairs in the hash table.
+
+        :complexity: O(N) where N is self.table_size.
+        """
+        return [(item[0], item[1]) for item in self._entries()]
 
     def __contains__(self, key: K) -> bool:
         """
@@ -128,12 +474,52 @@ class LinearProbeTable(Generic[K, V]):
 
         :complexity: See linear probe.
         """
-        try:
-            _ = self[key]
-        except KeyError:
-            return False
+        return self._locate(key, self._key_hash(key), False) is not None
+
+    def _peek(self, key: K, default: V|None=None) -> V|None:
+        """
+        Like get, but never moves entries, even during an incremental resize,
+        so it is safe on tables shared with a snapshot. Records nothing.
+
+        :complexity: See linear probe.
+        """
+        key_hash = self._key_hash(key)
+        position = self._search(key, key_hash, False)
+        if position is not None:
+            return self._value(position)
+        if self.old_array is not None:
+            position = self._search(key, key_hash, False, self.old_array)
+            if position is not None:
+                return self.old_array[position][1]
+        return default
+
+    def _holds(self, position: int, key: K) -> bool:
+        """
+        Whether the slot at a probed position holds the given key.
+        """
+        item = self.array[position]
+        return item is not None and item is not TOMBSTONE and item[0] == key
+
+    def _value(self, position: int) -> V:
+        """
+        Returns the value stored at a position holding a key.
+        """
+        return self.array[position][1]
+
+    def _store(self, position: int, key: K, data: V, key_hash: int|None) -> None:
+        """
+        Stores a pair at the position returned by an inserting probe,
+        either updating the key already there or adding a new entry.
+        Does not rehash.
+        """
+        item = self.array[position]
+        if item is None or item is TOMBSTONE or item[0] != key:
+            self._place((key, data, key_hash), position)
+            self.count += 1
+            if item is TOMBSTONE:
+                self.tombstones -= 1
         else:
-            return True
+            self.array[position] = (key, data, key_hash)
 
     def __getitem__(self, key: K) -> V:
         """
@@ -142,8 +528,27 @@ class LinearProbeTable(Generic[K, V]):
         :complexity: See linear probe.
         :raises KeyError: when the key doesn't exist.
         """
-        position = self._linear_probe(key, False)
-        return self.array[position][1]
+        key_hash = self._key_hash(key)
+        if self.recorder is not None:
+            self.recorder.record_probe("get", self._probe_length(key, key_hash))
+        position = self._locate(key, key_hash, False)
+        if position is None:
+            raise KeyError(key)
+        return self._value(position)
+
+    def get(self, key: K, default: V|None=None) -> V|None:
+        """
+        Returns the value at a key, or default if the key isn't in the table.
+
+        :complexity: See linear probe.
+        """
+        key_hash = self._key_hash(key)
+        if self.recorder is not None:
+            self.recorder.record_probe("get", self._probe_length(key, key_hash))
+        position = self._locate(key, key_hash, False)
+        if position is None:
+            return default
+        return self._value(position)
 
     def __setitem__(self, key: K, data: V) -> None:
         """
@@ -152,37 +557,108 @@ class LinearProbeTable(Generic[K, V]):
         :complexity: See linear probe.
         :raises FullError: when the table cannot be resized further.
         """
+        self._unshare()
+        key_hash = self._key_hash(key)
+        if self.recorder is not None:
+            self.recorder.record_probe("set", self._probe_length(key, key_hash))
+        self._store(self._find(key, key_hash, True), key, data, key_hash)
 
-        position = self._linear_probe(key, True)
-
-        if self.array[position] is None:
-            self.count += 1
+        if len(self) > self.table_size * self.MAX_LOAD:
+            self._rehash()
 
-        self.array[position] = (key, data)
+    def setdefault(self, key: K, default: V|None=None) -> V|None:
+        """
+        Returns the value at a key, first inserting default if the key isn't in the table.
 
-        if len(self) > self.table_size / 2:
+        :complexity: See linear probe.
+        :raises FullError: when the table cannot be resized further.
+        """
+        self._unshare()
+        key_hash = self._key_hash(key)
+        if self.recorder is not None:
+            self.recorder.record_probe("set", self._probe_length(key, key_hash))
+        position = self._find(key, key_hash, True)
+        if self._holds(position, key):
+            return self._value(position)
+        self._store(position, key, default, key_hash)
+
+        if len(self) > self.table_size * self.MAX_LOAD:
             self._rehash()
+        return default
+
+    def update(self, other: LinearProbeTable[K, V]|Iterable[tuple[K, V]]) -> None:
+        """
+        Sets every (key, value) pair from another table, or from an iterable of pairs.
+
+        :complexity: O(N) inserts, where N is the number of pairs.
+        """
+        if isinstance(other, LinearProbeTable):
+            other = other.items()
+        for key, value in other:
+            self[key] = value
 
     def __delitem__(self, key: K) -> None:
         """
         Deletes a (key, value) pair in our hash table.
 
+        With tombstones enabled, the slot is marked as deleted instead, and
+        the table is compacted once tombstones pass TOMBSTONE_LIMIT.
+
         :complexity best: O(hash(key)) deleting item is not probed and in correct spot.
-        :complexity worst: O(N*hash(key)+N^2*comp(K)) deleting item is midway through large chain.
+        :complexity worst: O(hash(key)+N^2*comp(K)) deleting item is midway through large chain.
         :raises KeyError: when the key doesn't exist.
         """
-        position = self._linear_probe(key, False)
+        self._unshare()
+        key_hash = self._key_hash(key)
+        if self.recorder is not None:
+            self.recorder.record_probe("delete", self._probe_length(key, key_hash))
+        self._remove(self._find(key, key_hash, False))
+
+    def pop(self, key: K, default: V=MISSING) -> V:
+        """
+        Deletes a key, returning its value.
+        If the key isn't in the table, returns default instead.
+
+        :complexity: See __delitem__.
+        :raises KeyError: when the key doesn't exist and no default is given.
+        """
+        self._unshare()
+        key_hash = self._key_hash(key)
+        if self.recorder is not None:
+            self.recorder.record_probe("delete", self._probe_length(key, key_hash))
+        position = self._locate(key, key_hash, False)
+        if position is None:
+            if default is MISSING:
+                raise KeyError(key)
+            return default
+        value = self._value(position)
+        self._remove(position)
+        return value
+
+    def _remove(self, position: int) -> None:
+        """
+        Deletes the entry at a position holding a key. See __delitem__.
+        """
+        self.count -= 1
+        if self.use_tombstones:
+            self.array[position] = TOMBSTONE
+            self.tombstones += 1
+            if self.tombstones > self.table_size * self.TOMBSTONE_LIMIT:
+                self._compact()
+            return
         # Remove the element
         self.array[position] = None
-        self.count -= 1
+        if self.probing == "robin_hood":
+            self._shift_back(position)
+            return
         # Start moving over the cluster
         position = (position + 1) % self.table_size
         while self.array[position] is not None:
-            key2, value = self.array[position]
+            item = self.array[position]
             self.array[position] = None
-            # Reinsert.
-            newpos = self._linear_probe(key2, True)
-            self.array[newpos] = (key2, value)
+            # Reinsert, reusing the cached hash.
+            newpos = self._probe(item[0], item[2], True)
+            self.array[newpos] = item
             position = (position + 1) % self.table_size
 
     def is_empty(self) -> bool:
@@ -191,25 +667,194 @@ class LinearProbeTable(Generic[K, V]):
     def is_full(self) -> bool:
         return self.count == self.table_size
 
+    def _shift_back(self, position: int) -> None:
+        """
+        Fills the gap left by a Robin Hood delete by moving every following
+        displaced entry in the cluster back one slot.
+
+        :complexity: O(N) where N is the cluster length.
+        """
+        following = (position + 1) % self.table_size
+        while self.array[following] is not None and self._distance(self.array[following], following, self.table_size) > 0:
+            self.array[position] = self.array[following]
+            self.array[following] = None
+            position = following
+            following = (following + 1) % self.table_size
+
+    def _compact(self) -> None:
+        """
+        Clears all tombstones, keeping the current table size.
+
+        Under linear probing this happens in place: every entry is taken out
+        and reinserted, starting just after an empty slot, so each one only
+        moves back into the gaps left behind by the tombstones earlier in
+        its cluster. Other strategies are rebuilt into a fresh array.
+
+        :complexity: O(N*comp(K)) where N is self.table_size.
+        """
+        if self.recorder is not None:
+            self.recorder.compactions += 1
+        if self.probing != "linear":
+            self._rebuild(self.table_size)
+            return
+        for x in range(self.table_size):
+            if self.array[x] is TOMBSTONE:
+                self.array[x] = None
+        self.tombstones = 0
+
+        start = 0
+        while self.array[start] is not None:
+            start += 1
+        for x in range(1, self.table_size + 1):
+            position = (start + x) % self.table_size
+            item = self.array[position]
+            if item is not None:
+                self.array[position] = None
+                self.array[self._probe(item[0], item[2], True)] = item
+
     def _rehash(self) -> None:
         """
-        Need to resize table and reinsert all values
+        Need to resize table and reinsert all values.
+        Cached key hashes are reused, so keys are only hashed again
+        if `hash` has been overwritten.
+
+        For incremental tables this only allocates the new array and starts
+        migrating to it, see `_migrate`.
 
-        :complexity best: O(N*hash(K)) No probing.
-        :complexity worst: O(N*hash(K) + N^2*comp(K)) Lots of probing.
+        :complexity best: O(N) No probing.
+        :complexity worst: O(N^2*comp(K)) Lots of probing.
         Where N is len(self)
         """
-        old_array = self.array
-        self.size_index += 1
-        if self.size_index >= len(self.TABLE_SIZES):
+        size = self._size_at(self.size_index + 1)
+        if size is None:
             # Cannot be resized further.
             return
-        self.array = ArrayR(self.TABLE_SIZES[self.size_index])
-        self.count = 0
+        start = self._rehash_started()
+        self.size_index += 1
+        if self.incremental and not self._hash_overridden():
+            self._finish_migration()
+            self.old_array = self.array
+            self.migrated = 0
+            self.array = ArrayR(size)
+            self.tombstones = 0
+        else:
+            self._rebuild(size)
+        self._rehash_finished(start)
+
+    def shrink(self) -> bool:
+        """
+        Moves every entry into a smaller array once fewer than
+        SHRINK_LOAD * MAX_LOAD of the slots are in use, returning whether it did.
+        The new size is the smallest that leaves the table at most half of
+        MAX_LOAD full, so that a few inserts don't make it grow straight back.
+
+        Tables never shrink on their own; owners such as DoubleKeyTable call
+        this after deleting.
+
+        :complexity: O(1) if the table doesn't shrink, otherwise see _rehash.
+        """
+        if self.size_index == 0 or len(self) >= self.table_size * self.MAX_LOAD * self.SHRINK_LOAD:
+            return False
+        size_index = self.size_index
+        while size_index > 0 and len(self) <= self.TABLE_SIZES[size_index - 1] * self.MAX_LOAD / 2:
+            size_index -= 1
+        if size_index == self.size_index:
+            return False
+        self._unshare()
+        start = self._rehash_started()
+        self.size_index = size_index
+        self._rebuild(self.TABLE_SIZES[size_index])
+        self._rehash_finished(start)
+        return True
+
+    def _migrate(self, slots: int) -> None:
+        """
+        Moves the entries in the next few slots of the old array across
+        to the new one, leaving tombstones behind so that probe chains
+        through the rest of the old array stay intact.
+
+        :complexity: O(slots) with no probing.
+        """
+        end = min(self.migrated + slots, len(self.old_array))
+        if self.recorder is not None:
+            self.recorder.migrated += end - self.migrated
+        for x in range(self.migrated, end):
+            item = self.old_array[x]
+            if item is not None and item is not TOMBSTONE:
+                self._place(item, self._probe(item[0], item[2], True))
+                self.old_array[x] = TOMBSTONE
+        self.migrated = end
+        if self.migrated == len(self.old_array):
+            self.old_array = None
+
+    def copy(self) -> LinearProbeTable[K, V]:
+        """
+        Returns an independent, writable copy of the table, without statistics.
+        An overwritten `hash` is shared with the copy as it is.
+
+        :complexity: O(N) where N is self.table_size.
+        """
+        table = shallow_copy(self)
+        table.frozen = False
+        table._shared = False
+        table.recorder = None
+        table._copy_arrays()
+        return table
+
+    def _before_snapshot(self) -> None:
+        """
+        Finishes any incremental resize, since lookups during one move entries.
+        """
+        self._finish_migration()
+
+    def _copy_arrays(self) -> None:
+        """
+        Gives the table its own copy of every array it writes to.
+
+        :complexity: O(N) where N is self.table_size.
+        """
+        self.array = self.array.copy()
+        if self.old_array is not None:
+            self.old_array = self.old_array.copy()
+
+    def _finish_migration(self) -> None:
+        """
+        Completes any incremental resize in progress.
+
+        :complexity: O(N) with no probing, where N is the old table size.
+        """
+        if self.old_array is not None:
+            self._migrate(len(self.old_array))
+
+    def _rebuild(self, size: int) -> None:
+        """
+        Moves every entry into a new array of the given size, dropping tombstones.
+
+        :complexity: See _rehash.
+        """
+        self._finish_migration()
+        old_array = self.array
+        self.array = ArrayR(size)
+        self.tombstones = 0
         for item in old_array:
-            if item is not None:
-                key, value = item
-                self[key] = value
+            if item is not None and item is not TOMBSTONE:
+                self._place(item, self._probe(item[0], item[2], True))
+
+    def _structure_stats(self) -> dict:
+        """
+        Describes the current array: its size, load factor, tombstones and
+        longest cluster of occupied (or tombstoned) slots.
+
+        :complexity: O(N) where N is self.table_size.
+        """
+        return {
+            "table_size": self.table_size,
+            "count": len(self),
+            "load_factor": len(self) / self.table_size,
+            "tombstones": self.tombstones,
+            "longest_cluster": longest_cluster(self.array[x] is not None for x in range(self.table_size)),
+            "migrating": self.old_array is not None,
+        }
 
     def __str__(self) -> str:
         """
@@ -218,8 +863,6 @@ class LinearProbeTable(Generic[K, V]):
         :complexity: O(N * (str(key) + str(value))) where N is the table size
         """
         result = ""
-        for item in self.array:
-            if item is not None:
-                (key, value) = item
-                result += "(" + str(key) + "," + str(value) + ")\n"
+        for (key, value, _) in self._entries():
+            result += "(" + str(key) + "," + str(value) + ")\n"
         return result
\ No newline at end of file
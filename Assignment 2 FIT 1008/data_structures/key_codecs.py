@@ -0,0 +1,106 @@
+""" Key Codecs
+
+A key codec decides what form a table stores its keys in, and hashes keys in
+that form independently of the table size (see `LinearProbeTable.hash_key`).
+`DoubleKeyTable` takes one codec per key, so integer keys can be stored and
+hashed as integers rather than converted to strings on every access.
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Generic, TypeVar, Any
+
+K = TypeVar('K')
+
+# Same modulus as LinearProbeTable, so hashes of every codec are equally bounded.
+HASH_MODULUS = (1 << 61) - 1
+
+
+class KeyCodec(ABC, Generic[K]):
+    """
+    Abstract key codec.
+    """
+
+    @abstractmethod
+    def encode(self, key: Any) -> K:
+        """
+        Returns the key in the form it is stored and compared in.
+        """
+        pass
+
+    @abstractmethod
+    def hash_key(self, key: K) -> int:
+        """
+        Hash an encoded key independently of any table size.
+        """
+        pass
+
+
+class StrCodec(KeyCodec[str]):
+    """
+    Stores keys as strings, hashed one character at a time.
+    Agrees with `LinearProbeTable.hash_key`.
+    """
+
+    HASH_BASE = 31
+
+    def encode(self, key: Any) -> str:
+        return str(key)
+
+    def hash_key(self, key: str) -> int:
+        """
+        :complexity: O(len(key))
+        """
+        value = 0
+        a = 31415
+        for char in key:
+            value = (ord(char) + a * value) % HASH_MODULUS
+            a = a * self.HASH_BASE % HASH_MODULUS
+        return value
+
+
+class IntCodec(KeyCodec[int]):
+    """
+    Stores keys as integers, hashed with a single multiplication.
+    """
+
+    # 2^64 / golden ratio, which spreads consecutive integers far apart.
+    MULTIPLIER = 0x9E3779B97F4A7C15
+
+    def encode(self, key: Any) -> int:
+        return int(key)
+
+    def hash_key(self, key: int) -> int:
+        """
+        :complexity: O(1) for integers that fit in a machine word.
+        """
+        return key * self.MULTIPLIER % HASH_MODULUS
+
+
+class TupleCodec(KeyCodec[tuple]):
+    """
+    Stores keys as tuples, encoding and hashing each part with its own codec.
+    """
+
+    HASH_BASE = 1000003
+
+    def __init__(self, *codecs: KeyCodec) -> None:
+        self.codecs = codecs
+
+    def encode(self, key: Any) -> tuple:
+        if len(key) != len(self.codecs):
+            raise ValueError(f"Expected a key with {len(self.codecs)} parts, got {key!r}.")
+        return tuple(codec.encode(part) for codec, part in zip(self.codecs, key))
+
+    def hash_key(self, key: tuple) -> int:
+        """
+        :complexity: O(sum of hashing each part)
+        """
+        value = 0
+        for codec, part in zip(self.codecs, key):
+            value = (value * self.HASH_BASE + codec.hash_key(part)) % HASH_MODULUS
+        return value
+
+
+STR_CODEC = StrCodec()
+INT_CODEC = IntCodec()
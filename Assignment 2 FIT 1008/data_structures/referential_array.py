@@ -53,3 +53,11 @@ class ArrayR(Generic[T]):
         """
         self.array[index] = value
 
+    def copy(self) -> "ArrayR[T]":
+        """ Returns a new array holding the same references
+        :complexity: O(length) for best/worst case
+        """
+        new = ArrayR.__new__(ArrayR)
+        new.array = (len(self.array) * py_object)()
+        new.array[:] = self.array[:]
+        return new
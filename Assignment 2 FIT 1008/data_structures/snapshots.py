@@ -0,0 +1,79 @@
+""" Copy-on-write Snapshots
+
+Defines the `CopyOnWrite` mixin, through which tables hand out O(1)
+read-only snapshots of themselves.
+
+A snapshot is a shallow copy of the table, sharing its arrays. Neither
+side ever writes to an array while it is shared: snapshots refuse every
+write, and the table copies its arrays before its first write after a
+snapshot is taken. Readers of a snapshot therefore see the table exactly
+as it was, however the table changes afterwards.
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from copy import copy
+
+
+class CopyOnWrite(ABC):
+    """
+    Mixin giving a table copy-on-write snapshots.
+
+    Tables call `_unshare` before every write, and say which arrays to copy
+    through `_copy_arrays`.
+    """
+
+    # Whether this table is a snapshot, and so read-only.
+    frozen = False
+    # Whether this table's arrays may be shared with a snapshot.
+    _shared = False
+    # Hash methods that can't be carried over to a snapshot when overwritten
+    # on the instance. Such an override is usually a closure over the table
+    # itself (e.g. `lambda k: ord(k[0]) % dt.table_size`), so the snapshot
+    # would keep hashing for the table's array rather than its own.
+    SNAPSHOT_HASHES: tuple[str, ...] = ()
+
+    def snapshot(self) -> CopyOnWrite:
+        """
+        Returns a read-only view of the table as it is now.
+
+        :complexity: O(1), unless the table first has to finish an incremental resize.
+        :raises TypeError: when a hash method is overwritten on the instance,
+            see SNAPSHOT_HASHES. Overwrite it on a subclass instead.
+        """
+        for name in self.SNAPSHOT_HASHES:
+            if name in self.__dict__:
+                raise TypeError(f"Cannot snapshot a table whose {name} is overwritten on the instance, override it on a subclass instead.")
+        self._before_snapshot()
+        snapshot = copy(self)
+        snapshot.frozen = True
+        snapshot.recorder = None
+        self._shared = True
+        return snapshot
+
+    def _before_snapshot(self) -> None:
+        """
+        Brings the table into a state where reading it never writes to it.
+        """
+        pass
+
+    def _unshare(self) -> None:
+        """
+        Called before every write. Copies the table's arrays if a snapshot
+        may still be reading them.
+
+        :complexity: O(1) unless the arrays are copied, see `_copy_arrays`.
+        :raises TypeError: when the table is a snapshot.
+        """
+        if self.frozen:
+            raise TypeError("Snapshots are read-only.")
+        if self._shared:
+            self._copy_arrays()
+            self._shared = False
+
+    @abstractmethod
+    def _copy_arrays(self) -> None:
+        """
+        Gives the table its own copy of every array it writes to.
+        """
+        pass
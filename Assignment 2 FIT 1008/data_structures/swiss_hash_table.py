@@ -0,0 +1,216 @@
+""" Swiss Hash Table
+
+Defines a Hash Table with the same interface as LinearProbeTable, modelled on
+SwissTable: alongside the array of entries is a compact array of control
+bytes, one per slot, holding a 7-bit tag of each entry's hash. Probing scans
+the tags a group of slots at a time and only compares keys on a tag match,
+so the table can be filled to MAX_LOAD = 7/8 rather than 1/2.
+"""
+from __future__ import annotations
+
+from typing import TypeVar
+
+from data_structures.referential_array import ArrayR
+from data_structures.hash_table import LinearProbeTable, FullError
+
+K = TypeVar('K')
+V = TypeVar('V')
+
+# Control bytes besides tags, which are all below 0x80.
+EMPTY = 0x80
+DELETED = 0xFE
+
+# 2^64 / golden ratio. Multiplying by it spreads hashes that only differ
+# in their low bits (keys differing in their last character) over the top bits.
+TAG_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+class SwissProbeTable(LinearProbeTable[K, V]):
+    """
+    Swiss Probe Table.
+
+    A key's first group starts at the same slot LinearProbeTable would probe
+    first, and its tag is the top 7 bits of its hash scrambled to 64 bits.
+    Groups are GROUP_SIZE consecutive slots, scanned with `bytearray.find`;
+    the first GROUP_SIZE - 1 control bytes are mirrored after the end of
+    the array so that no group has to wrap around.
+    A lookup stops at the first group holding an EMPTY slot.
+    Deletes leave a DELETED control byte, counted in `tombstones`.
+
+    Type Arguments:
+        - K:    Key Type. In most cases should be string.
+                Otherwise `hash` should be overwritten.
+        - V:    Value Type.
+
+    Unless stated otherwise, all methods have O(1) complexity.
+    """
+
+    MAX_LOAD = 0.875
+    GROUP_SIZE = 16
+
+    def __init__(self, sizes=None, tombstones: bool=True, probing: str="linear", incremental: bool=False) -> None:
+        """
+        Initialise the Hash Table.
+
+        :param tombstones: Ignored, deletes always leave a DELETED control byte.
+        :param probing: Ignored, groups are always probed one after another.
+        :param incremental: Not supported.
+        :raises ValueError: for an unknown strategy or incremental resizing.
+        """
+        if probing not in self.PROBING_STRATEGIES:
+            raise ValueError(f"Unknown probing strategy {probing!r}.")
+        if incremental:
+            raise ValueError("Swiss tables do not resize incrementally.")
+        super().__init__(sizes)
+        self._allocate(self.table_size)
+
+    def _allocate(self, size: int) -> None:
+        """
+        Creates an empty array and control bytes for the given size.
+
+        :complexity: O(size)
+        """
+        self.array:ArrayR[tuple[K, V, int|None]] = ArrayR(size)
+        self.group = min(self.GROUP_SIZE, size)
+        self.ctrl = bytearray([EMPTY]) * (size + self.group - 1)
+        self.tombstones = 0
+
+    def _set_ctrl(self, position: int, byte: int) -> None:
+        """
+        Sets a control byte, and its mirror if it has one.
+        """
+        self.ctrl[position] = byte
+        if position < self.group - 1:
+            self.ctrl[len(self.array) + position] = byte
+
+    def _copy_arrays(self) -> None:
+        super()._copy_arrays()
+        self.ctrl = bytearray(self.ctrl)
+
+    def _home_tag(self, key: K, key_hash: int|None, size: int) -> tuple[int, int]:
+        """
+        Returns the first slot probed for a key, and its tag.
+        A key_hash of None is only valid for the current array.
+        """
+        if key_hash is None:
+            position = self.hash(key)
+            return position, position & 0x7F
+        return key_hash % size, (key_hash * TAG_MULTIPLIER & 0xFFFFFFFFFFFFFFFF) >> 57
+
+    def _search(self, key: K, key_hash: int|None, is_insert: bool, array: ArrayR|None=None) -> int|None:
+        """
+        Probe for a key a group at a time, returning None if it is not in
+        the table and is_insert is False. Inserts of new keys return the
+        first EMPTY or DELETED slot along the way.
+
+        :complexity best: O(1) the key's first group holds it, or an empty slot.
+        :complexity worst: O(N*comp(K)) when we've searched the entire table
+        :raises FullError: When a table is full and cannot be inserted.
+        """
+        size = len(self.array)
+        start, tag = self._home_tag(key, key_hash, size)
+        group = self.group
+        ctrl = self.ctrl
+        # First free slot seen, which an insert can use.
+        free = None
+        for _ in range(0, size, group):
+            end = start + group
+            match = ctrl.find(tag, start, end)
+            while match != -1:
+                position = match - size if match >= size else match
+                if self.array[position][0] == key:
+                    return position
+                match = ctrl.find(tag, match + 1, end)
+            empty = ctrl.find(EMPTY, start, end)
+            if is_insert and free is None:
+                deleted = ctrl.find(DELETED, start, end)
+                if deleted != -1 and (empty == -1 or deleted < empty):
+                    free = deleted - size if deleted >= size else deleted
+            if empty != -1:
+                if not is_insert:
+                    return None
+                if free is None:
+                    free = empty - size if empty >= size else empty
+                return free
+            start = (start + group) % size
+
+        if is_insert and free is not None:
+            return free
+        elif is_insert:
+            raise FullError("Table is full!")
+        else:
+            return None
+
+    def _probe_length(self, key: K, key_hash: int|None) -> int:
+        """
+        probe_length for a key whose hash has already been computed.
+        Counts the groups scanned rather than the slots.
+        """
+        size = len(self.array)
+        start, tag = self._home_tag(key, key_hash, size)
+        for i in range(0, size // self.group + 1):
+            end = start + self.group
+            match = self.ctrl.find(tag, start, end)
+            while match != -1:
+                if self.array[match - size if match >= size else match][0] == key:
+                    return i + 1
+                match = self.ctrl.find(tag, match + 1, end)
+            if self.ctrl.find(EMPTY, start, end) != -1:
+                return i + 1
+            start = (start + self.group) % size
+        return size // self.group + 1
+
+    def _store(self, position: int, key: K, data: V, key_hash: int|None) -> None:
+        """
+        Stores a pair at the position returned by an inserting probe,
+        compacting the table if DELETED slots have left too few EMPTY ones.
+        """
+        item = self.array[position]
+        if item is not None and item[0] == key:
+            self.array[position] = (key, data, key_hash)
+            return
+        if self.ctrl[position] == DELETED:
+            self.tombstones -= 1
+        self.count += 1
+        self.array[position] = (key, data, key_hash)
+        self._set_ctrl(position, self._home_tag(key, key_hash, len(self.array))[1])
+        if self.tombstones and len(self) + self.tombstones > self.table_size * self.MAX_LOAD:
+            self._compact()
+
+    def _remove(self, position: int) -> None:
+        """
+        Deletes the entry at a position holding a key, leaving a DELETED
+        control byte. The table is compacted once these pass TOMBSTONE_LIMIT.
+        """
+        self.array[position] = None
+        self._set_ctrl(position, DELETED)
+        self.count -= 1
+        self.tombstones += 1
+        if self.tombstones > self.table_size * self.TOMBSTONE_LIMIT:
+            self._compact()
+
+    def _compact(self) -> None:
+        """
+        Clears all DELETED slots, keeping the current table size.
+
+        :complexity: See _rebuild.
+        """
+        if self.recorder is not None:
+            self.recorder.compactions += 1
+        self._rebuild(self.table_size)
+
+    def _rebuild(self, size: int) -> None:
+        """
+        Moves every entry into a new array of the given size.
+        Keys are only hashed again if `hash` has been overwritten.
+
+        :complexity best: O(N) No probing.
+        :complexity worst: O(N^2) Lots of probing.
+        Where N is len(self).
+        """
+        entries = list(self._entries())
+        self._allocate(size)
+        for item in entries:
+            position = self._search(item[0], item[2], True)
+            self.array[position] = item
+            self._set_ctrl(position, self._home_tag(item[0], item[2], size)[1])
@@ -0,0 +1,154 @@
+""" Hash Table Statistics
+
+Defines the counters and histograms collected by the hash tables, and the
+`Instrumented` mixin through which tables switch collection on and off.
+
+Collection is off by default. Every recording site is guarded by a single
+`self.recorder is not None` check, so a table that is not collecting pays
+only that check per operation.
+"""
+from __future__ import annotations
+
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+
+class TableStats:
+    """
+    Counters and histograms recorded by one table while collection is on.
+
+    Histograms map a value (e.g. a probe length) to how often it was seen.
+    """
+
+    def __init__(self) -> None:
+        # Operation name -> {probe length -> count}
+        self.probes: dict[str, dict[int, int]] = {}
+        self.hashes = 0
+        self.rehashes = 0
+        self.rehash_time = 0.0
+        self.compactions = 0
+        self.migrated = 0
+
+    def record_probe(self, operation: str, length: int) -> None:
+        """
+        Records how many slots (or trie levels) an operation inspected.
+        """
+        histogram = self.probes.setdefault(operation, {})
+        histogram[length] = histogram.get(length, 0) + 1
+
+    def record_rehash(self, seconds: float) -> None:
+        self.rehashes += 1
+        self.rehash_time += seconds
+
+    def as_dict(self) -> dict:
+        """
+        Returns everything recorded so far, with a mean and max per probe histogram.
+
+        :complexity: O(H) where H is the number of distinct probe lengths seen.
+        """
+        probes = {}
+        for operation, histogram in self.probes.items():
+            total = sum(histogram.values())
+            probes[operation] = {
+                "count": total,
+                "mean": sum(length * n for length, n in histogram.items()) / total,
+                "max": max(histogram),
+                "histogram": dict(sorted(histogram.items())),
+            }
+        return {
+            "probes": probes,
+            "hashes": self.hashes,
+            "rehashes": self.rehashes,
+            "rehash_time": self.rehash_time,
+            "compactions": self.compactions,
+            "migrated": self.migrated,
+        }
+
+
+class Instrumented(ABC):
+    """
+    Mixin giving a table runtime-switchable statistics.
+
+    Tables record into `self.recorder` whenever it is not None, and
+    describe their current shape through `_structure_stats`.
+    """
+
+    recorder: TableStats|None = None
+
+    def enable_stats(self) -> TableStats:
+        """
+        Starts collecting into a fresh TableStats, discarding any previous one.
+        """
+        self.recorder = TableStats()
+        return self.recorder
+
+    def disable_stats(self) -> None:
+        self.recorder = None
+
+    @contextmanager
+    def collect_stats(self) -> Iterator[TableStats]:
+        """
+        Collects statistics only within a `with` block, yielding the TableStats
+        being recorded into. Whatever was being collected before is restored after.
+        """
+        previous = self.recorder
+        recorder = self.enable_stats()
+        try:
+            yield recorder
+        finally:
+            self.recorder = previous
+
+    def stats(self) -> dict:
+        """
+        Returns the table's current shape (load factor, clustering, ...),
+        together with everything recorded so far if collection is on.
+
+        :complexity: O(N) where N is the table size, see `_structure_stats`.
+        """
+        result = {"enabled": self.recorder is not None}
+        result.update(self._structure_stats())
+        if self.recorder is not None:
+            result.update(self.recorder.as_dict())
+        return result
+
+    @abstractmethod
+    def _structure_stats(self) -> dict:
+        """
+        Describes the table's current shape, see `stats`.
+        """
+        pass
+
+    def _rehash_started(self) -> float|None:
+        """
+        Returns the time a rehash started at, if it is being recorded.
+        """
+        if self.recorder is None:
+            return None
+        return time.perf_counter()
+
+    def _rehash_finished(self, start: float|None) -> None:
+        if start is not None and self.recorder is not None:
+            self.recorder.record_rehash(time.perf_counter() - start)
+
+
+def longest_cluster(occupied: Iterable[bool]) -> int:
+    """
+    Returns the length of the longest run of occupied slots in a circular array.
+
+    :complexity: O(N) where N is the array length.
+    """
+    occupied = list(occupied)
+    longest = 0
+    run = 0
+    for slot in occupied:
+        run = run + 1 if slot else 0
+        longest = max(longest, run)
+    if longest == len(occupied):
+        return longest
+    # A run may wrap around from the end of the array to the start.
+    leading = 0
+    while occupied[leading]:
+        leading += 1
+    return max(longest, run + leading)
@@ -0,0 +1,66 @@
+""" Table Views
+
+Defines the lightweight views returned by `DoubleKeyTable.keys`, `values`
+and `items`. A view holds no copy of the table: it iterates the table's
+entries each time it is iterated, so it always reflects the current
+contents, and its length comes from counts the table already keeps.
+"""
+from __future__ import annotations
+
+from typing import Callable, Generic, Iterator, TypeVar
+
+T = TypeVar('T')
+
+
+class TableView(Generic[T]):
+    """
+    A live, read-only view over part of a table.
+
+    Changing the table while iterating a view is not supported.
+
+    Unless stated otherwise, all methods have O(1) complexity.
+    """
+
+    def __init__(self, entries: Callable[[], Iterator[T]], length: Callable[[], int], contains: Callable[[T], bool]|None=None) -> None:
+        """
+        :param entries: Returns a fresh iterator over the view's elements.
+        :param length: Returns how many elements the view has.
+        :param contains: Membership test, if the table has a faster one
+            than iterating every element.
+        """
+        self._entries = entries
+        self._length = length
+        self._contains = contains
+
+    def __iter__(self) -> Iterator[T]:
+        """
+        :complexity: O(N) to iterate fully, where N is the size of the tables viewed.
+        """
+        return self._entries()
+
+    def __len__(self) -> int:
+        """
+        :complexity: See the table's count of what is viewed.
+        """
+        return self._length()
+
+    def __contains__(self, item: T) -> bool:
+        """
+        :complexity: See the table's lookup, otherwise O(N) as for iterating.
+        """
+        if self._contains is not None:
+            return self._contains(item)
+        return any(element == item for element in self)
+
+    def __eq__(self, other: object) -> bool:
+        """
+        Views equal other views, lists and tuples with the same elements in the same order.
+
+        :complexity: O(N) as for iterating.
+        """
+        if not isinstance(other, (TableView, list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)!r})"
@@ -1,35 +1,97 @@
 from __future__ import annotations
 
-from typing import Generic, TypeVar, Iterator
-from data_structures.hash_table import LinearProbeTable, FullError
+from typing import Generic, TypeVar, Iterator, Iterable
+from data_structures.hash_table import LinearProbeTable, FullError, TOMBSTONE, MISSING
 from data_structures.referential_array import ArrayR
+from data_structures.table_stats import Instrumented, longest_cluster
+from data_structures.key_codecs import KeyCodec, STR_CODEC
+from data_structures.table_views import TableView
+from data_structures.snapshots import CopyOnWrite
+from data_structures.bloom_filter import CountingBloomFilter
 
 K1 = TypeVar('K1')
 K2 = TypeVar('K2')
 V = TypeVar('V')
 
-class DoubleKeyTable(Generic[K1, K2, V]):
+class DoubleKeyTable(Instrumented, CopyOnWrite, Generic[K1, K2, V]):
     """
     Double Hash Table.
 
+    Statistics can be collected at runtime, see `Instrumented`.
+    Probe lengths are recorded for the top-level table under the operation
+    name, and for the internal table under the operation name plus " inner".
+
+    `snapshot()` returns a read-only copy-on-write view, see `CopyOnWrite`.
+    Internal tables are shared with snapshots until they are next written
+    to, when the table copies just that internal table. Each internal table
+    records the `epoch` it was created in; `snapshot()` starts a new epoch,
+    so any internal table from an earlier one may be shared.
+
+    Keys are stored in the form given by each key's codec (strings by
+    default), see `data_structures.key_codecs`.
+
+    With `bloom`, the table keeps a counting Bloom filter of every key pair,
+    see `data_structures.bloom_filter`. Lookups of most pairs that aren't in
+    the table are then rejected without probing either level, and the
+    filter's false-positive rate is reported in `stats()`.
+
     Type Arguments:
         - K1:   1st Key Type. In most cases should be string.
-                Otherwise `hash1` should be overwritten.
+                Otherwise `hash1` should be overwritten, or key1_codec given.
         - K2:   2nd Key Type. In most cases should be string.
-                Otherwise `hash2` should be overwritten.
+                Otherwise `hash2` should be overwritten, or key2_codec given.
         - V:    Value Type.
 
     Unless stated otherwise, all methods have O(1) complexity.
     """
 
-    # No test case should exceed 1 million entries.
+    # Tables built without explicit sizes keep growing past the end of this
+    # list, see `LinearProbeTable._size_at`.
     TABLE_SIZES = [5, 13, 29, 53, 97, 193, 389, 769, 1543, 3079, 6151, 12289, 24593, 49157, 98317, 196613, 393241, 786433, 1572869]
 
-    HASH_BASE = 31
+    HASH_MODULUS = LinearProbeTable.HASH_MODULUS
+
+    # See `CopyOnWrite.SNAPSHOT_HASHES`.
+    SNAPSHOT_HASHES = ("hash1",)
+
+    # Old top-level slots moved across per operation during an incremental resize.
+    MIGRATE_STEP = LinearProbeTable.MIGRATE_STEP
+
+    # See `LinearProbeTable`. The top-level table grows once it is half full.
+    TOMBSTONE_LIMIT = LinearProbeTable.TOMBSTONE_LIMIT
+    SHRINK_LOAD = LinearProbeTable.SHRINK_LOAD
+
+    _size_at = LinearProbeTable._size_at
+
+    # Key pairs a new Bloom filter is sized for. It is rebuilt twice as
+    # large whenever the table outgrows it.
+    BLOOM_CAPACITY = 64
 
-    def __init__(self, sizes:list|None=None, internal_sizes:list|None=None) -> None:
+    def __init__(self, sizes:list|None=None, internal_sizes:list|None=None, tombstones:bool=False, probing:str="linear", incremental:bool=False, internal_table:type[LinearProbeTable]=LinearProbeTable, key1_codec:KeyCodec=STR_CODEC, key2_codec:KeyCodec=STR_CODEC, bloom:bool=False) -> None:
+        """
+        :param tombstones: Whether both levels delete by leaving tombstones.
+            See `LinearProbeTable`.
+        :param probing: Probing strategy for both the top-level table and
+            the internal tables. See `LinearProbeTable.PROBING_STRATEGIES`.
+        :param incremental: Resize both levels incrementally, see `LinearProbeTable`.
+            The top-level table needs the default `hash1` for this.
+        :param internal_table: The table type used for the internal tables,
+            LinearProbeTable or any subclass with the same constructor,
+            such as CuckooHashTable.
+        :param key1_codec: How top-level keys are stored and hashed.
+        :param key2_codec: How internal keys are stored and hashed.
+        :param bloom: Whether to keep a Bloom filter of every key pair.
+        :raises ValueError: for an unknown strategy, or Robin Hood with tombstones.
+        """
+        if probing not in LinearProbeTable.PROBING_STRATEGIES:
+            raise ValueError(f"Unknown probing strategy {probing!r}.")
+        if probing == "robin_hood" and tombstones:
+            raise ValueError("Robin Hood probing cannot delete with tombstones.")
         if sizes is not None:
             self.TABLE_SIZES = sizes
+        # Only the default sizes are extended, explicit sizes are a hard limit.
+        self.unbounded = sizes is None
+        self.internal_unbounded = sizes is None and internal_sizes is None
         if internal_sizes is not None:
             self.INTERNAL_SIZES = internal_sizes
         else:
@@ -37,6 +99,88 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         self.size_index = 0
         self.array:ArrayR[LinearProbeTable[K2, V]|None] = ArrayR(self.TABLE_SIZES[self.size_index])
         self.count = 0
+        self.tombstones = tombstones
+        # Tombstones in the current top-level array, left by deleting top-level keys.
+        self.outer_tombstones = 0
+        self.probing = probing
+        self.incremental = incremental
+        self.internal_table = internal_table
+        self.key1_codec = key1_codec
+        self.key2_codec = key2_codec
+        # The top-level array being migrated from during an incremental
+        # resize, and how many of its slots have been moved across so far.
+        self.old_array:ArrayR[tuple[K1, LinearProbeTable[K2, V], int|None]|None]|None = None
+        self.migrated = 0
+        self.epoch = 0
+        self.bloom = CountingBloomFilter(self.BLOOM_CAPACITY) if bloom else None
+
+    @classmethod
+    def from_items(cls, items: Iterable[tuple[tuple[K1, K2], V]], sizes:list|None=None, internal_sizes:list|None=None, tombstones:bool=False, probing:str="linear", incremental:bool=False, internal_table:type[LinearProbeTable]=LinearProbeTable, key1_codec:KeyCodec=STR_CODEC, key2_codec:KeyCodec=STR_CODEC, bloom:bool=False) -> DoubleKeyTable[K1, K2, V]:
+        """
+        Builds a table from ((key1, key2), value) pairs.
+
+        Pairs are first grouped by key1, so that the top-level table and every
+        internal table can be sized for their final number of keys, and then
+        filled in a single pass with no rehashing.
+        Later pairs overwrite earlier ones with the same keys.
+
+        :complexity: O(N*hash(K)) with no probing, where N is len(items).
+        """
+        table = cls(sizes, internal_sizes, tombstones, probing, incremental, internal_table, key1_codec, key2_codec, bloom)
+        groups = table._group_by_outer(items)
+
+        table.reserve(len(groups))
+        for key1, pairs, _ in groups._entries():
+            key_hash = table._outer_key_hash(key1)
+            position1 = table._outer_probe(key1, True, key_hash=key_hash)
+            sub_table = table._new_sub_table()
+            sub_table.reserve(len(pairs))
+            for key2, value in pairs:
+                sub_table[key2] = value
+            table._place_outer((key1, sub_table, key_hash), position1)
+            table.count += 1
+        if table.bloom is not None:
+            table._rebuild_bloom(max(table.BLOOM_CAPACITY, table._pair_count()))
+        return table
+
+    def _group_by_outer(self, items: Iterable[tuple[tuple[K1, K2], object]]) -> LinearProbeTable[K1, list[tuple[K2, object]]]:
+        """
+        Groups ((key1, key2), payload) pairs by key1, encoding both keys.
+        Returns a table mapping each key1 to its (key2, payload) pairs, in order.
+
+        :complexity: O(N*hash(K1)) where N is the number of pairs.
+        """
+        groups = LinearProbeTable()
+        groups.hash_key = self.key1_codec.hash_key
+        for (key1, key2), payload in items:
+            groups.setdefault(self.key1_codec.encode(key1), []).append((self.key2_codec.encode(key2), payload))
+        return groups
+
+    def reserve(self, n: int) -> None:
+        """
+        Grows the top-level table, if needed, so that it can hold n top-level
+        keys without rehashing.
+
+        :complexity: O(1) if no growth is needed, otherwise see _rehash.
+        """
+        size_index = self.size_index
+        while n > self.TABLE_SIZES[size_index] / 2 and self._size_at(size_index + 1) is not None:
+            size_index += 1
+        if size_index > self.size_index:
+            self._unshare()
+            start = self._rehash_started()
+            self.size_index = size_index
+            self._rebuild()
+            self._rehash_finished(start)
+
+    def hash_key(self, key: K1) -> int:
+        """
+        Hash a key independently of the current table size, using key1_codec.
+        For strings this is the same scheme as `LinearProbeTable.hash_key`.
+
+        :complexity: O(len(key)) for strings, O(1) for integers.
+        """
+        return self.key1_codec.hash_key(key)
 
     def hash1(self, key: K1) -> int:
         """
@@ -44,13 +188,7 @@ class DoubleKeyTable(Generic[K1, K2, V]):
 
         :complexity: O(len(key))
         """
-
-        value = 0
-        a = 31415
-        for char in key:
-            value = (ord(char) + a * value) % self.table_size
-            a = a * self.HASH_BASE % (self.table_size - 1)
-        return value
+        return self.hash_key(key) % self.table_size
 
     def hash2(self, key: K2, sub_table: LinearProbeTable[K2, V]) -> int:
         """
@@ -58,57 +196,333 @@ class DoubleKeyTable(Generic[K1, K2, V]):
 
         :complexity: O(len(key))
         """
+        return sub_table.hash_key(key) % sub_table.table_size
 
-        value = 0
-        a = 31415
-        for char in key:
-            value = (ord(char) + a * value) % sub_table.table_size
-            a = a * self.HASH_BASE % (sub_table.table_size - 1)
-        return value
+    def _hash1_overridden(self) -> bool:
+        """
+        Whether `hash1` has been overwritten, on the class or the instance.
+        """
+        return "hash1" in self.__dict__ or type(self).hash1 is not DoubleKeyTable.hash1
+
+    def _hash2_overridden(self) -> bool:
+        """
+        Whether `hash2` has been overwritten. If it hasn't, the internal tables
+        use their own (cached) hashing, which agrees with `hash2`.
+        """
+        return "hash2" in self.__dict__ or type(self).hash2 is not DoubleKeyTable.hash2
+
+    def _outer_key_hash(self, key1: K1) -> int|None:
+        """
+        Returns the cacheable hash of a top-level key, or None if `hash1` has
+        been overwritten (in which case positions can only come from `hash1`).
+
+        :complexity: O(len(key1))
+        """
+        if self._hash1_overridden():
+            return None
+        return self.hash_key(key1)
+
+    def _outer_home(self, key1: K1, key_hash: int|None, size: int) -> int:
+        """
+        Returns the first position probed for a top-level key in an array of
+        the given size. A key_hash of None is only valid for the current array.
+        """
+        if key_hash is None:
+            return self.hash1(key1)
+        return key_hash % size
+
+    def _outer_distance(self, item: tuple[K1, LinearProbeTable[K2, V], int|None], position1: int, size: int) -> int:
+        """
+        Returns how far along a top-level array an entry sits from its home position.
+        """
+        return (position1 - self._outer_home(item[0], item[2], size)) % size
+
+    def _outer_step(self, key1: K1, key_hash: int|None, size: int) -> tuple[int, int]:
+        """
+        Returns the first step and the step increment of the top-level
+        probe sequence. See `LinearProbeTable._step`.
+        """
+        if self.probing == "quadratic":
+            return 1, 2
+        elif self.probing == "double":
+            if key_hash is None:
+                key_hash = self.hash_key(key1)
+            return 1 + (key_hash // size) % max(size - 1, 1), 0
+        return 1, 0
+
+    def _outer_find(self, key1: K1, is_insert: bool) -> int:
+        """
+        Like _outer_probe, but during an incremental resize it also migrates.
+        A key still in the old array is moved across (with its internal
+        table) first, so the position returned is always in self.array.
+
+        :raises KeyError: When the key is not in the table, but is_insert is False.
+        :raises FullError: When a table is full and cannot be inserted.
+        """
+        position1 = self._outer_locate(key1, is_insert)
+        if position1 is None:
+            raise KeyError(key1)
+        return position1
+
+    def _outer_locate(self, key1: K1, is_insert: bool) -> int|None:
+        """
+        _outer_find, returning None rather than raising when the key is not in the table.
+
+        :raises FullError: When a table is full and cannot be inserted.
+        """
+        if self.old_array is None:
+            return self._outer_search(key1, is_insert)
+        self._migrate(self.MIGRATE_STEP)
+        position1 = self._outer_search(key1, True)
+        if self.old_array is not None and not self._outer_holds(position1, key1):
+            old_position = self._outer_search(key1, False, self.old_array)
+            if old_position is not None:
+                self._place_outer(self.old_array[old_position], position1)
+                self.old_array[old_position] = TOMBSTONE
+                return position1
+        if not is_insert and not self._outer_holds(position1, key1):
+            return None
+        return position1
+
+    def _outer_probe(self, key1, is_insert, array:ArrayR|None=None, key_hash:int|None=None) -> int:
+        """
+        Find the position of a top-level key, using the table's probing strategy.
+        Probes self.array unless another array is given. The key's cached
+        hash (see `_outer_key_hash`) is computed unless it is given.
 
-    def _outer_probe(self, key1, is_insert) -> int:
+        For Robin Hood probing, an insert of a new key returns the position
+        it should take over, which may still hold another entry.
 
-        position1 = self.hash1(key1)
-        for _ in range(self.table_size):
-            if self.array[position1] is None:
+        :raises KeyError: When the key is not in the table, but is_insert is False.
+        :raises FullError: When a table is full and cannot be inserted.
+        """
+        position1 = self._outer_search(key1, is_insert, array, key_hash)
+        if position1 is None:
+            raise KeyError(key1)
+        return position1
+
+    def _outer_search(self, key1: K1, is_insert: bool, array:ArrayR|None=None, key_hash:int|None=None) -> int|None:
+        """
+        _outer_probe, returning None rather than raising when the key is not in the table.
+
+        :raises FullError: When a table is full and cannot be inserted.
+        """
+        if array is None:
+            array = self.array
+        if key_hash is None:
+            key_hash = self._outer_key_hash(key1)
+        size = len(array)
+        position1 = self._outer_home(key1, key_hash, size)
+        step, increment = self._outer_step(key1, key_hash, size)
+        robin_hood = self.probing == "robin_hood"
+        # First tombstone seen, which an insert can reuse.
+        free = None
+        for i in range(size):
+            if array[position1] is None:
                 # Empty spot. Am I upserting or retrieving?
                 if is_insert:
-                    return position1
+                    return position1 if free is None else free
                 else:
-                    raise KeyError(key1)
-            elif self.array[position1][0] == key1:
+                    return None
+            elif array[position1] is TOMBSTONE:
+                if free is None:
+                    free = position1
+            elif array[position1][0] == key1:
                 return position1
-            else:
-                # Taken by something else. Time to linear probe.
-                position1 = (position1 + 1) % self.table_size
+            elif robin_hood and self._outer_distance(array[position1], position1, size) < i:
+                # The key would have displaced this entry, so it isn't here.
+                if is_insert:
+                    return position1
+                else:
+                    return None
+            # Taken by something else. Time to probe.
+            position1 = (position1 + step) % size
+            step += increment
 
-        if is_insert:
+        if is_insert and free is not None:
+            return free
+        elif is_insert:
             raise FullError("Table is full!")
         else:
-            raise KeyError(key1)
+            return None
+
+    def _outer_probe_length(self, key1: K1) -> int:
+        """
+        Returns how many slots of the current top-level array are inspected
+        to look up a top-level key, whether or not it is in the table.
+        """
+        key_hash = self._outer_key_hash(key1)
+        position1 = self._outer_home(key1, key_hash, self.table_size)
+        step, increment = self._outer_step(key1, key_hash, self.table_size)
+        for i in range(self.table_size):
+            item = self.array[position1]
+            if item is None:
+                return i + 1
+            elif item is not TOMBSTONE:
+                if item[0] == key1:
+                    return i + 1
+                if self.probing == "robin_hood" and self._outer_distance(item, position1, self.table_size) < i:
+                    return i + 1
+            position1 = (position1 + step) % self.table_size
+            step += increment
+        return self.table_size
+
+    def _record_probes(self, operation: str, key1: K1, key2: K2) -> None:
+        """
+        Records the probe lengths of an operation at both levels.
+        """
+        self.recorder.record_probe(operation, self._outer_probe_length(key1))
+        position1 = self._outer_search(key1, False)
+        if position1 is None:
+            return
+        self.recorder.record_probe(operation + " inner", self.array[position1][1].probe_length(key2))
 
     def _linear_probe(self, key1: K1, key2: K2, is_insert: bool) -> tuple[int, int]:
         """
-        Find the correct position for this key in the hash table using linear probing.
+        Find the correct position for this key in the hash table, using the
+        table's probing strategy (linear probing by default) at both levels.
 
         :raises KeyError: When the key pair is not in the table, but is_insert is False.
         :raises FullError: When a table is full and cannot be inserted.
         """
-        position1 = self._outer_probe(key1, is_insert)
+        self._unshare()
+        position1 = self._outer_find(key1, is_insert)
 
-        if self.array[position1] is None:
+        if not self._outer_holds(position1, key1):
             if is_insert:
-                self.array[position1] = (key1, LinearProbeTable(self.INTERNAL_SIZES))
-                self.array[position1][1].hash = lambda k: self.hash2(k, self.array[position1][1])
-                position2 = self.array[position1][1].hash(key2)
+                sub_table = self._new_sub_table()
+                self._place_outer((key1, sub_table, self._outer_key_hash(key1)), position1)
+                position2 = sub_table.hash(key2)
             else:
                 raise KeyError(key1, key2)
         else:
-            position2 = self.array[position1][1]._linear_probe(key2, is_insert)
+            position2 = self._own_sub_table(position1)._linear_probe(key2, is_insert)
 
         return (position1, position2)
     
 
+    def _new_sub_table(self) -> LinearProbeTable[K2, V]:
+        """
+        Creates an empty internal table, hashing with key2_codec,
+        or with `hash2` if it has been overwritten.
+        """
+        sizes = None if self.internal_unbounded else self.INTERNAL_SIZES
+        return self._bind_sub_table(self.internal_table(sizes, self.tombstones, self.probing, self.incremental))
+
+    def _bind_sub_table(self, sub_table: LinearProbeTable[K2, V]) -> LinearProbeTable[K2, V]:
+        """
+        Sets up an internal table's hashing and marks it as belonging to the current epoch.
+        """
+        sub_table.hash_key = self.key2_codec.hash_key
+        if self._hash2_overridden():
+            sub_table.hash = lambda k: self.hash2(k, sub_table)
+        sub_table.epoch = self.epoch
+        return sub_table
+
+    def _own_sub_table(self, position1: int) -> LinearProbeTable[K2, V]:
+        """
+        Returns the internal table at a top-level position, ready to be
+        written to: one that may be shared with a snapshot is first replaced
+        by a copy. The top-level array must already be unshared.
+
+        :complexity: O(1), or O(N) to copy an internal table of size N.
+        """
+        key1, sub_table, key_hash = self.array[position1]
+        if sub_table.epoch != self.epoch:
+            sub_table = self._bind_sub_table(sub_table.copy())
+            self.array[position1] = (key1, sub_table, key_hash)
+        return sub_table
+
+    def _sub_get(self, sub_table: LinearProbeTable[K2, V], key2: K2, default: V|None) -> V|None:
+        """
+        Looks up an encoded key in an internal table, without moving any of
+        its entries if it may be shared with a snapshot.
+        """
+        if sub_table.epoch != self.epoch:
+            return sub_table._peek(key2, default)
+        return sub_table.get(key2, default)
+
+    def snapshot(self) -> DoubleKeyTable[K1, K2, V]:
+        """
+        Returns a read-only view of the table as it is now, sharing every
+        internal table with it. See `CopyOnWrite`.
+
+        :complexity: O(1), unless the table first has to finish an incremental resize.
+        """
+        snapshot = super().snapshot()
+        # Every internal table is shared as far as the snapshot is concerned.
+        snapshot.epoch = -1
+        if self.bloom is not None:
+            snapshot.bloom = self.bloom.view()
+        if not self.frozen:
+            self.epoch += 1
+        return snapshot
+
+    def _before_snapshot(self) -> None:
+        """
+        Finishes any incremental resize of the top-level table, since lookups
+        during one move entries. Internal tables mid-resize are only read
+        through `_sub_get` while shared, so they can be left as they are.
+        """
+        self._finish_migration()
+
+    def _copy_arrays(self) -> None:
+        """
+        Gives the table its own top-level array and Bloom filter counters.
+        Internal tables are copied one at a time, when they are written to.
+
+        :complexity: O(N) where N is self.table_size.
+        """
+        self.array = self.array.copy()
+        if self.old_array is not None:
+            self.old_array = self.old_array.copy()
+        if self.bloom is not None:
+            self.bloom.copy_counters()
+
+    def _outer_holds(self, position1: int, key1: K1) -> bool:
+        """
+        Whether the top-level slot at a probed position holds the given key.
+        """
+        item = self.array[position1]
+        return item is not None and item is not TOMBSTONE and item[0] == key1
+
+    def _place_outer(self, item: tuple[K1, LinearProbeTable[K2, V], int|None], position1: int) -> None:
+        """
+        Stores a new top-level entry at the position returned by an inserting probe.
+        Under Robin Hood probing, any entry already there is displaced further along.
+
+        :raises FullError: When displaced entries have no empty slot to end in.
+        """
+        if self.array[position1] is TOMBSTONE:
+            self.outer_tombstones -= 1
+        if self.probing == "robin_hood":
+            end = LinearProbeTable._cluster_end(self.array, position1)
+            distance = self._outer_distance(item, position1, self.table_size)
+            while position1 != end:
+                resident = self.array[position1]
+                resident_distance = self._outer_distance(resident, position1, self.table_size)
+                if resident_distance < distance:
+                    self.array[position1] = item
+                    item, distance = resident, resident_distance
+                position1 = (position1 + 1) % self.table_size
+                distance += 1
+        self.array[position1] = item
+
+    def _outer_entries(self) -> Iterator[tuple[K1, LinearProbeTable[K2, V], int|None]]:
+        """
+        Yields every (key1, internal table, key hash) entry in the top-level table,
+        including those not yet migrated out of an old array.
+        """
+        for x in range(self.table_size):
+            item = self.array[x]
+            if item is not None and item is not TOMBSTONE:
+                yield item
+        if self.old_array is not None:
+            for x in range(self.migrated, len(self.old_array)):
+                item = self.old_array[x]
+                if item is not None and item is not TOMBSTONE:
+                    yield item
+
     def iter_keys(self, key:K1|None=None) -> Iterator[K1|K2]:
         """
         key = None:
@@ -117,30 +531,50 @@ class DoubleKeyTable(Generic[K1, K2, V]):
             Returns an iterator of all keys in the bottom-hash-table for k.
         """
         if key == None:
-            for x in range(self.table_size):
-                if self.array[x] is not None:
-                    yield self.array[x][0]
+            for item in self._outer_entries():
+                yield item[0]
         else:
-            pos = self._outer_probe(key, False)
-            for x in range(self.array[pos][1].table_size):
-                if self.array[pos][1].array[x] is not None:
-                    yield self.array[pos][1].array[x][0]
+            pos = self._outer_find(self.key1_codec.encode(key), False)
+            for item in self.array[pos][1]._entries():
+                yield item[0]
 
-    def keys(self, key:K1|None=None) -> list[K1|K2]:
+    def _outer_slot(self, key1: K1, is_insert: bool) -> int|None:
         """
-        key = None: returns all top-level keys in the table.
-        key = x: returns all bottom-level keys for top-level key x.
+        Returns the position of a top-level key, or None if it isn't in the table.
+        When inserting, a missing key is given a new, empty internal table.
+
+        :raises FullError: When a table is full and cannot be inserted.
+        """
+        position1 = self._outer_locate(key1, is_insert)
+        if position1 is not None and not self._outer_holds(position1, key1):
+            self._place_outer((key1, self._new_sub_table(), self._outer_key_hash(key1)), position1)
+        return position1
+
+    def keys(self, key:K1|None=None, default:list|None=MISSING) -> TableView[K1]|TableView[K2]:
+        """
+        key = None: returns a view of all top-level keys in the table.
+        key = x: returns a view of all bottom-level keys for top-level key x,
+            or default if x isn't in the table.
+
+        Views iterate the table without copying it, see `TableView`.
+
+        :raises KeyError: when x isn't in the table and no default is given.
         """
-        res = []
         if key == None:
-            for x in range(self.table_size):
-                if self.array[x] is not None:
-                    res.append(self.array[x][0])
-        else:
-            key = str(key)
-            pos = self._outer_probe(key, False)
-            res = self.array[pos][1].keys()
-        return res
+            return TableView(
+                lambda: (item[0] for item in self._outer_entries()),
+                self.__len__,
+                lambda key1: self._outer_slot(self.key1_codec.encode(key1), False) is not None,
+            )
+        if self._sub_table(key) is None:
+            if default is MISSING:
+                raise KeyError(key)
+            return default
+        return TableView(
+            lambda: (item[0] for item in self._inner_entries(key)),
+            lambda: self.inner_count(key),
+            lambda key2: (key, key2) in self,
+        )
 
     def iter_values(self, key:K1|None=None) -> Iterator[V]:
         """
@@ -150,47 +584,135 @@ class DoubleKeyTable(Generic[K1, K2, V]):
             Returns an iterator of all values in the bottom-hash-table for k.
         """
         if key == None:
-            for x in range(self.table_size):
-                if self.array[x] is not None:
-                    for i in range(self.array[x][1].table_size):
-                        if self.array[x][1].array[i] is not None:
-                            yield self.array[x][1].array[i][1]
+            for _, sub_table, _ in self._outer_entries():
+                for item in sub_table._entries():
+                    yield item[1]
         else:
-            pos = self._outer_probe(key, False)
-            for x in range(self.array[pos][1].table_size):
-                if self.array[pos][1].array[x] is not None:
-                    yield self.array[pos][1].array[x][1]
+            pos = self._outer_find(self.key1_codec.encode(key), False)
+            for item in self.array[pos][1]._entries():
+                yield item[1]
 
-    def values(self, key:K1|None=None) -> list[V]:
+    def values(self, key:K1|None=None, default:list|None=MISSING) -> TableView[V]:
         """
-        key = None: returns all values in the table.
-        key = x: returns all values for top-level key x.
+        key = None: returns a view of all values in the table.
+        key = x: returns a view of all values for top-level key x,
+            or default if x isn't in the table.
+
+        :raises KeyError: when x isn't in the table and no default is given.
+        """
+        if key == None:
+            return TableView(
+                lambda: (item[1] for _, sub_table, _ in self._outer_entries() for item in sub_table._entries()),
+                self._pair_count,
+            )
+        if self._sub_table(key) is None:
+            if default is MISSING:
+                raise KeyError(key)
+            return default
+        return TableView(lambda: (item[1] for item in self._inner_entries(key)), lambda: self.inner_count(key))
+
+    def items(self, key:K1|None=None, default:list|None=MISSING) -> TableView[tuple[tuple[K1, K2], V]]|TableView[tuple[K2, V]]:
         """
-        res = []
+        key = None: returns a view of all ((key1, key2), value) pairs in the table.
+        key = x: returns a view of all (key2, value) pairs for top-level key x,
+            or default if x isn't in the table.
 
+        :raises KeyError: when x isn't in the table and no default is given.
+        """
         if key == None:
-            for x in range(self.table_size):
-                if self.array[x] is not None:
-                    res.extend(self.array[x][1].values())
-        else:
-            key = str(key)
-            pos = self._outer_probe(key, False)
-            res = self.array[pos][1].values()
-        return res
-    
-    
+            return TableView(
+                lambda: (((key1, item[0]), item[1]) for key1, sub_table, _ in self._outer_entries() for item in sub_table._entries()),
+                self._pair_count,
+            )
+        if self._sub_table(key) is None:
+            if default is MISSING:
+                raise KeyError(key)
+            return default
+        return TableView(lambda: ((item[0], item[1]) for item in self._inner_entries(key)), lambda: self.inner_count(key))
+
+    def inner_count(self, key: K1) -> int:
+        """
+        Returns how many bottom-level keys a top-level key has, or 0 if it
+        isn't in the table. Internal tables keep their own count, so this
+        never iterates them.
+
+        :complexity: See linear probe.
+        """
+        sub_table = self._sub_table(key)
+        return 0 if sub_table is None else len(sub_table)
+
+    def _sub_table(self, key: K1) -> LinearProbeTable[K2, V]|None:
+        """
+        Returns the internal table for a (not yet encoded) top-level key,
+        or None if it isn't in the table.
+        """
+        position1 = self._outer_slot(self.key1_codec.encode(key), False)
+        if position1 is None:
+            return None
+        return self.array[position1][1]
+
+    def _inner_entries(self, key: K1) -> Iterator[tuple[K2, V, int|None]]:
+        """
+        Yields every entry in the internal table for a (not yet encoded)
+        top-level key, or nothing if it isn't in the table.
+        """
+        sub_table = self._sub_table(key)
+        if sub_table is not None:
+            yield from sub_table._entries()
+
+    def _pair_count(self) -> int:
+        """
+        Returns how many key pairs the table holds in total.
+
+        :complexity: O(N) where N is the number of top-level keys.
+        """
+        return sum(len(sub_table) for _, sub_table, _ in self._outer_entries())
+
+    def _bloom_add(self, key1: K1, key2: K2) -> None:
+        """
+        Adds a new (encoded) key pair to the Bloom filter,
+        rebuilding it twice as large once the table outgrows it.
+
+        :complexity: O(1) amortised, see `_rebuild_bloom`.
+        """
+        self.bloom.add((key1, key2))
+        if self.bloom.is_full():
+            self._rebuild_bloom(2 * self.bloom.capacity)
+
+    def _bloom_missed(self) -> None:
+        """
+        Counts a lookup that the Bloom filter let through but the table missed.
+        """
+        if self.bloom is not None:
+            self.bloom.false_positives += 1
+
+    def _rebuild_bloom(self, capacity: int) -> None:
+        """
+        Replaces the Bloom filter with one sized for capacity key pairs,
+        holding every pair in the table.
+
+        :complexity: O(capacity + N) where N is the number of key pairs.
+        """
+        self.bloom = self.bloom.resized(capacity, (
+            (key1, key2)
+            for key1, sub_table, _ in self._outer_entries()
+            for key2, _, _ in sub_table._entries()
+        ))
+
     def __contains__(self, key: tuple[K1, K2]) -> bool:
         """
         Checks to see if the given key is in the Hash Table
 
         :complexity: See linear probe.
         """
-        try:
-            _ = self[key]
-        except KeyError:
+        key1, key2 = self.key1_codec.encode(key[0]), self.key2_codec.encode(key[1])
+        if self.bloom is not None and not self.bloom.might_contain((key1, key2)):
             return False
-        else:
-            return True
+        position1 = self._outer_slot(key1, False)
+        found = position1 is not None and self._sub_get(self.array[position1][1], key2, MISSING) is not MISSING
+        if not found:
+            self._bloom_missed()
+        return found
 
     def __getitem__(self, key: tuple[K1, K2]) -> V:
         """
@@ -198,24 +720,188 @@ class DoubleKeyTable(Generic[K1, K2, V]):
 
         :raises KeyError: when the key doesn't exist.
         """
-        key1, key2 = str(key[0]), str(key[1])
-        position = self._linear_probe(key1, key2, False)
-        return self.array[position][1]
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: tuple[K1, K2], default: V|None=None) -> V|None:
+        """
+        Returns the value at a key pair, or default if it isn't in the table.
+
+        :complexity: See linear probe.
+        """
+        key1, key2 = self.key1_codec.encode(key[0]), self.key2_codec.encode(key[1])
+        if self.bloom is not None and not self.bloom.might_contain((key1, key2)):
+            return default
+        if self.recorder is not None:
+            self._record_probes("get", key1, key2)
+        position1 = self._outer_slot(key1, False)
+        value = MISSING if position1 is None else self._sub_get(self.array[position1][1], key2, MISSING)
+        if value is MISSING:
+            self._bloom_missed()
+            return default
+        return value
 
     def __setitem__(self, key: tuple[K1, K2], data: V) -> None:
         """
         Set an (key, value) pair in our hash table.
         """
-        key1, key2 = str(key[0]), str(key[1])
-        position1, position2 = self._linear_probe(key1, key2, True)
+        key1, key2 = self.key1_codec.encode(key[0]), self.key2_codec.encode(key[1])
+        self._unshare()
+        if self.recorder is not None:
+            self._record_probes("set", key1, key2)
+        sub_table = self._own_sub_table(self._outer_slot(key1, True))
+
+        before = len(sub_table)
+        if before == 0:
+            self.count += 1
+
+        sub_table[key2] = data
+        if self.bloom is not None and len(sub_table) > before:
+            self._bloom_add(key1, key2)
+
+        if len(self) > self.table_size / 2:
+            self._rehash()
+
+    def setdefault(self, key: tuple[K1, K2], default: V|None=None) -> V|None:
+        """
+        Returns the value at a key pair, first inserting default if it isn't in the table.
+
+        :complexity: See linear probe.
+        """
+        key1, key2 = self.key1_codec.encode(key[0]), self.key2_codec.encode(key[1])
+        self._unshare()
+        if self.recorder is not None:
+            self._record_probes("set", key1, key2)
+        sub_table = self._own_sub_table(self._outer_slot(key1, True))
 
-        if len(self.array[position1][1]) == 0:
+        before = len(sub_table)
+        if before == 0:
             self.count += 1
 
-        self.array[position1][1][key2] = data
+        value = sub_table.setdefault(key2, default)
+        if self.bloom is not None and len(sub_table) > before:
+            self._bloom_add(key1, key2)
 
         if len(self) > self.table_size / 2:
             self._rehash()
+        return value
+
+    def update(self, other: DoubleKeyTable[K1, K2, V]|Iterable[tuple[tuple[K1, K2], V]]) -> None:
+        """
+        Sets every ((key1, key2), value) pair from another table, or from an iterable of pairs.
+
+        :complexity: O(N) inserts, where N is the number of pairs.
+        """
+        if isinstance(other, DoubleKeyTable):
+            other = other.items()
+        for key, value in other:
+            self[key] = value
+
+    def get_many(self, keys: Iterable[tuple[K1, K2]], default: V|None=None) -> list[V|None]:
+        """
+        Returns the value at each key pair, in order, or default for pairs
+        that aren't in the table. Pairs are grouped by key1 so that each
+        top-level key is only probed for once.
+
+        Probe lengths are not recorded for batches.
+
+        :complexity: O(K*hash(K1) + N*hash(K2)) with no probing,
+            where K is the number of distinct key1s and N the number of pairs.
+        """
+        results = []
+        requests = []
+        for index, key in enumerate(keys):
+            results.append(default)
+            requests.append((key, index))
+        for key1, group, _ in self._group_by_outer(requests)._entries():
+            position1 = self._outer_slot(key1, False)
+            if position1 is None:
+                if self.bloom is not None:
+                    for key2, _ in group:
+                        if self.bloom.might_contain((key1, key2)):
+                            self._bloom_missed()
+                continue
+            sub_table = self.array[position1][1]
+            for key2, index in group:
+                if self.bloom is not None and not self.bloom.might_contain((key1, key2)):
+                    continue
+                value = self._sub_get(sub_table, key2, MISSING)
+                if value is MISSING:
+                    self._bloom_missed()
+                else:
+                    results[index] = value
+        return results
+
+    def set_many(self, items: Iterable[tuple[tuple[K1, K2], V]]) -> None:
+        """
+        Sets every ((key1, key2), value) pair. Pairs are grouped by key1,
+        each top-level key is probed for once (and once more if it is new),
+        and both levels grow at most once, before any pair is stored,
+        rather than rehashing partway through the batch.
+        Later pairs overwrite earlier ones with the same keys.
+
+        Probe lengths are not recorded for batches.
+
+        :complexity: See get_many, plus at most one rehash per table.
+        """
+        self._unshare()
+        sub_tables = []
+        new = []
+        for key1, group, _ in self._group_by_outer(items)._entries():
+            position1 = self._outer_slot(key1, False)
+            if position1 is None:
+                new.append((key1, group))
+            else:
+                sub_tables.append((key1, self._own_sub_table(position1), group))
+
+        # Growing only moves internal tables, so those found above stay valid.
+        self.reserve(len(self) + len(new))
+        for key1, group in new:
+            sub_table = self._new_sub_table()
+            self._place_outer((key1, sub_table, self._outer_key_hash(key1)), self._outer_find(key1, True))
+            self.count += 1
+            sub_tables.append((key1, sub_table, group))
+
+        for key1, sub_table, group in sub_tables:
+            sub_table.reserve(len(sub_table) + len(group))
+            for key2, value in group:
+                before = len(sub_table)
+                sub_table[key2] = value
+                if self.bloom is not None and len(sub_table) > before:
+                    self._bloom_add(key1, key2)
+
+    def delete_many(self, keys: Iterable[tuple[K1, K2]]) -> int:
+        """
+        Deletes every key pair that is in the table, returning how many were.
+        Pairs are grouped by key1 so that each top-level key is only probed
+        for once, and tables only shrink at the end of each group.
+
+        Probe lengths are not recorded for batches.
+
+        :complexity: See get_many, plus at most one shrink per table.
+        """
+        self._unshare()
+        deleted = 0
+        for key1, group, _ in self._group_by_outer((key, None) for key in keys)._entries():
+            position1 = self._outer_slot(key1, False)
+            if position1 is None:
+                continue
+            sub_table = self._own_sub_table(position1)
+            for key2, _ in group:
+                position2 = sub_table._locate(key2, sub_table._key_hash(key2), False)
+                if position2 is not None:
+                    sub_table._remove(position2)
+                    if self.bloom is not None:
+                        self.bloom.remove((key1, key2))
+                    deleted += 1
+            if len(sub_table) > 0:
+                sub_table.shrink()
+            else:
+                self._remove_outer(position1)
+        self.shrink()
+        return deleted
 
     def __delitem__(self, key: tuple[K1, K2]) -> None:
         """
@@ -223,41 +909,208 @@ class DoubleKeyTable(Generic[K1, K2, V]):
 
         :raises KeyError: when the key doesn't exist.
         """
-        key1, key2 = str(key[0]), str(key[1])
-        position1, position2 = self._linear_probe(key1, key2, False)
-        if self.array[position1][1].count == 1:
-            # Remove the whole cluster
-            self.array[position1] = None
-        else:
-            # Remove the element
-            del self.array[position1][1][key2]
+        self.pop(key)
+
+    def pop(self, key: tuple[K1, K2], default: V=MISSING) -> V:
+        """
+        Deletes a key pair, returning its value.
+        If it isn't in the table, returns default instead.
+
+        :raises KeyError: when the key doesn't exist and no default is given.
+        """
+        self._unshare()
+        key1, key2 = self.key1_codec.encode(key[0]), self.key2_codec.encode(key[1])
+        if self.bloom is None or self.bloom.might_contain((key1, key2)):
+            if self.recorder is not None:
+                self._record_probes("delete", key1, key2)
+            position1 = self._outer_slot(key1, False)
+            if position1 is not None:
+                sub_table = self._own_sub_table(position1)
+                position2 = sub_table._locate(key2, sub_table._key_hash(key2), False)
+                if position2 is not None:
+                    value = sub_table._value(position2)
+                    self._remove(position1, position2)
+                    if self.bloom is not None:
+                        self.bloom.remove((key1, key2))
+                    return value
+            self._bloom_missed()
+        if default is MISSING:
+            raise KeyError(key)
+        return default
+
+    def _remove(self, position1: int, position2: int) -> None:
+        """
+        Deletes the pair at the given positions of the top-level and internal tables.
+        A top-level key is deleted along with its internal table once that is
+        empty, otherwise the internal table shrinks if it has become sparse.
+        """
+        sub_table = self.array[position1][1]
+        sub_table._remove(position2)
+        if len(sub_table) > 0:
+            sub_table.shrink()
+            return
+        self._remove_outer(position1)
+        self.shrink()
+
+    def _remove_outer(self, position1: int) -> None:
+        """
+        Deletes the top-level entry at a position, the same way
+        `LinearProbeTable._remove` deletes an entry: by leaving a tombstone
+        (compacting once they pass TOMBSTONE_LIMIT), by shifting the rest of
+        a Robin Hood cluster back, or by reinserting the rest of the cluster.
 
+        :complexity best: O(1) with tombstones.
+        :complexity worst: O(N*hash(K1)) reinserting a cluster of length N.
+        """
         self.count -= 1
+        if self.tombstones or self.probing in ("quadratic", "double"):
+            self.array[position1] = TOMBSTONE
+            self.outer_tombstones += 1
+            if self.outer_tombstones > self.table_size * self.TOMBSTONE_LIMIT:
+                if self.recorder is not None:
+                    self.recorder.compactions += 1
+                self._rebuild()
+            return
+        self.array[position1] = None
+        if self.probing == "robin_hood":
+            self._outer_shift_back(position1)
+            return
         # Start moving over the cluster
         position1 = (position1 + 1) % self.table_size
+        while self.array[position1] is not None:
+            item = self.array[position1]
+            self.array[position1] = None
+            self.array[self._outer_probe(item[0], True, key_hash=item[2])] = item
+            position1 = (position1 + 1) % self.table_size
+
+    def _outer_shift_back(self, position1: int) -> None:
+        """
+        Fills the gap left by a Robin Hood delete by moving every following
+        displaced top-level entry in the cluster back one slot.
+
+        :complexity: O(N*hash(K1)) where N is the cluster length.
+        """
+        following = (position1 + 1) % self.table_size
+        while self.array[following] is not None and self._outer_distance(self.array[following], following, self.table_size) > 0:
+            self.array[position1] = self.array[following]
+            self.array[following] = None
+            position1 = following
+            following = (following + 1) % self.table_size
+
+    def shrink(self) -> bool:
+        """
+        Moves every top-level entry into a smaller array once fewer than
+        SHRINK_LOAD of half the slots are in use, returning whether it did.
+        See `LinearProbeTable.shrink`. Called after deleting a top-level key.
+
+        :complexity: O(1) if the table doesn't shrink, otherwise see _rehash.
+        """
+        if self.size_index == 0 or len(self) >= self.table_size / 2 * self.SHRINK_LOAD:
+            return False
+        size_index = self.size_index
+        while size_index > 0 and len(self) <= self.TABLE_SIZES[size_index - 1] / 4:
+            size_index -= 1
+        if size_index == self.size_index:
+            return False
+        self._unshare()
+        start = self._rehash_started()
+        self.size_index = size_index
+        self._rebuild()
+        self._rehash_finished(start)
+        return True
 
     def _rehash(self) -> None:
         """
-        Need to resize table and reinsert all values
+        Need to resize the top-level table and move every internal table across.
+        Internal tables move as they are, so only top-level keys are hashed again.
 
-        :complexity best: O(N*hash(K)) No probing.
-        :complexity worst: O(N*hash(K) + N^2*comp(K)) Lots of probing.
-        Where N is len(self)
+        For incremental tables this only allocates the new top-level array
+        and starts migrating to it, see `_migrate`.
+
+        :complexity best: O(N*hash(K1)) No probing.
+        :complexity worst: O(N*hash(K1) + N^2*comp(K1)) Lots of probing.
+        Where N is len(self), the number of top-level keys.
         """
-        old_array = self.array
-        self.size_index += 1
-        if self.size_index == len(self.TABLE_SIZES):
+        size = self._size_at(self.size_index + 1)
+        if size is None:
             # Cannot be resized further.
             return
+        start = self._rehash_started()
+        self.size_index += 1
+        if self.incremental and not self._hash1_overridden():
+            self._finish_migration()
+            self.old_array = self.array
+            self.migrated = 0
+            self.array = ArrayR(size)
+            self.outer_tombstones = 0
+        else:
+            self._rebuild()
+        self._rehash_finished(start)
+
+    def _migrate(self, slots: int) -> None:
+        """
+        Moves the next few slots of the old top-level array across to the
+        new one. Internal tables move as they are, and tombstones are left
+        behind so that probe chains through the rest of the old array stay intact.
+
+        :complexity: O(slots*hash(K1)) with no probing.
+        """
+        end = min(self.migrated + slots, len(self.old_array))
+        if self.recorder is not None:
+            self.recorder.migrated += end - self.migrated
+        for x in range(self.migrated, end):
+            item = self.old_array[x]
+            if item is not None and item is not TOMBSTONE:
+                self._place_outer(item, self._outer_probe(item[0], True, key_hash=item[2]))
+                self.old_array[x] = TOMBSTONE
+        self.migrated = end
+        if self.migrated == len(self.old_array):
+            self.old_array = None
+
+    def _finish_migration(self) -> None:
+        """
+        Completes any incremental resize in progress.
+        """
+        if self.old_array is not None:
+            self._migrate(len(self.old_array))
+
+    def _rebuild(self) -> None:
+        """
+        Moves every (key1, internal table, key hash) entry into a new top-level array
+        of size TABLE_SIZES[size_index], dropping tombstones.
+
+        :complexity: See _rehash.
+        """
+        self._finish_migration()
+        old_array = self.array
         self.array = ArrayR(self.TABLE_SIZES[self.size_index])
-        self.count = 0
+        self.outer_tombstones = 0
         for item in old_array:
-            if item is not None:
-                key1, sub_table = item
-                for item2 in sub_table.array: 
-                    if item2 is not None:
-                        (key2, value) = item2
-                        self[key1, key2] = value
+            if item is not None and item is not TOMBSTONE:
+                self._place_outer(item, self._outer_probe(item[0], True, key_hash=item[2]))
+
+    def _structure_stats(self) -> dict:
+        """
+        Describes the top-level array (see `LinearProbeTable._structure_stats`),
+        plus the mean load factor and longest cluster over all internal tables.
+
+        :complexity: O(N) where N is the total size of every array.
+        """
+        sub_tables = [sub_table for _, sub_table, _ in self._outer_entries()]
+        inner = [sub_table._structure_stats() for sub_table in sub_tables]
+        stats = {
+            "table_size": self.table_size,
+            "count": len(self),
+            "load_factor": len(self) / self.table_size,
+            "tombstones": self.outer_tombstones,
+            "longest_cluster": longest_cluster(self.array[x] is not None for x in range(self.table_size)),
+            "migrating": self.old_array is not None,
+            "inner_load_factor": sum(s["load_factor"] for s in inner) / len(inner) if inner else 0.0,
+            "inner_longest_cluster": max((s["longest_cluster"] for s in inner), default=0),
+        }
+        if self.bloom is not None:
+            stats["bloom"] = self.bloom.as_dict()
+        return stats
 
 
     @property
@@ -280,10 +1133,8 @@ class DoubleKeyTable(Generic[K1, K2, V]):
         Not required but may be a good testing tool.
         """
         result = ""
-        for item in self.array:
-            if item is not None:
-                (key1, value1) = item
-                result += "(" + str(key1) + "," + str(value1) + ")"
+        for (key1, value1, _) in self._outer_entries():
+            result += "(" + str(key1) + "," + str(value1) + ")"
         return result
 
 
@@ -0,0 +1,393 @@
+from __future__ import annotations
+
+from typing import Generic, TypeVar, Iterator, Iterable
+from data_structures.hash_table import LinearProbeTable, MISSING
+from data_structures.table_stats import Instrumented
+from data_structures.key_codecs import KeyCodec, STR_CODEC, TupleCodec
+from data_structures.table_views import TableView
+
+K1 = TypeVar('K1')
+K2 = TypeVar('K2')
+V = TypeVar('V')
+
+class FlatDoubleKeyTable(Instrumented, Generic[K1, K2, V]):
+    """
+    Flat Double Hash Table.
+
+    Has the same reading and writing interface as DoubleKeyTable, but rather
+    than one internal table per top-level key, stores:
+        - pairs:  a single LinearProbeTable keyed by (key1, key2),
+        - groups: a LinearProbeTable mapping each key1 to the list of its
+                  key2s (its chain), whose length is key1's count.
+    Top-level keys with only a few bottom-level keys then cost a short list
+    each, instead of a whole table of at least 5 slots.
+
+    The interface is reduced in other ways too: `hash1` and `hash2` cannot
+    be overwritten (give key codecs instead), there are no `internal_sizes`,
+    `internal_table` or `bloom` options, and there is no `snapshot` or
+    `shrink`.
+
+    Statistics can be collected at runtime, see `Instrumented`.
+    Probe lengths are recorded for the pairs table under the operation name.
+
+    Type Arguments:
+        - K1:   1st Key Type. In most cases should be string.
+                Otherwise key1_codec should be given.
+        - K2:   2nd Key Type. In most cases should be string.
+                Otherwise key2_codec should be given.
+        - V:    Value Type.
+
+    Unless stated otherwise, all methods have O(1) complexity.
+    """
+
+    def __init__(self, sizes:list|None=None, tombstones:bool=False, probing:str="linear", incremental:bool=False, key1_codec:KeyCodec=STR_CODEC, key2_codec:KeyCodec=STR_CODEC) -> None:
+        """
+        :param sizes: Table sizes for both the pairs and groups tables.
+        :param tombstones: See `LinearProbeTable`.
+        :param probing: See `LinearProbeTable.PROBING_STRATEGIES`.
+        :param incremental: See `LinearProbeTable`.
+        :param key1_codec: How top-level keys are stored and hashed.
+        :param key2_codec: How bottom-level keys are stored and hashed.
+        :raises ValueError: for an unknown strategy, or Robin Hood with tombstones.
+        """
+        self.key1_codec = key1_codec
+        self.key2_codec = key2_codec
+        self.pairs:LinearProbeTable[tuple[K1, K2], V] = LinearProbeTable(sizes, tombstones, probing, incremental)
+        self.pairs.hash_key = TupleCodec(key1_codec, key2_codec).hash_key
+        self.groups:LinearProbeTable[K1, list[K2]] = LinearProbeTable(sizes, tombstones, probing, incremental)
+        self.groups.hash_key = key1_codec.hash_key
+
+    @classmethod
+    def from_items(cls, items: Iterable[tuple[tuple[K1, K2], V]], sizes:list|None=None, tombstones:bool=False, probing:str="linear", incremental:bool=False, key1_codec:KeyCodec=STR_CODEC, key2_codec:KeyCodec=STR_CODEC) -> FlatDoubleKeyTable[K1, K2, V]:
+        """
+        Builds a table from ((key1, key2), value) pairs, sizing both tables
+        up front so that nothing is rehashed while inserting.
+        Later pairs overwrite earlier ones with the same keys.
+
+        :complexity: O(N*hash(K)) with no probing, where N is len(items).
+        """
+        items = list(items)
+        table = cls(sizes, tombstones, probing, incremental, key1_codec, key2_codec)
+        table.pairs.reserve(len(items))
+        table.reserve(len({key1_codec.encode(key1) for (key1, _), _ in items}))
+        for key, value in items:
+            table[key] = value
+        return table
+
+    def reserve(self, n: int) -> None:
+        """
+        Grows the groups table, if needed, so that it can hold n top-level
+        keys without rehashing.
+
+        :complexity: O(1) if no growth is needed, otherwise see `LinearProbeTable._rehash`.
+        """
+        self.groups.reserve(n)
+
+    def hash_key(self, key: K1) -> int:
+        """
+        Hash a top-level key independently of the current table size, using key1_codec.
+
+        :complexity: O(len(key)) for strings, O(1) for integers.
+        """
+        return self.key1_codec.hash_key(key)
+
+    def _pair(self, key: tuple[K1, K2]) -> tuple[K1, K2]:
+        """
+        Returns a key pair encoded by the key codecs.
+        """
+        return (self.key1_codec.encode(key[0]), self.key2_codec.encode(key[1]))
+
+    def _chain(self, key: K1) -> list[K2]|None:
+        """
+        Returns the list of bottom-level keys for a (not yet encoded)
+        top-level key, or None if it isn't in the table.
+        """
+        return self.groups.get(self.key1_codec.encode(key))
+
+    def _inner_keys(self, key: K1) -> Iterator[K2]:
+        """
+        Yields the bottom-level keys for a (not yet encoded) top-level key,
+        or nothing if it isn't in the table. The chain is looked up on each
+        call, so views built on this see the table as it is when iterated.
+        """
+        chain = self._chain(key)
+        if chain is not None:
+            yield from chain
+
+    def iter_keys(self, key:K1|None=None) -> Iterator[K1|K2]:
+        """
+        key = None:
+            Returns an iterator of all top-level keys in hash table
+        key = k:
+            Returns an iterator of all keys in the bottom-hash-table for k.
+
+        :raises KeyError: when k isn't in the table.
+        """
+        return iter(self.keys(key))
+
+    def iter_values(self, key:K1|None=None) -> Iterator[V]:
+        """
+        key = None:
+            Returns an iterator of all values in hash table
+        key = k:
+            Returns an iterator of all values in the bottom-hash-table for k.
+
+        :raises KeyError: when k isn't in the table.
+        """
+        return iter(self.values(key))
+
+    def keys(self, key:K1|None=None, default:list|None=MISSING) -> TableView[K1]|TableView[K2]:
+        """
+        key = None: returns a view of all top-level keys in the table.
+        key = x: returns a view of all bottom-level keys for top-level key x,
+            or default if x isn't in the table.
+
+        :raises KeyError: when x isn't in the table and no default is given.
+        """
+        if key == None:
+            return TableView(
+                lambda: (item[0] for item in self.groups._entries()),
+                self.__len__,
+                lambda key1: self.key1_codec.encode(key1) in self.groups,
+            )
+        if self._chain(key) is None:
+            if default is MISSING:
+                raise KeyError(key)
+            return default
+        return TableView(
+            lambda: self._inner_keys(key),
+            lambda: self.inner_count(key),
+            lambda key2: self._pair((key, key2)) in self.pairs,
+        )
+
+    def values(self, key:K1|None=None, default:list|None=MISSING) -> TableView[V]:
+        """
+        key = None: returns a view of all values in the table.
+        key = x: returns a view of all values for top-level key x,
+            or default if x isn't in the table.
+
+        :complexity: O(1) per value iterated for key = None, otherwise one
+            lookup of the pairs table per value.
+        :raises KeyError: when x isn't in the table and no default is given.
+        """
+        if key == None:
+            return TableView(lambda: (item[1] for item in self.pairs._entries()), self.pairs.__len__)
+        if self._chain(key) is None:
+            if default is MISSING:
+                raise KeyError(key)
+            return default
+        key1 = self.key1_codec.encode(key)
+        return TableView(lambda: (self.pairs[key1, key2] for key2 in self._inner_keys(key)), lambda: self.inner_count(key))
+
+    def items(self, key:K1|None=None, default:list|None=MISSING) -> TableView[tuple[tuple[K1, K2], V]]|TableView[tuple[K2, V]]:
+        """
+        key = None: returns a view of all ((key1, key2), value) pairs in the table.
+        key = x: returns a view of all (key2, value) pairs for top-level key x,
+            or default if x isn't in the table.
+
+        :complexity: See values.
+        :raises KeyError: when x isn't in the table and no default is given.
+        """
+        if key == None:
+            return TableView(lambda: ((item[0], item[1]) for item in self.pairs._entries()), self.pairs.__len__)
+        if self._chain(key) is None:
+            if default is MISSING:
+                raise KeyError(key)
+            return default
+        key1 = self.key1_codec.encode(key)
+        return TableView(lambda: ((key2, self.pairs[key1, key2]) for key2 in self._inner_keys(key)), lambda: self.inner_count(key))
+
+    def inner_count(self, key: K1) -> int:
+        """
+        Returns how many bottom-level keys a top-level key has, or 0 if it
+        isn't in the table.
+
+        :complexity: See linear probe.
+        """
+        chain = self._chain(key)
+        return 0 if chain is None else len(chain)
+
+    def __contains__(self, key: tuple[K1, K2]) -> bool:
+        """
+        Checks to see if the given key is in the Hash Table
+
+        :complexity: See linear probe.
+        """
+        return self._pair(key) in self.pairs
+
+    def __getitem__(self, key: tuple[K1, K2]) -> V:
+        """
+        Get the value at a certain key
+
+        :raises KeyError: when the key doesn't exist.
+        """
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: tuple[K1, K2], default: V|None=None) -> V|None:
+        """
+        Returns the value at a key pair, or default if it isn't in the table.
+
+        :complexity: See linear probe.
+        """
+        pair = self._pair(key)
+        key_hash = self.pairs._key_hash(pair)
+        if self.recorder is not None:
+            self.recorder.record_probe("get", self.pairs._probe_length(pair, key_hash))
+        position = self.pairs._locate(pair, key_hash, False)
+        if position is None:
+            return default
+        return self.pairs._value(position)
+
+    def __setitem__(self, key: tuple[K1, K2], data: V) -> None:
+        """
+        Set an (key, value) pair in our hash table.
+
+        :complexity: See linear probe.
+        """
+        self._set(self._pair(key), data, False)
+
+    def setdefault(self, key: tuple[K1, K2], default: V|None=None) -> V|None:
+        """
+        Returns the value at a key pair, first inserting default if it isn't in the table.
+
+        :complexity: See linear probe.
+        """
+        return self._set(self._pair(key), default, True)
+
+    def _set(self, pair: tuple[K1, K2], data: V, keep: bool) -> V:
+        """
+        Stores a value at an encoded key pair, adding key2 to key1's chain
+        if the pair is new. If keep is True, an existing value is left as it is.
+        Returns the value stored at the pair afterwards.
+        """
+        key_hash = self.pairs._key_hash(pair)
+        if self.recorder is not None:
+            self.recorder.record_probe("set", self.pairs._probe_length(pair, key_hash))
+        position = self.pairs._find(pair, key_hash, True)
+        if self.pairs._holds(position, pair):
+            if keep:
+                return self.pairs._value(position)
+        else:
+            self.groups.setdefault(pair[0], []).append(pair[1])
+        self.pairs._store(position, pair, data, key_hash)
+
+        if len(self.pairs) > self.pairs.table_size * self.pairs.MAX_LOAD:
+            self.pairs._rehash()
+        return data
+
+    def update(self, other: FlatDoubleKeyTable[K1, K2, V]|Iterable[tuple[tuple[K1, K2], V]]) -> None:
+        """
+        Sets every ((key1, key2), value) pair from another table, or from an iterable of pairs.
+
+        :complexity: O(N) inserts, where N is the number of pairs.
+        """
+        if hasattr(other, "items"):
+            other = other.items()
+        for key, value in other:
+            self[key] = value
+
+    def get_many(self, keys: Iterable[tuple[K1, K2]], default: V|None=None) -> list[V|None]:
+        """
+        Returns the value at each key pair, in order, or default for pairs
+        that aren't in the table. See `DoubleKeyTable.get_many`; here every
+        pair is a single lookup already, so there is nothing to group.
+
+        :complexity: O(N) lookups, where N is the number of pairs.
+        """
+        return [self.pairs.get(self._pair(key), default) for key in keys]
+
+    def set_many(self, items: Iterable[tuple[tuple[K1, K2], V]]) -> None:
+        """
+        Sets every ((key1, key2), value) pair, growing the pairs table at most
+        once, before any pair is stored.
+
+        :complexity: O(N) inserts, plus at most one rehash of the pairs table.
+        """
+        items = list(items)
+        self.pairs.reserve(len(self.pairs) + len(items))
+        for key, value in items:
+            self._set(self._pair(key), value, False)
+
+    def delete_many(self, keys: Iterable[tuple[K1, K2]]) -> int:
+        """
+        Deletes every key pair that is in the table, returning how many were.
+
+        :complexity: O(N) deletes, where N is the number of pairs.
+        """
+        absent = object()
+        return sum(1 for key in keys if self.pop(key, absent) is not absent)
+
+    def __delitem__(self, key: tuple[K1, K2]) -> None:
+        """
+        Deletes a (key, value) pair in our hash table.
+
+        :raises KeyError: when the key doesn't exist.
+        """
+        self.pop(key)
+
+    def pop(self, key: tuple[K1, K2], default: V=MISSING) -> V:
+        """
+        Deletes a key pair, returning its value.
+        If it isn't in the table, returns default instead.
+        A top-level key is removed along with its last bottom-level key,
+        and both tables shrink once they become sparse.
+
+        :complexity: See linear probe, plus O(C) to remove key2 from a chain of length C.
+        :raises KeyError: when the key doesn't exist and no default is given.
+        """
+        pair = self._pair(key)
+        key_hash = self.pairs._key_hash(pair)
+        if self.recorder is not None:
+            self.recorder.record_probe("delete", self.pairs._probe_length(pair, key_hash))
+        position = self.pairs._locate(pair, key_hash, False)
+        if position is None:
+            if default is MISSING:
+                raise KeyError(key)
+            return default
+        value = self.pairs._value(position)
+        self.pairs._remove(position)
+        self.pairs.shrink()
+        chain = self.groups[pair[0]]
+        chain.remove(pair[1])
+        if not chain:
+            del self.groups[pair[0]]
+            self.groups.shrink()
+        return value
+
+    def _structure_stats(self) -> dict:
+        """
+        Describes the groups table (see `LinearProbeTable._structure_stats`),
+        plus the pairs table under "pairs".
+
+        :complexity: O(N) where N is the size of both tables.
+        """
+        stats = self.groups._structure_stats()
+        stats["pairs"] = self.pairs._structure_stats()
+        return stats
+
+    @property
+    def table_size(self) -> int:
+        """
+        Return the current size of the groups table (different from the length)
+        """
+        return self.groups.table_size
+
+    def __len__(self) -> int:
+        """
+        Returns number of top-level keys in the hash table
+        """
+        return len(self.groups)
+
+    def __str__(self) -> str:
+        """
+        String representation.
+
+        Not required but may be a good testing tool.
+        """
+        result = ""
+        for ((key1, key2), value) in self.items():
+            result += "(" + str(key1) + "," + str(key2) + "," + str(value) + ")"
+        return result
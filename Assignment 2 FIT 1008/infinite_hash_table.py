@@ -1,20 +1,40 @@
 from __future__ import annotations
-from typing import Generic, TypeVar
+from typing import Generic, TypeVar, Iterable, Iterator
 
-from data_structures.referential_array import ArrayR
-from data_structures.hash_table import LinearProbeTable, FullError
+from data_structures.array_node import ArrayNode
+from data_structures.bitmap_node import BitmapNode
+from data_structures.hash_table import LinearProbeTable, FullError, MISSING
+from data_structures.table_stats import Instrumented
+from data_structures.bloom_filter import CountingBloomFilter
 
 K = TypeVar("K")
 V = TypeVar("V")
 List = TypeVar("List")
 
-class InfiniteHashTable(Generic[K, V]):
+class InfiniteHashTable(Instrumented, Generic[K, V]):
     """
     Infinite Hash Table.
 
+    Statistics can be collected at runtime, see `Instrumented`.
+    Probe lengths count the levels of the table visited.
+
+    With `bloom`, the table keeps a counting Bloom filter of its keys, see
+    `data_structures.bloom_filter`. Lookups of most keys that aren't in the
+    table are then rejected without visiting any level, and the filter's
+    false-positive rate is reported in `stats()`.
+
+    With `bitmap`, every level is a `BitmapNode` holding only the positions
+    in use, rather than an `ArrayNode` of TABLE_SIZE. Keys are at the same
+    locations either way.
+
+    With `compressed`, the table is a radix (Patricia) trie: a level is
+    only made where keys diverge, and records in `skip` the characters every
+    key below it shares after the position it is at. A key's location then
+    has one position per branch point rather than one per shared character.
+
     Type Arguments:
         - K:    Key Type. In most cases should be string.
-                Otherwise `hash` should be overwritten.
+                Otherwise `hash_at` should be overwritten.
         - V:    Value Type.
 
     Unless stated otherwise, all methods have O(1) complexity.
@@ -22,67 +42,350 @@ class InfiniteHashTable(Generic[K, V]):
 
     TABLE_SIZE = 27
 
-    def __init__(self) -> None:
-        self.array = ArrayR(InfiniteHashTable.TABLE_SIZE)
-        self.level = 0
+    # Keys a new Bloom filter is sized for, see `DoubleKeyTable.BLOOM_CAPACITY`.
+    BLOOM_CAPACITY = 64
+
+    def __init__(self, bloom: bool=False, bitmap: bool=False, compressed: bool=False) -> None:
+        """
+        :param bloom: Whether to keep a Bloom filter of every key.
+        :param bitmap: Whether levels are sparse `BitmapNode`s.
+        :param compressed: Whether to compress paths shared by several keys.
+        """
+        self.node_type = BitmapNode if bitmap else ArrayNode
+        self.compressed = compressed
+        self.array = self._new_node()
         self.count = 0
+        self.bloom = CountingBloomFilter(self.BLOOM_CAPACITY) if bloom else None
 
 
+    @classmethod
+    def from_sorted(cls, items: Iterable[tuple[K, V]], bloom: bool=False, bitmap: bool=False, compressed: bool=False) -> InfiniteHashTable[K, V]:
+        """
+        Builds a table from (key, value) pairs, such as the keys of
+        `sort_keys` or `iter_sorted` with their values.
+
+        The pairs are split between the positions of each table in one
+        pass, so every table is made once, already holding its final
+        entries, rather than pairs being pushed down a level each time
+        a colliding key arrives. Pairs may come in any order, though the
+        table is built in the same trie order sorted keys come out in.
+        Later pairs overwrite earlier ones with the same key.
+
+        :complexity: O(L + T*TABLE_SIZE) where L is the total length of the
+            keys and T the number of tables built.
+        """
+        table = cls(bloom, bitmap, compressed)
+        # Keeps the last value for each key, in the order keys first appear.
+        values = {}
+        for key, value in items:
+            values[key] = value
+        pairs = list(values.items())
+
+        # Tables still to fill, with the character they branch on and their pairs.
+        stack = [(table.array, 0, pairs)]
+        while stack:
+            node, level, group = stack.pop()
+            buckets = [[] for _ in range(table.TABLE_SIZE)]
+            for pair in group:
+                buckets[table.hash_at(pair[0], level)].append(pair)
+            entries = []
+            for position, bucket in enumerate(buckets):
+                if len(bucket) == 1:
+                    entries.append((position, bucket[0]))
+                elif bucket:
+                    branch = level + 1
+                    skip = ""
+                    if compressed:
+                        # The path every key in the bucket shares, as in _store_compressed.
+                        first = bucket[0][0]
+                        skip = first[branch:]
+                        for key, _ in bucket[1:]:
+                            skip = skip[:table._skip_mismatch(key, branch, skip)]
+                        branch += len(skip)
+                    child = table._new_node(skip)
+                    entries.append((position, child))
+                    stack.append((child, branch, bucket))
+            table._fill(node, entries)
+
+        table.count = len(pairs)
+        if bloom:
+            table.bloom = table.bloom.resized(max(table.BLOOM_CAPACITY, len(pairs)), (key for key, _ in pairs))
+        return table
+
+    def _fill(self, table: ArrayNode|BitmapNode, entries: list[tuple[int, tuple[K, V]|ArrayNode|BitmapNode]]) -> None:
+        """
+        Stores every (position, pair or table) in an empty table at once.
+        Positions must be increasing.
+
+        :complexity: O(len(entries))
+        """
+        if self.node_type is BitmapNode:
+            table.fill(entries)
+            return
+        for position, item in entries:
+            table[position] = item
+        table.entries = len(entries)
+
+    def _new_node(self, skip: str="") -> ArrayNode|BitmapNode:
+        """
+        Returns a new, empty level of the table.
+        In a compressed table, skip is the characters every key below it shares.
+
+        :complexity: O(TABLE_SIZE) for an ArrayNode, O(1) for a BitmapNode.
+        """
+        node = BitmapNode() if self.node_type is BitmapNode else ArrayNode(self.TABLE_SIZE)
+        node.skip = skip
+        return node
+
+    def _set_slot(self, table: ArrayNode|BitmapNode, position: int, item: tuple[K, V]|ArrayNode|BitmapNode|None) -> None:
+        """
+        Stores a pair, a table or None at a position of a table, keeping
+        count of the slots in use. Writes that leave a slot in use (or
+        unused) may assign directly.
+        """
+        if self.node_type is ArrayNode:
+            table.entries += (item is not None) - (table[position] is not None)
+        table[position] = item
+
+    def _entry_count(self, table: ArrayNode|BitmapNode) -> int:
+        """
+        Returns how many slots of a table are in use.
+        """
+        if self.node_type is BitmapNode:
+            return len(table)
+        return table.entries
+
     def hash(self, key: K) -> int:
-        if self.level < len(key):
-            return ord(key[self.level]) % (self.TABLE_SIZE-1)
+        """
+        Returns the position of a key in the top-level table, see `hash_at`.
+        """
+        return self.hash_at(key, 0)
+
+    def hash_at(self, key: K, level: int) -> int:
+        """
+        Returns the position of a key in a table at the given level,
+        the last position if the key has no character at that level.
+        """
+        if level < len(key):
+            return ord(key[level]) % (self.TABLE_SIZE-1)
         return self.TABLE_SIZE-1
     
+    def _rank(self, position: int) -> int:
+        """
+        Returns where keys at a position sort among those in the same table.
+        """
+        if position == self.TABLE_SIZE-1:
+            return -1
+        return (position - ord('a')) % (self.TABLE_SIZE-1)
+
+    def _trie_order(self, key: K) -> list[int]:
+        """
+        Returns a value to compare keys by in trie order: the rank of the
+        position of each of the key's characters in turn, then of the key's end.
+
+        :complexity: O(len(key))
+        """
+        return [self._rank(self.hash_at(key, level)) for level in range(len(key) + 1)]
+
+    def _skip_mismatch(self, key: K, level: int, skip: str) -> int:
+        """
+        Returns how many characters of a compressed path the key follows,
+        comparing it from the given level by position.
+
+        :complexity: O(len(skip))
+        """
+        if key.startswith(skip, level):
+            return len(skip)
+        for index in range(len(skip)):
+            if self.hash_at(key, level + index) != self.hash_at(skip, index):
+                return index
+        return len(skip)
+
+    def _after_skip(self, key: K, level: int, skip: str) -> bool|None:
+        """
+        Compares a key with a compressed path starting at the given level.
+        Returns None if the key follows the whole path, otherwise whether
+        every key below the path sorts after the key.
+
+        :complexity: O(len(skip))
+        """
+        index = self._skip_mismatch(key, level, skip)
+        if index == len(skip):
+            return None
+        return self._rank(self.hash_at(key, level + index)) < self._rank(self.hash_at(skip, index))
+
     def probe(self, key: K, is_insert) -> int:
         """
         Probe to get the position in the hash table. 
         """
-        self.level = 0
-        position = self.hash(key)
-        current = self.array[position]
+        location = self._search(key, is_insert)
+        if location is None:
+            raise KeyError(key)
+        return location
 
+    def _search(self, key: K, is_insert, operation: str|None=None) -> list[int]|None:
+        """
+        probe, returning None rather than raising when the key isn't in the table.
+        In a compressed table, an inserting probe may also end at a table
+        whose compressed path the key leaves, which _store splits.
+        Records how many levels were visited under operation, if given
+        and statistics are being collected.
+        """
+        table = self.array
+        # The character the current table branches on.
+        level = 0
         location = []
-        # if current is not none, means we have a collision
-        while current is not None:
-            location.append(position)
-            # if current is a tuple, means we have a key, value pair
-            if isinstance(current, tuple):
-                if current[0] == key or is_insert:
-                    return location 
-                else:
-                    raise KeyError(key)
-            
-            # if it is not a tuple, means we have to get second hash
-            self.level += 1
-            position = self.hash(key)
-            # update the current to second level
-            current = current[position]
-
-        if is_insert:
+        while True:
+            position = self.hash_at(key, level)
             location.append(position)
+            current = table[position]
+            if current is None or isinstance(current, tuple):
+                found = current is not None and current[0] == key
+                break
+            if self.compressed:
+                skip = current.skip
+                if self._skip_mismatch(key, level + 1, skip) < len(skip):
+                    found = False
+                    break
+                level += len(skip)
+            table = current
+            level += 1
+
+        if operation is not None and self.recorder is not None:
+            self.recorder.record_probe(operation, len(location))
+        if found or is_insert:
             return location
-        else:
-            raise KeyError(key)
+        return None
 
+    def _locate(self, operation: str, key: K, is_insert) -> list[int]|None:
+        """
+        _search, recording how many levels were visited if statistics are being collected.
+        Lookups the Bloom filter rejects return None without searching.
+        """
+        if self.bloom is not None and not is_insert and not self.bloom.might_contain(key):
+            return None
+        location = self._search(key, is_insert, operation)
+        if location is None and self.bloom is not None:
+            self.bloom.false_positives += 1
+        return location
+
+    def _lookup(self, operation: str, key: K) -> tuple[K, V]|None:
+        """
+        Returns the pair stored under a key, or None if it isn't in the table.
 
-    def __getitem__(self, key: K) -> V:
+        Unlike _locate, the table is descended once, no location is built,
+        and nothing is kept on the table between levels, so lookups may run
+        from several threads at once as long as nothing writes to the table.
+        Statistics and Bloom filter counts are still updated as they run.
+
+        :complexity: O(D) where D is the depth of the key,
+            plus O(L) to compare compressed paths of total length L.
         """
-        Get the value at a certain key
+        if self.bloom is not None and not self.bloom.might_contain(key):
+            return None
+        table = self.array
+        level = 0
+        depth = 1
+        while True:
+            current = table[self.hash_at(key, level)]
+            if current is None or isinstance(current, tuple):
+                break
+            if self.compressed:
+                skip = current.skip
+                if self._skip_mismatch(key, level + 1, skip) < len(skip):
+                    current = None
+                    break
+                level += len(skip)
+            table = current
+            level += 1
+            depth += 1
+
+        if self.recorder is not None:
+            self.recorder.record_probe(operation, depth)
+        if current is not None and current[0] == key:
+            return current
+        if self.bloom is not None:
+            self.bloom.false_positives += 1
+        return None
+
+    def _bloom_add(self, key: K) -> None:
+        """
+        Adds a new key to the Bloom filter,
+        rebuilding it twice as large once the table outgrows it.
 
-        :raises KeyError: when the key doesn't exist.
+        :complexity: O(1) amortised, O(N) to rebuild where N is the total size of every array.
+        """
+        self.bloom.add(key)
+        if self.bloom.is_full():
+            self.bloom = self.bloom.resized(2 * self.bloom.capacity, (key for key, _ in self.items()))
+
+    def _item_at(self, lst_of_pos: list[int]) -> tuple[K, V]|None:
+        """
+        Returns whatever is stored at the end of a location.
         """
-        lst_of_pos = self.probe(key, False)
         table = self.array
         for index in lst_of_pos:
             table = table[index]
-        
-        return table[1]
+        return table
+
+    def __getitem__(self, key: K) -> V:
+        """
+        Get the value at a certain key
+
+        :raises KeyError: when the key doesn't exist.
+        """
+        item = self._lookup("get", key)
+        if item is None:
+            raise KeyError(key)
+        return item[1]
+
+    def get(self, key: K, default: V|None=None) -> V|None:
+        """
+        Returns the value at a key, or default if the key isn't in the table.
+        """
+        item = self._lookup("get", key)
+        if item is None:
+            return default
+        return item[1]
 
     def __setitem__(self, key: K, value: V) -> None:
         """
         Set an (key, value) pair in our hash table.
         """
-        lst_of_pos = self.probe(key, True)
+        count = self.count
+        self._store(self._locate("set", key, True), key, value)
+        if self.bloom is not None and self.count > count:
+            self._bloom_add(key)
+
+    def setdefault(self, key: K, default: V|None=None) -> V|None:
+        """
+        Returns the value at a key, first inserting default if the key isn't in the table.
+        """
+        lst_of_pos = self._locate("set", key, True)
+        item = self._item_at(lst_of_pos)
+        if item is not None and item[0] == key:
+            return item[1]
+        self._store(lst_of_pos, key, default)
+        if self.bloom is not None:
+            self._bloom_add(key)
+        return default
+
+    def update(self, other: InfiniteHashTable[K, V]|Iterable[tuple[K, V]]) -> None:
+        """
+        Sets every (key, value) pair from another table, or from an iterable of pairs.
+        """
+        if isinstance(other, InfiniteHashTable):
+            other = other.items()
+        for key, value in other:
+            self[key] = value
+
+    def _store(self, lst_of_pos: list[int], key: K, value: V) -> None:
+        """
+        Stores a pair at the location returned by an inserting probe.
+        """
+        if self.compressed:
+            self._store_compressed(lst_of_pos, key, value)
+            return
         table = self.array
 
         # move to the second last table of the whole list
@@ -94,7 +397,7 @@ class InfiniteHashTable(Generic[K, V]):
 
         # if the last position is none, means we have a new key, value pair
         if table[next_level] is None:
-            table[next_level] = (key, value)
+            self._set_slot(table, next_level, (key, value))
             self.count += 1
             return
         #if the last position is a tuple, check if it is the same key
@@ -106,79 +409,223 @@ class InfiniteHashTable(Generic[K, V]):
             else:
                 collision = table[next_level]
                 collision_key = collision[0]
+                level = len(lst_of_pos) - 1
 
-                while self.hash(collision_key) == self.hash(key):
-                    self.level += 1
-                    table[next_level] = ArrayR(InfiniteHashTable.TABLE_SIZE)
+                while self.hash_at(collision_key, level) == self.hash_at(key, level):
+                    level += 1
+                    self._set_slot(table, next_level, self._new_node())
                     table = table[next_level]
-                    next_level = self.hash(key)
+                    next_level = self.hash_at(key, level)
                 
-                table[next_level] = (key, value)
-                collision_position = self.hash(collision_key)
-                table[collision_position] = collision
+                self._set_slot(table, next_level, (key, value))
+                collision_position = self.hash_at(collision_key, level)
+                self._set_slot(table, collision_position, collision)
                 self.count += 1
         
 
-    def __delitem__(self, key: K) -> None:
+    def _store_compressed(self, lst_of_pos: list[int], key: K, value: V) -> None:
         """
-        Deletes a (key, value) pair in our hash table.
+        _store for a compressed table. A new level is only made where the
+        key diverges from the key or compressed path already at its location.
 
-        :raises KeyError: when the key doesn't exist.
+        :complexity: O(L) where L is len(key).
         """
-        lst_of_pos = self.probe(key, False)
         table = self.array
+        level = 0
         for index in lst_of_pos[:-1]:
             table = table[index]
-        
-        next_level = lst_of_pos[-1]
-
-        if table[next_level] is None:
-            raise KeyError(key)
+            level += 1 + len(table.skip)
+        position = lst_of_pos[-1]
+        current = table[position]
+
+        if current is None:
+            self._set_slot(table, position, (key, value))
+        elif isinstance(current, tuple):
+            if current[0] == key:
+                table[position] = (key, value)
+                return
+            # Both keys share the path until they hash differently.
+            other = current[0]
+            branch = level + 1
+            while self.hash_at(key, branch) == self.hash_at(other, branch):
+                branch += 1
+            node = self._new_node(key[level + 1:branch])
+            self._set_slot(node, self.hash_at(other, branch), current)
+            self._set_slot(node, self.hash_at(key, branch), (key, value))
+            table[position] = node
         else:
-            table[next_level] = None
-            self.count -= 1
-
-        self.lower_level(table, lst_of_pos)
-    
-
-    def lower_level(self, table, lst_of_pos) -> None:
-        count = 2
-        tuple_list, has_another_array = self.status(table)
-        while len(tuple_list) == 1 and not has_another_array and count < len(lst_of_pos):
-            table = self.array   
-            for pos in lst_of_pos[:-count]:
-                table = table[pos]
+            # Split the compressed path where the key leaves it.
+            index = self._skip_mismatch(key, level + 1, current.skip)
+            node = self._new_node(current.skip[:index])
+            self._set_slot(node, self.hash_at(current.skip, index), current)
+            current.skip = current.skip[index + 1:]
+            self._set_slot(node, self.hash_at(key, level + 1 + index), (key, value))
+            table[position] = node
+        self.count += 1
 
-            table[lst_of_pos[-count]] = tuple_list[0]
+    def __delitem__(self, key: K) -> None:
+        """
+        Deletes a (key, value) pair in our hash table.
 
-            tuple_list, has_another_array = self.status(table)
+        :raises KeyError: when the key doesn't exist.
+        """
+        lst_of_pos = self._locate("delete", key, False)
+        if lst_of_pos is None:
+            raise KeyError(key)
+        self._remove(lst_of_pos)
+        if self.bloom is not None:
+            self.bloom.remove(key)
 
-            count += 1 
+    def pop(self, key: K, default: V=MISSING) -> V:
+        """
+        Deletes a key, returning its value.
+        If the key isn't in the table, returns default instead.
 
-        if len(tuple_list) == 1 and not has_another_array:
-            self.array[lst_of_pos[0]] = tuple_list[0]
-        
+        :raises KeyError: when the key doesn't exist and no default is given.
+        """
+        lst_of_pos = self._locate("delete", key, False)
+        if lst_of_pos is None:
+            if default is MISSING:
+                raise KeyError(key)
+            return default
+        value = self._item_at(lst_of_pos)[1]
+        self._remove(lst_of_pos)
+        if self.bloom is not None:
+            self.bloom.remove(key)
+        return value
+
+    def _remove(self, lst_of_pos: list[int]) -> None:
+        """
+        Deletes the pair at a location holding a key, then collapses the
+        tables along the location from the bottom up in a single pass,
+        stopping at the first table still holding several entries.
 
+        :complexity: O(D + TABLE_SIZE) where D is the depth of the location,
+            plus O(L) to join compressed paths of total length L.
+        """
+        tables, levels = self._path(lst_of_pos)
+        self._set_slot(tables[-1], lst_of_pos[-1], None)
+        self.count -= 1
+        for depth in range(len(tables) - 1, 0, -1):
+            if self._entry_count(tables[depth]) > 1:
+                break
+            self._collapse(tables[depth], tables[depth - 1], lst_of_pos[depth - 1], levels[depth], lst_of_pos[depth])
+
+    def _path(self, lst_of_pos: list[int]) -> tuple[list[ArrayNode|BitmapNode], list[int]]:
+        """
+        Returns the tables along a location, from the top-level table down,
+        and the character each of them branches on.
 
-    def status(self, array) -> tuple[list[tuple], bool]:
+        :complexity: O(D) where D is the depth of the location.
+        """
+        tables = [self.array]
+        levels = [0]
+        for position in lst_of_pos[:-1]:
+            table = tables[-1][position]
+            tables.append(table)
+            levels.append(levels[-1] + 1 + (len(table.skip) if self.compressed else 0))
+        return tables, levels
+
+    def _collapse(self, table: ArrayNode|BitmapNode, parent: ArrayNode|BitmapNode, position: int, level: int, hint: int|None=None) -> None:
         """
-        Return the status of the hash table.
+        Pulls a table that no longer needs to be a level of its own up into
+        its parent's slot at position: an empty table is removed, and one
+        holding a single pair is replaced by that pair. In a compressed
+        table, one holding a single table is joined onto its compressed path.
+
+        :param level: The character the table branches on.
+        :param hint: A position in the table likely to hold its last entry.
+        :complexity: O(1) when the hint holds the last entry,
+            otherwise O(TABLE_SIZE) to find it.
         """
+        entries = self._entry_count(table)
+        if entries == 0:
+            self._set_slot(parent, position, None)
+            return
+        if entries > 1:
+            return
+        child = table[hint] if hint is not None else None
+        if child is None:
+            child = next(item for item in table if item is not None)
+        if not isinstance(child, tuple):
+            if not self.compressed:
+                return
+            # The character the table branched on, from any key below it.
+            below = child
+            while not isinstance(below, tuple):
+                below = next(item for item in below if item is not None)
+            child.skip = table.skip + below[0][level] + child.skip
+        parent[position] = child
+
+    def delete_many(self, keys: Iterable[K]) -> int:
+        """
+        Deletes every key that is in the table, returning how many were.
+        Tables are only collapsed once every key is deleted, each one once,
+        from the deepest up, so ancestors shared by several keys aren't
+        collapsed over and over.
 
-        has_another_array = False
-        lst = []
-        for item in array:
-            if isinstance(item, tuple):
-                lst.append(item)
-            elif isinstance(item, ArrayR):
-                has_another_array = True
-        
-        return (lst, has_another_array)
+        :complexity: O(K*D) to delete K keys at depth up to D,
+            plus O(T*TABLE_SIZE) to collapse the T tables they were in.
+        """
+        # Every table a key was deleted below, with where it hangs from its parent.
+        affected = {}
+        deleted = 0
+        for key in keys:
+            lst_of_pos = self._locate("delete", key, False)
+            if lst_of_pos is None:
+                continue
+            tables, levels = self._path(lst_of_pos)
+            for depth in range(1, len(tables)):
+                affected[id(tables[depth])] = (depth, tables[depth], tables[depth - 1], lst_of_pos[depth - 1], levels[depth])
+            self._set_slot(tables[-1], lst_of_pos[-1], None)
+            self.count -= 1
+            if self.bloom is not None:
+                self.bloom.remove(key)
+            deleted += 1
 
+        for _, table, parent, position, level in sorted(affected.values(), key=lambda entry: entry[0], reverse=True):
+            self._collapse(table, parent, position, level)
+        return deleted
 
     def __len__(self) -> int:
         return self.count
 
+    def _structure_stats(self) -> dict:
+        """
+        Describes the shape of the table: how many arrays it is made of,
+        how many slots they have (only those in use for bitmap nodes), the
+        fraction of slots holding keys, and how many keys sit at each depth
+        (a key stored in the top-level array has depth 1).
+
+        :complexity: O(N) where N is the total size of every array.
+        """
+        depths = {}
+        nodes = 0
+        slots = 0
+
+        def visit(array, depth):
+            nonlocal nodes, slots
+            nodes += 1
+            slots += len(array)
+            for item in array:
+                if isinstance(item, self.node_type):
+                    visit(item, depth + 1)
+                elif item is not None:
+                    depths[depth] = depths.get(depth, 0) + 1
+
+        visit(self.array, 1)
+        stats = {
+            "count": len(self),
+            "nodes": nodes,
+            "slots": slots,
+            "load_factor": len(self) / slots if slots else 0.0,
+            "max_depth": max(depths, default=0),
+            "depths": dict(sorted(depths.items())),
+        }
+        if self.bloom is not None:
+            stats["bloom"] = self.bloom.as_dict()
+        return stats
+
     def __str__(self) -> str:
         """
         String representation.
@@ -188,7 +635,7 @@ class InfiniteHashTable(Generic[K, V]):
         """
         return (self.get_items(self.array))
 
-    def get_items(self, array: ArrayR) -> list[K]:
+    def get_items(self, array: ArrayNode|BitmapNode) -> list[K]:
         """
         String representation.
 
@@ -197,9 +644,9 @@ class InfiniteHashTable(Generic[K, V]):
         """
         item_list = list()
 
-        def helper(sub_array: ArrayR) -> list[K]:
+        def helper(sub_array: ArrayNode|BitmapNode) -> list[K]:
             for item in sub_array:
-                if isinstance(item, ArrayR):
+                if isinstance(item, self.node_type):
                     helper(item)  # Recurse into the nested list
                 else:
                     if item is not None:
@@ -216,39 +663,137 @@ class InfiniteHashTable(Generic[K, V]):
 
         :complexity: See linear probe.
         """
-        try:
-            _ = self[key]
-        except KeyError:
-            return False
-        else:
-            return True
+        return self._lookup("get", key) is not None
 
-    def sort_keys(self, current=None) -> list[str]:
+    def items(self) -> list[tuple[K, V]]:
         """
-        Returns all keys currently in the table in lexicographically sorted order.
-        """
-        lst = []
-        
-        def collect_keys(array):
-            if array[self.TABLE_SIZE-1] is not None:
-                lst.append(array[self.TABLE_SIZE-1][0])
-
-            i = ord('a') % (self.TABLE_SIZE-1)
-            for _ in range((self.TABLE_SIZE)-1):
-                if isinstance(array[i], ArrayR):
-                    collect_keys(array[i])
-                elif array[i] is not None:
-                    lst.append(array[i][0])
-
-                i = (i+1) % (self.TABLE_SIZE-1)
-
-        collect_keys(self.array)
-        return lst
-
+        Returns all (key, value) pairs in the table, in no particular order.
 
+        :complexity: O(N) where N is the total size of every array.
+        """
+        items = []
 
+        def helper(sub_array: ArrayNode|BitmapNode) -> None:
+            for item in sub_array:
+                if isinstance(item, self.node_type):
+                    helper(item)
+                elif item is not None:
+                    items.append(item)
+        helper(self.array)
+        return items
 
+    def sort_keys(self, current=None) -> list[str]:
+        """
+        Returns all keys currently in the table in trie order: compared
+        character by character by the rank of the position each character
+        hashes to (see `_rank`), with a key before any longer key it starts.
+        For lowercase keys this is lexicographic order.
+        """
+        return list(self.iter_sorted())
 
+    def _sorted_positions(self) -> list[int]:
+        """
+        Returns the positions holding longer keys, in the order of the
+        characters that hash to them, starting from 'a'.
+        """
+        first = ord('a') % (self.TABLE_SIZE-1)
+        return [(first + i) % (self.TABLE_SIZE-1) for i in range(self.TABLE_SIZE-1)]
 
+    def _start_path(self, start: str, level: int, skip: str) -> bool|None:
+        """
+        Whether a table along start's path whose compressed path starts at
+        the given level is still on it. Returns None if every key below it
+        sorts before start, so it can be skipped.
+        """
+        after = self._after_skip(start, level, skip)
+        if after is None:
+            return True
+        return None if not after else False
 
+    def iter_sorted(self, prefix: str|None=None, start: str|None=None, limit: int|None=None) -> Iterator[str]:
+        """
+        Yields keys in trie order, the same order as `sort_keys`,
+        without collecting them first.
+
+        Only the levels below the prefix are visited, and tables holding
+        only keys that sort before start are skipped, so a range scan
+        costs about as much as the keys it yields.
+
+        :param prefix: Only yield keys starting with prefix.
+        :param start: Only yield keys from start onwards, in trie order.
+        :param limit: Stop after yielding this many keys.
+        :complexity: O(P + K*TABLE_SIZE) where P is len(prefix)
+            and K is the number of tables visited.
+        """
+        if limit is not None and limit <= 0:
+            return
+        prefix = prefix or ""
+        if start is not None and not start.startswith(prefix):
+            if self._trie_order(start) > self._trie_order(prefix):
+                # Every key with the prefix sorts before start.
+                return
+            start = None
+        start_order = None if start is None else self._trie_order(start)
 
+        # Descend straight to the table holding every key with the prefix.
+        table = self.array
+        level = 0
+        on_path = start is not None
+        while level < len(prefix):
+            item = table[self.hash_at(prefix, level)]
+            if not isinstance(item, self.node_type):
+                if item is not None and item[0].startswith(prefix) and (start is None or self._trie_order(item[0]) >= start_order):
+                    yield item[0]
+                return
+            if self.compressed:
+                # The prefix may end partway along the compressed path.
+                skip = item.skip
+                index = self._skip_mismatch(prefix, level + 1, skip)
+                if index < len(skip) and level + 1 + index < len(prefix):
+                    return
+                on_path = self._start_path(start, level + 1, skip) if on_path else False
+                if on_path is None:
+                    return
+                level += len(skip)
+            table = item
+            level += 1
+
+        order = self._sorted_positions()
+        yielded = 0
+        # Pairs still to yield and tables still to visit, the next one last.
+        # A table is on start's path if every key before start's
+        # position in it sorts before start.
+        stack = [(table, level, on_path)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item[0], self.node_type):
+                table, level, on_path = item
+                positions = [self.TABLE_SIZE-1] + order
+                next_position = None
+                if on_path and level < len(start):
+                    next_position = self.hash_at(start, level)
+                    positions = order[self._rank(next_position):]
+                children = []
+                for position in positions:
+                    child = table[position]
+                    if isinstance(child, self.node_type):
+                        child_level = level + 1
+                        child_on_path = position == next_position
+                        if self.compressed:
+                            if child_on_path:
+                                child_on_path = self._start_path(start, child_level, child.skip)
+                                if child_on_path is None:
+                                    continue
+                            child_level += len(child.skip)
+                        children.append((child, child_level, child_on_path))
+                    elif child is not None:
+                        children.append(child)
+                stack.extend(reversed(children))
+                continue
+
+            key = item[0]
+            if key.startswith(prefix) and (start is None or self._trie_order(key) >= start_order):
+                yield key
+                yielded += 1
+                if yielded == limit:
+                    return
@@ -17,6 +17,7 @@ from trail import Trail, TrailSeries, TrailSplit
 from draw_trails import TrailDraw
 from mountain_organiser import MountainOrganiser
 from double_key_table import DoubleKeyTable
+from data_structures.key_codecs import INT_CODEC
 from serialize import serialize, deserialize
 
 class MyWindow(arcade.Window):
@@ -276,16 +277,14 @@ class MyWindow(arcade.Window):
     def setup(self) -> None:
         """Set up the game and initialize the variables."""
         self.reset()
-        self.mountain_manager = MountainManager()
         self.cur_filename = sys.argv[1] if len(sys.argv) > 1 else "basic.json"
         with open(f"stores/{self.cur_filename}", "r") as f:
             t = deserialize(json.loads(f.read()))
         try:
             # Try to add all existing mountains
-            for mountain in t.collect_all_mountains():
-                self.mountain_manager.add_mountain(mountain)
+            self.mountain_manager = MountainManager.from_mountains(t.collect_all_mountains())
         except NotImplementedError:
-            pass
+            self.mountain_manager = MountainManager()
         self.mountain = TrailDraw(t)
         self.draw_box = None
 
@@ -391,25 +390,22 @@ class MyWindow(arcade.Window):
             ]
         groups = self.mountain_manager.group_by_difficulty()
         to = MountainOrganiser()
-        positions = DoubleKeyTable()
-        positions.hash1 = lambda k: (k % positions.table_size)
+        positions = DoubleKeyTable(key1_codec=INT_CODEC)
         all_mountains = []
         for i, group in enumerate(groups):
             to.add_mountains(group)
-            for mountain in group:
-                positions[mountain.difficulty_level, mountain.name] = []
             all_mountains.extend(group)
             for mountain in all_mountains:
-                positions[mountain.difficulty_level, mountain.name].append(to.cur_position(mountain))
-        self.graph_data = [
-            [
+                positions.setdefault((mountain.difficulty_level, mountain.name), []).append(to.cur_position(mountain))
+        self.graph_data = []
+        for i, mountain in enumerate(all_mountains):
+            mountain_positions = positions[mountain.difficulty_level, mountain.name]
+            self.graph_data.append([
                 get_col(i, len(all_mountains)),
-                len(groups) - len(positions[mountain.difficulty_level, mountain.name]),
+                len(groups) - len(mountain_positions),
                 mountain.name,
-                positions[mountain.difficulty_level, mountain.name]
-            ]
-            for i, mountain in enumerate(all_mountains)
-        ]
+                mountain_positions,
+            ])
 
     def on_save_file_clicked(self):
         self.is_saving = True
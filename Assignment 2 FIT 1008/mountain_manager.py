@@ -1,12 +1,40 @@
 from __future__ import annotations
 from mountain import Mountain
 from double_key_table import DoubleKeyTable
+from data_structures.key_codecs import INT_CODEC
 from algorithms.mergesort import mergesort
 
 class MountainManager:
 
     def __init__(self) -> None:
-        self.mountains = DoubleKeyTable()
+        # Difficulty levels are stored and hashed as integers, and a Bloom
+        # filter rejects lookups of most mountains that were never added.
+        self.mountains = DoubleKeyTable(tombstones=True, incremental=True, key1_codec=INT_CODEC, bloom=True)
+
+    @classmethod
+    def from_mountains(cls, mountains: list[Mountain]) -> MountainManager:
+        """
+        Creates a manager already holding all the given mountains,
+        building the table in one pass rather than one mountain at a time.
+        """
+        manager = cls()
+        manager.mountains = DoubleKeyTable.from_items(
+            (((mountain.difficulty_level, mountain.name), mountain) for mountain in mountains),
+            tombstones=True,
+            incremental=True,
+            key1_codec=INT_CODEC,
+            bloom=True,
+        )
+        return manager
+
+    def snapshot(self) -> MountainManager:
+        """
+        Returns a read-only manager of the mountains as they are now,
+        which later edits to this manager don't affect. See `DoubleKeyTable.snapshot`.
+        """
+        manager = MountainManager()
+        manager.mountains = self.mountains.snapshot()
+        return manager
 
     def add_mountain(self, mountain: Mountain) -> None:
         self.mountains[mountain.difficulty_level, mountain.name] = mountain
@@ -14,21 +42,29 @@ class MountainManager:
     def remove_mountain(self, mountain: Mountain) -> None:
         del self.mountains[mountain.difficulty_level, mountain.name]
 
+    def add_mountains(self, mountains: list[Mountain]) -> None:
+        """
+        Adds many mountains at once, looking each difficulty up only once.
+        """
+        self.mountains.set_many(((mountain.difficulty_level, mountain.name), mountain) for mountain in mountains)
+
+    def remove_mountains(self, mountains: list[Mountain]) -> None:
+        """
+        Removes many mountains at once, looking each difficulty up only once.
+        Mountains that aren't being managed are ignored.
+        """
+        self.mountains.delete_many((mountain.difficulty_level, mountain.name) for mountain in mountains)
+
     def edit_mountain(self, old: Mountain, new: Mountain) -> None:
         self.remove_mountain(old)
         self.add_mountain(new)
 
     def mountains_with_difficulty(self, diff: int) -> list[Mountain]:
-        mount_list = []
-        try:
-            mount_list = self.mountains.values(diff)
-        except:
-            pass
-        return mount_list
+        return list(self.mountains.values(diff, []))
 
     def group_by_difficulty(self) -> list[list[Mountain]]:
         mount_list = []
-        lst_of_keys = mergesort(self.mountains.keys(), key=lambda x: x[0])
+        lst_of_keys = mergesort(list(self.mountains.keys()))
         for i in range(len(lst_of_keys)):
-            mount_list.append(self.mountains.values(lst_of_keys[i]))
+            mount_list.append(list(self.mountains.values(lst_of_keys[i])))
         return mount_list
\ No newline at end of file
@@ -31,7 +31,7 @@ class MountainOrganiser:
         external_array = []
         internal_array = []
         for key in self.array.keys():
-            if len(self.array.keys(key)) > 1:
+            if self.array.inner_count(key) > 1:
                 internal_array.extend(self.array.values(key))
                 external_array.append(internal_array)
                 internal_array = []
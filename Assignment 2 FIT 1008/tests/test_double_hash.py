@@ -2,6 +2,13 @@ import unittest
 from ed_utils.decorators import number
 
 from double_key_table import DoubleKeyTable
+from data_structures.hash_table import LinearProbeTable, FullError
+from flat_double_key_table import FlatDoubleKeyTable
+from data_structures.cuckoo_hash_table import CuckooHashTable
+from data_structures.swiss_hash_table import SwissProbeTable
+from data_structures.key_codecs import INT_CODEC, STR_CODEC, TupleCodec
+from data_structures.table_views import TableView
+from data_structures.bloom_filter import CountingBloomFilter
 
 class TestDoubleHash(unittest.TestCase):
 
@@ -133,4 +140,513 @@ class TestDoubleHash(unittest.TestCase):
         # We just want to make sure you aren't returning a list and are doing this
         # with an iterator.
         self.assertRaises(BaseException, lambda: next(key_iterator))
-        self.assertRaises(BaseException, lambda: next(value_iterator))
\ No newline at end of file
+        self.assertRaises(BaseException, lambda: next(value_iterator))
+
+    @number("3.6")
+    def test_probing_strategies(self):
+        for probing in ["linear", "quadratic", "double", "robin_hood"]:
+            dt = DoubleKeyTable(probing=probing)
+            for i in range(60):
+                for j in range(5):
+                    dt[f"r{i}", f"m{j}"] = (i, j)
+            self.assertEqual(len(dt.keys()), 60, probing)
+            for i in range(60):
+                self.assertEqual(set(dt.keys(f"r{i}")), {f"m{j}" for j in range(5)}, probing)
+                self.assertEqual(set(dt.values(f"r{i}")), {(i, j) for j in range(5)}, probing)
+
+            # A full table that cannot grow refuses the next key, at either level.
+            # (Quadratic probing does not reach every slot, so can't fill one.)
+            if probing == "quadratic":
+                continue
+            lp = LinearProbeTable([5], probing=probing)
+            for i in range(5):
+                lp[f"k{i}"] = i
+            with self.assertRaises(FullError, msg=probing):
+                lp["k5"] = 5
+            self.assertEqual(sorted(lp.values()), list(range(5)), probing)
+            dt = DoubleKeyTable([5], [5], probing=probing)
+            for i in range(5):
+                dt[f"r{i}", "m0"] = i
+                dt["r0", f"m{i}"] = i
+            with self.assertRaises(FullError, msg=probing):
+                dt["r5", "m0"] = 5
+            with self.assertRaises(FullError, msg=probing):
+                dt["r0", "m5"] = 5
+            self.assertEqual(sorted(dt.keys()), [f"r{i}" for i in range(5)], probing)
+            self.assertEqual(len(dt.values()), 9, probing)
+
+    @number("3.7")
+    def test_from_items(self):
+        items = [((i % 7, f"m{i}"), i) for i in range(700)]
+        dt = DoubleKeyTable.from_items(items)
+        self.assertEqual(dt.table_size, 29)
+        self.assertEqual(set(dt.keys()), {str(i) for i in range(7)})
+        for i in range(700):
+            self.assertEqual(dt[i % 7, f"m{i}"], i)
+        self.assertIn((3, "m3"), dt)
+        self.assertNotIn((3, "m4"), dt)
+        self.assertEqual(set(dt.values(3)), set(range(3, 700, 7)))
+        # Behaves like any other table afterwards.
+        dt[7, "m700"] = 700
+        self.assertEqual(dt[7, "m700"], 700)
+
+    @number("3.8")
+    def test_incremental_rehash(self):
+        dt = DoubleKeyTable(incremental=True)
+        seen_migration = False
+        for i in range(400):
+            for j in range(3):
+                dt[f"r{i}", f"m{j}"] = (i, j)
+            if dt.old_array is not None:
+                seen_migration = True
+                self.assertEqual(dt[f"r{i // 2}", "m1"], (i // 2, 1))
+                self.assertIn(f"r{i // 3}", dt.keys())
+        self.assertTrue(seen_migration)
+        self.assertEqual(len(dt.keys()), 400)
+        for i in range(400):
+            self.assertEqual(set(dt.values(f"r{i}")), {(i, j) for j in range(3)})
+
+    @number("3.9")
+    def test_unbounded_growth(self):
+        class SmallTable(DoubleKeyTable):
+            TABLE_SIZES = [5, 13]
+
+        dt = SmallTable()
+        for i in range(40):
+            dt[f"r{i}", "m0"] = i
+        self.assertEqual(dt.table_size, 127)
+        for i in range(40):
+            self.assertEqual(dt[f"r{i}", "m0"], i)
+        self.assertEqual(len(dt.keys()), 40)
+
+    @number("3.10")
+    def test_stats(self):
+        dt = DoubleKeyTable(sizes=[12], internal_sizes=[5])
+        dt.hash1 = lambda k: ord(k[0]) % 12
+        dt.hash2 = lambda k, sub_table: ord(k[0]) % 5
+        with dt.collect_stats() as recorded:
+            dt["Tim", "Jen"] = 1
+            dt["Amy", "Ben"] = 2
+            dt["May", "Ben"] = 3
+            dt["Tim", "Kat"] = 4
+            dt["May", "Ben"]
+        probes = recorded.as_dict()["probes"]
+        # May collides with Amy at the top level.
+        self.assertEqual(probes["set"]["histogram"], {1: 3, 2: 1})
+        self.assertEqual(probes["set inner"]["histogram"], {1: 1})
+        self.assertEqual(probes["get"]["histogram"], {2: 1})
+        self.assertEqual(probes["get inner"]["histogram"], {1: 1})
+        stats = dt.stats()
+        self.assertEqual(stats["count"], 3)
+        self.assertEqual(stats["longest_cluster"], 2)
+        # Jen and Kat wrap around the end of Tim's table.
+        self.assertEqual(stats["inner_longest_cluster"], 2)
+
+        dt = DoubleKeyTable()
+        recorder = dt.enable_stats()
+        for i in range(20):
+            dt[f"r{i}", "m0"] = i
+        self.assertEqual(recorder.rehashes, 3)
+        self.assertEqual(dt.stats()["rehashes"], 3)
+
+    @number("3.11")
+    def test_dict_methods(self):
+        dt = DoubleKeyTable()
+        dt.update([(("Tim", "Jen"), 1), (("Amy", "Ben"), 2)])
+        self.assertEqual(dt.get(("Tim", "Jen")), 1)
+        self.assertIsNone(dt.get(("Tim", "Ben")))
+        self.assertEqual(dt.get(("May", "Ben"), 0), 0)
+        self.assertEqual(dt.setdefault(("Tim", "Jen"), 5), 1)
+        dt.setdefault(("May", "Ben"), []).append(3)
+        self.assertEqual(dt["May", "Ben"], [3])
+        self.assertIn(("May", "Ben"), dt)
+        self.assertNotIn(("May", "Jen"), dt)
+        self.assertNotIn(("Kat", "Jen"), dt)
+        self.assertEqual(dt.pop(("Amy", "Ben")), 2)
+        self.assertNotIn(("Amy", "Ben"), dt)
+        self.assertEqual(dt.pop(("Amy", "Ben"), None), None)
+        self.assertRaises(KeyError, lambda: dt.pop(("Amy", "Ben")))
+        self.assertEqual(sorted(dt.items()), [(("May", "Ben"), [3]), (("Tim", "Jen"), 1)])
+        self.assertEqual(dt.items("Tim"), [("Jen", 1)])
+        self.assertEqual(dt.values("Kat", []), [])
+        self.assertEqual(dt.keys("Kat", None), None)
+        self.assertRaises(KeyError, lambda: dt.values("Kat"))
+
+        copy = DoubleKeyTable()
+        copy.update(dt)
+        self.assertEqual(sorted(copy.items()), sorted(dt.items()))
+
+    @number("3.12")
+    def test_internal_table_types(self):
+        dt = DoubleKeyTable(internal_table=CuckooHashTable)
+        for i in range(50):
+            for j in range(20):
+                dt[f"r{i}", f"m{j}"] = (i, j)
+        for i in range(50):
+            for j in range(20):
+                self.assertEqual(dt[f"r{i}", f"m{j}"], (i, j))
+        self.assertIsInstance(dt.array[dt._outer_find("r0", False)][1], CuckooHashTable)
+        del dt["r0", "m0"]
+        self.assertNotIn(("r0", "m0"), dt)
+        self.assertEqual(len(dt.keys("r0")), 19)
+
+        dt = DoubleKeyTable.from_items((((i % 3, f"m{i}"), i) for i in range(300)), internal_table=CuckooHashTable)
+        self.assertEqual(set(dt.values(1)), set(range(1, 300, 3)))
+        dt = DoubleKeyTable(internal_table=SwissProbeTable)
+        for i in range(300):
+            dt[f"r{i % 4}", f"m{i}"] = i
+        for i in range(300):
+            self.assertEqual(dt[f"r{i % 4}", f"m{i}"], i)
+        self.assertEqual(dt.array[dt._outer_find("r0", False)][1].table_size, 97)
+
+    @number("3.13")
+    def test_rehash_keeps_internal_tables(self):
+        class CountingTable(DoubleKeyTable):
+            hashed = 0
+            def hash2(self, key, sub_table):
+                CountingTable.hashed += 1
+                return super().hash2(key, sub_table)
+
+        dt = CountingTable()
+        for j in range(10):
+            dt["r0", f"m{j}"] = j
+        sub_table = dt.array[dt._outer_find("r0", False)][1]
+        hashed = CountingTable.hashed
+        for i in range(1, 100):
+            dt[f"r{i}", "m0"] = i
+        self.assertEqual(dt.table_size, 389)
+        # Growing the top-level table moved r0's internal table as it was.
+        self.assertIs(dt.array[dt._outer_find("r0", False)][1], sub_table)
+        self.assertEqual(CountingTable.hashed - hashed, 99)
+        self.assertEqual(len(dt), 100)
+        for j in range(10):
+            self.assertEqual(dt["r0", f"m{j}"], j)
+
+    @number("3.14")
+    def test_key_codecs(self):
+        dt = DoubleKeyTable(key1_codec=INT_CODEC)
+        for i in range(50):
+            dt[i % 7, f"m{i}"] = i
+        self.assertEqual(sorted(dt.keys()), list(range(7)))
+        self.assertEqual(dt[3, "m10"], 10)
+        self.assertIn((3, "m10"), dt)
+        # Keys are encoded on the way in, so equal values find the same entry.
+        self.assertEqual(dt["3", "m10"], 10)
+        self.assertEqual(INT_CODEC.hash_key(3), dt.hash_key(3))
+        self.assertNotEqual(INT_CODEC.hash_key(3), STR_CODEC.hash_key("3"))
+
+        pair = TupleCodec(INT_CODEC, STR_CODEC)
+        self.assertEqual(pair.encode(["1", 2]), (1, "2"))
+        self.assertRaises(ValueError, lambda: pair.encode((1, 2, 3)))
+        dt = DoubleKeyTable.from_items(
+            [(((lvl, "hill"), "x"), lvl) for lvl in range(20)],
+            key1_codec=pair, key2_codec=STR_CODEC,
+        )
+        self.assertEqual(len(dt), 20)
+        self.assertEqual(dt[(5, "hill"), "x"], 5)
+        self.assertIn((19, "hill"), dt.keys())
+
+    @number("3.15")
+    def test_views(self):
+        dt = DoubleKeyTable()
+        dt["Tim", "Jen"] = 1
+        dt["May", "Ben"] = 2
+        keys = dt.keys()
+        inner = dt.values("Tim")
+        self.assertIsInstance(keys, TableView)
+        self.assertEqual(len(keys), 2)
+        self.assertIn("May", keys)
+        self.assertNotIn("Kat", keys)
+        # Views are live, not copies.
+        dt["Kat", "Tom"] = 3
+        dt["Tim", "Ivy"] = 4
+        self.assertEqual(len(keys), 3)
+        self.assertEqual(set(inner), {1, 4})
+        self.assertEqual(len(dt.items()), 4)
+        self.assertIn("Ivy", dt.keys("Tim"))
+        self.assertEqual(sorted(dt.values()), [1, 2, 3, 4])
+
+        self.assertEqual(dt.inner_count("Tim"), 2)
+        self.assertEqual(dt.inner_count("Kat"), 1)
+        self.assertEqual(dt.inner_count("Ann"), 0)
+
+    @number("3.16")
+    def test_flat_backend(self):
+        for table_type in (DoubleKeyTable, FlatDoubleKeyTable):
+            dt = table_type()
+            for i in range(300):
+                dt[f"r{i % 100}", f"m{i}"] = i
+            dt["r0", "m0"] = "updated"
+            self.assertEqual(len(dt), 100, table_type)
+            self.assertEqual(dt["r0", "m0"], "updated", table_type)
+            self.assertEqual(dt["r99", "m299"], 299, table_type)
+            self.assertEqual(set(dt.keys("r5")), {"m5", "m105", "m205"}, table_type)
+            self.assertEqual(set(dt.values("r5")), {5, 105, 205}, table_type)
+            self.assertEqual(set(dt.items("r5")), {("m5", 5), ("m105", 105), ("m205", 205)}, table_type)
+            self.assertEqual(dt.inner_count("r5"), 3, table_type)
+            self.assertEqual(len(dt.items()), 300, table_type)
+            self.assertIn(("r7", "m207"), dt)
+            self.assertNotIn(("r7", "m208"), dt)
+            self.assertEqual(dt.setdefault(("r7", "m207"), -1), 207, table_type)
+            self.assertRaises(KeyError, lambda: dt["r7", "m208"])
+            self.assertEqual(dt.get(("r7", "m208"), -1), -1, table_type)
+
+            # Views of a top-level key stay live when its last pair is replaced.
+            dt["a", "x"] = 1
+            views = (dt.keys("a"), dt.values("a"), dt.items("a"))
+            del dt["a", "x"]
+            dt["a", "y"] = 2
+            self.assertEqual([list(view) for view in views], [["y"], [2], [("y", 2)]], table_type)
+            self.assertEqual([len(view) for view in views], [1, 1, 1], table_type)
+            self.assertIn("y", views[0])
+            del dt["a", "y"]
+            self.assertEqual([list(view) for view in views], [[], [], []], table_type)
+
+        flat =FlatDoubleKeyTable.from_items(((f"r{i // 2}", f"m{i}"), i) for i in range(40))
+        self.assertEqual(len(flat), 20)
+        self.assertEqual(flat.pop(("r3", "m6")), 6)
+        self.assertEqual(list(flat.keys("r3")), ["m7"])
+        del flat["r3", "m7"]
+        # Removing a top-level key's last pair removes the key.
+        self.assertEqual(len(flat), 19)
+        self.assertNotIn("r3", flat.keys())
+        self.assertEqual(flat.inner_count("r3"), 0)
+        self.assertEqual(flat.pop(("r3", "m7"), None), None)
+
+    @number("3.17")
+    def test_delete_outer_keys(self):
+        for probing in LinearProbeTable.PROBING_STRATEGIES:
+            for tombstones in (False, True):
+                if probing == "robin_hood" and tombstones:
+                    continue
+                dt = DoubleKeyTable(tombstones=tombstones, probing=probing)
+                for i in range(400):
+                    dt[f"r{i}", "m0"] = i
+                    dt[f"r{i}", "m1"] = i
+                self.assertEqual(dt.table_size, 1543)
+                # Deleting every other top-level key must leave the rest of
+                # their clusters reachable.
+                for i in range(0, 400, 2):
+                    del dt[f"r{i}", "m0"]
+                    self.assertEqual(len(dt), 400 - i // 2, (probing, tombstones))
+                    del dt[f"r{i}", "m1"]
+                self.assertEqual(len(dt), 200)
+                for i in range(400):
+                    self.assertEqual((f"r{i}", "m1") in dt, i % 2 == 1, (probing, tombstones, i))
+                    self.assertEqual(f"r{i}" in dt.keys(), i % 2 == 1, (probing, tombstones, i))
+                # Emptied internal tables are gone.
+                self.assertEqual(len(list(dt.iter_keys())), 200)
+                # Not yet sparse enough to shrink.
+                self.assertEqual(dt.table_size, 1543)
+                for i in range(1, 350, 2):
+                    del dt[f"r{i}", "m0"]
+                    del dt[f"r{i}", "m1"]
+                self.assertEqual(len(dt), 25)
+                self.assertEqual(dt.table_size, 193)
+                self.assertEqual(set(dt.values()), set(range(351, 400, 2)))
+                for i in range(351, 400, 2):
+                    del dt[f"r{i}", "m0"]
+                    del dt[f"r{i}", "m1"]
+                self.assertEqual(len(dt), 0)
+                self.assertEqual(dt.table_size, 5)
+                dt["r0", "m0"] = 0
+                self.assertEqual(dt["r0", "m0"], 0)
+
+        # Internal tables shrink too.
+        dt = DoubleKeyTable()
+        for j in range(200):
+            dt["r0", f"m{j}"] = j
+        sub_table = dt.array[dt._outer_find("r0", False)][1]
+        self.assertEqual(sub_table.table_size, 769)
+        for j in range(190):
+            del dt["r0", f"m{j}"]
+        self.assertEqual(sub_table.table_size, 53)
+        self.assertEqual(set(dt.values("r0")), set(range(190, 200)))
+
+    @number("3.18")
+    def test_batches(self):
+        for table_type in (DoubleKeyTable, FlatDoubleKeyTable):
+            dt = table_type()
+            dt["r0", "m0"] = "old"
+            dt.set_many(((f"r{i % 10}", f"m{i}"), i) for i in range(500))
+            self.assertEqual(len(dt), 10, table_type)
+            self.assertEqual(len(dt.items()), 500, table_type)
+            self.assertEqual(dt["r0", "m0"], 0, table_type)
+            self.assertEqual(dt.get_many([("r3", "m13"), ("r4", "m13"), ("r9", "m499"), ("x", "y")], -1), [13, -1, 499, -1])
+
+            self.assertEqual(dt.delete_many([("r3", "m13"), ("r4", "m13")] + [("r5", f"m{i}") for i in range(5, 500, 10)]), 51)
+            self.assertEqual(len(dt), 9, table_type)
+            self.assertNotIn(("r3", "m13"), dt)
+            self.assertEqual(dt.inner_count("r3"), 49)
+            self.assertEqual(dt.inner_count("r5"), 0)
+
+        # Growing happens once, up front.
+        dt = DoubleKeyTable()
+        with dt.collect_stats() as stats:
+            dt.set_many(((f"r{i}", "m0"), i) for i in range(100))
+        self.assertEqual(stats.rehashes, 1)
+        self.assertEqual(dt.table_size, 389)
+        self.assertEqual(dt.get_many((f"r{i}", "m0") for i in range(100)), list(range(100)))
+
+    @number("3.19")
+    def test_snapshot(self):
+        dt = DoubleKeyTable(tombstones=True, incremental=True)
+        for i in range(20):
+            for j in range(40):
+                dt[f"r{i}", f"m{j}"] = (i, j)
+        snapshot = dt.snapshot()
+        before = sorted(snapshot.items())
+
+        dt["r0", "m0"] = "changed"
+        dt["r0", "m99"] = "added"
+        dt["r99", "m0"] = "added"
+        del dt["r1", "m0"]
+        for j in range(40):
+            del dt["r2", f"m{j}"]
+        dt.set_many(((f"s{i}", "m0"), i) for i in range(100))
+        # Only the internal tables written to were copied.
+        self.assertIs(dt.array[dt._outer_find("r3", False)][1], snapshot.array[snapshot._outer_find("r3", False)][1])
+        self.assertIsNot(dt.array[dt._outer_find("r0", False)][1], snapshot.array[snapshot._outer_find("r0", False)][1])
+
+        self.assertEqual(sorted(snapshot.items()), before)
+        self.assertEqual(len(snapshot), 20)
+        self.assertEqual(snapshot["r0", "m0"], (0, 0))
+        self.assertNotIn(("r0", "m99"), snapshot)
+        self.assertIn(("r1", "m0"), snapshot)
+        self.assertEqual(snapshot.inner_count("r2"), 40)
+        self.assertEqual(dt["r0", "m0"], "changed")
+        self.assertEqual(dt.inner_count("r2"), 0)
+        self.assertEqual(len(dt), 120)
+        self.assertRaises(TypeError, lambda: snapshot.__setitem__(("r0", "m0"), 1))
+        self.assertRaises(TypeError, lambda: snapshot.pop(("r0", "m0")))
+
+        # A second snapshot sees the first round of changes, and is unaffected by later ones.
+        second = dt.snapshot()
+        dt["r0", "m0"] = "again"
+        self.assertEqual(second["r0", "m0"], "changed")
+        self.assertEqual(snapshot["r0", "m0"], (0, 0))
+
+        class OverriddenDKT(DoubleKeyTable):
+            def hash2(self, k, sub_table):
+                return ord(k[-1]) % sub_table.table_size
+
+        dt = OverriddenDKT()
+        for j in range(10):
+            dt["r0", f"m{j}"] = j
+        snapshot = dt.snapshot()
+        for j in range(10, 100):
+            dt["r0", f"m{j}"] = j
+        self.assertEqual(set(dt.values("r0")), set(range(100)))
+        self.assertEqual(dt["r0", "m55"], 55)
+        self.assertEqual(set(snapshot.values("r0")), set(range(10)))
+        self.assertEqual(snapshot["r0", "m5"], 5)
+
+        # An override on a subclass hashes for whichever table it is called on,
+        # so the live table can grow past the snapshot's size.
+        class FirstLetterDKT(DoubleKeyTable):
+            def hash1(self, k):
+                return ord(k[0]) % self.table_size
+
+        dt = FirstLetterDKT()
+        dt["a", "x"] = 1
+        dt["b", "x"] = 2
+        snapshot = dt.snapshot()
+        for i in range(18):
+            dt[chr(ord("c") + i), "x"] = i
+        self.assertGreater(dt.table_size, snapshot.table_size)
+        self.assertEqual(snapshot["b", "x"], 2)
+        self.assertNotIn(("c", "x"), snapshot)
+        self.assertEqual(dt["b", "x"], 2)
+
+        # An override on the instance is usually a closure over the live table, so is refused.
+        dt = DoubleKeyTable()
+        dt.hash1 = lambda k: ord(k[0]) % dt.table_size
+        dt["a", "x"] = 1
+        self.assertRaises(TypeError, dt.snapshot)
+        lp = LinearProbeTable()
+        lp.hash = lambda k: ord(k[0]) % lp.table_size
+        self.assertRaises(TypeError, lp.snapshot)
+
+    @number("3.20")
+    def test_bloom_filter(self):
+        dt = DoubleKeyTable(bloom=True)
+        for i in range(20):
+            for j in range(10):
+                dt[f"r{i}", f"m{j}"] = (i, j)
+        # The filter was rebuilt larger as the table outgrew it.
+        self.assertGreaterEqual(dt.bloom.capacity, 200)
+        self.assertEqual(dt.bloom.count, 200)
+
+        with dt.collect_stats() as recorded:
+            for i in range(20):
+                for j in range(10, 60):
+                    self.assertIsNone(dt.get((f"r{i}", f"m{j}")))
+        # Most misses (possibly all) were rejected before probing either level.
+        self.assertLess(recorded.as_dict()["probes"].get("get", {"count": 0})["count"], 100)
+        stats = dt.stats()["bloom"]
+        self.assertEqual(stats["checks"], 1000)
+        self.assertEqual(stats["rejections"] + stats["false_positives"], 1000)
+        self.assertLess(stats["false_positive_rate"], 0.1)
+
+        # Deleting pairs leaves no false negatives for the rest.
+        for i in range(20):
+            for j in range(0, 10, 2):
+                del dt[f"r{i}", f"m{j}"]
+        dt.delete_many((f"r{i}", "m1") for i in range(10))
+        self.assertEqual(dt.bloom.count, dt._pair_count())
+        for i in range(20):
+            for j in range(10):
+                expected = j % 2 == 1 and not (j == 1 and i < 10)
+                self.assertEqual((f"r{i}", f"m{j}") in dt, expected)
+        self.assertEqual(dt.get_many([("r15", "m1"), ("r0", "m1"), ("x", "y")]), [(15, 1), None, None])
+        self.assertIsNone(dt.pop(("r0", "m0"), None))
+        self.assertRaises(KeyError, lambda: dt.pop(("x", "y")))
+
+        dt.set_many(((f"s{i}", "m0"), i) for i in range(100))
+        dt.setdefault(("s0", "m1"), 1)
+        self.assertEqual(dt.bloom.count, dt._pair_count())
+        for i in range(100):
+            self.assertIn((f"s{i}", "m0"), dt)
+
+        built = DoubleKeyTable.from_items((((f"r{i}", f"m{j}"), j) for i in range(30) for j in range(10)), bloom=True)
+        self.assertEqual(built.bloom.count, 300)
+        self.assertEqual(built["r29", "m9"], 9)
+        self.assertNotIn(("r29", "m10"), built)
+
+        # A snapshot keeps answering from the counters it was taken with.
+        snapshot = dt.snapshot()
+        del dt["s0", "m0"]
+        dt["new", "pair"] = 1
+        self.assertIn(("s0", "m0"), snapshot)
+        self.assertNotIn(("new", "pair"), snapshot)
+        self.assertNotIn(("s0", "m0"), dt)
+        self.assertIn(("new", "pair"), dt)
+        self.assertNotIn("bloom", DoubleKeyTable().stats())
+
+        # Every key sets hash_count different counters.
+        for capacity in (1, 10, 64, 100):
+            bloom = CountingBloomFilter(capacity)
+            for key in range(2000):
+                self.assertEqual(len(set(bloom._positions(key))), bloom.hash_count)
+
+    @number("3.21")
+    def test_rehash_reuses_outer_hashes(self):
+        class CountingDKT(DoubleKeyTable):
+            hashed = 0
+            def hash_key(self, key):
+                CountingDKT.hashed += 1
+                return super().hash_key(key)
+
+        for probing in ("linear", "double", "robin_hood"):
+            for incremental in (False, True):
+                dt = CountingDKT(probing=probing, incremental=incremental)
+                for i in range(100):
+                    dt[f"r{i}", "m"] = i
+                # Growing and deleting moves entries without hashing their keys again.
+                CountingDKT.hashed = 0
+                dt.reserve(400)
+                for i in range(0, 100, 2):
+                    del dt[f"r{i}", "m"]
+                self.assertEqual(CountingDKT.hashed, 50)
+                for i in range(1, 100, 2):
+                    self.assertEqual(dt[f"r{i}", "m"], i)
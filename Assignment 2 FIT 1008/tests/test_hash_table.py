@@ -0,0 +1,472 @@
+import unittest
+from ed_utils.decorators import number
+
+from data_structures.hash_table import LinearProbeTable, FullError
+from data_structures.dense_hash_table import DenseProbeTable
+from data_structures.cuckoo_hash_table import CuckooHashTable
+from data_structures.swiss_hash_table import SwissProbeTable
+from algorithms.primes import next_prime
+from double_key_table import DoubleKeyTable
+
+class TestLinearProbeTable(unittest.TestCase):
+
+    @number("8.1")
+    def test_rehash_reuses_hashes(self):
+        class CountingTable(LinearProbeTable):
+            hashed = 0
+            def hash_key(self, key):
+                CountingTable.hashed += 1
+                return super().hash_key(key)
+
+        lp = CountingTable()
+        keys = [f"default-{i:04}" for i in range(200)]
+        for key in keys:
+            lp[key] = key
+        # Grew through several sizes, but every key was only hashed once.
+        self.assertGreater(lp.size_index, 4)
+        self.assertEqual(CountingTable.hashed, len(keys))
+        for key in keys:
+            self.assertEqual(lp[key], key)
+        self.assertEqual(len(lp), len(keys))
+
+    @number("8.2")
+    def test_tombstones(self):
+        # Disable resizing / rehashing.
+        lp = LinearProbeTable(sizes=[13], tombstones=True)
+        lp.hash = lambda k: ord(k[0]) % 13
+        lp["Amy"] = 1
+        lp["Ann"] = 2
+        lp["Ava"] = 3
+        self.assertEqual(lp._linear_probe("Ava", False), 2)
+
+        del lp["Ann"]
+        # Nothing after the deleted item moves, but it can still be found.
+        self.assertEqual(lp._linear_probe("Ava", False), 2)
+        self.assertEqual(lp["Ava"], 3)
+        self.assertNotIn("Ann", lp)
+        self.assertEqual(len(lp), 2)
+        # Inserts reuse the tombstone.
+        lp["Abe"] = 4
+        self.assertEqual(lp._linear_probe("Abe", False), 1)
+        self.assertEqual(lp.tombstones, 0)
+
+        # Passing TOMBSTONE_LIMIT compacts the table in place.
+        del lp["Amy"]
+        del lp["Abe"]
+        del lp["Ava"]
+        self.assertEqual(lp.tombstones, 3)
+        lp["Eve"] = 5
+        del lp["Eve"]
+        self.assertEqual(lp.tombstones, 0)
+        self.assertEqual(lp.table_size, 13)
+        self.assertTrue(lp.is_empty())
+
+    @number("8.3")
+    def test_tombstone_churn(self):
+        lp = LinearProbeTable(tombstones=True)
+        for i in range(300):
+            lp[f"default-{i:04}"] = i
+        for i in range(0, 300, 2):
+            del lp[f"default-{i:04}"]
+        for i in range(300):
+            self.assertEqual(f"default-{i:04}" in lp, i % 2 == 1)
+        self.assertEqual(sorted(lp.values()), list(range(1, 300, 2)))
+        self.assertLessEqual(lp.tombstones, lp.table_size * lp.TOMBSTONE_LIMIT)
+
+    @number("8.4")
+    def test_probing_strategies(self):
+        keys = [f"default-{i:04}" for i in range(500)]
+        for probing in LinearProbeTable.PROBING_STRATEGIES:
+            lp = LinearProbeTable(probing=probing)
+            for i, key in enumerate(keys):
+                lp[key] = i
+            for i, key in enumerate(keys):
+                self.assertEqual(lp[key], i, probing)
+            for key in keys[::3]:
+                del lp[key]
+            for i, key in enumerate(keys):
+                self.assertEqual(key in lp, i % 3 != 0, probing)
+            lp[keys[0]] = -1
+            self.assertEqual(lp[keys[0]], -1, probing)
+            self.assertEqual(len(lp), len(set(lp.keys())))
+            self.assertEqual(len(lp), 500 - len(keys[::3]) + 1)
+            self.assertGreaterEqual(min(lp.probe_length(key) for key in lp.keys()), 1)
+
+        self.assertRaises(ValueError, lambda: LinearProbeTable(probing="cuckoo"))
+        self.assertRaises(ValueError, lambda: LinearProbeTable(tombstones=True, probing="robin_hood"))
+
+    @number("8.5")
+    def test_robin_hood(self):
+        # Disable resizing / rehashing.
+        lp = LinearProbeTable(sizes=[13], probing="robin_hood")
+        lp.hash = lambda k: ord(k[0]) % 13
+        lp["Amy"] = 1
+        lp["Ann"] = 2
+        lp["Bob"] = 3
+        self.assertEqual(lp._linear_probe("Bob", False), 2)
+        # Ava is further from home than Bob, so takes his slot.
+        lp["Ava"] = 4
+        self.assertEqual(lp._linear_probe("Ava", False), 2)
+        self.assertEqual(lp._linear_probe("Bob", False), 3)
+        self.assertEqual(lp.probe_length("Bob"), 3)
+        # Missing keys stop as soon as they would have displaced something.
+        self.assertEqual(lp.probe_length("Abe"), 4)
+
+        del lp["Amy"]
+        # The rest of the cluster shifts back.
+        self.assertEqual(lp._linear_probe("Ann", False), 0)
+        self.assertEqual(lp._linear_probe("Ava", False), 1)
+        self.assertEqual(lp._linear_probe("Bob", False), 2)
+
+    @number("8.6")
+    def test_from_items(self):
+        class CountingTable(LinearProbeTable):
+            rehashes = 0
+            def _rehash(self):
+                CountingTable.rehashes += 1
+                super()._rehash()
+
+        items = [(f"default-{i:04}", i) for i in range(1000)]
+        lp = CountingTable.from_items(items + [("default-0000", -1)])
+        self.assertEqual(CountingTable.rehashes, 0)
+        self.assertEqual(lp.table_size, 3079)
+        self.assertEqual(len(lp), 1000)
+        self.assertEqual(lp["default-0000"], -1)
+        self.assertEqual(lp["default-0999"], 999)
+
+    @number("8.7")
+    def test_incremental_rehash(self):
+        for probing in LinearProbeTable.PROBING_STRATEGIES:
+            lp = LinearProbeTable(probing=probing, incremental=True)
+            seen_migration = False
+            for i in range(2000):
+                lp[f"default-{i:04}"] = i
+                if lp.old_array is not None:
+                    seen_migration = True
+                    # Both arrays are consulted until migration finishes.
+                    self.assertEqual(lp[f"default-{i // 2:04}"], i // 2)
+                    if i % 5 == 0:
+                        del lp[f"default-{i // 3:04}"]
+                        self.assertNotIn(f"default-{i // 3:04}", lp)
+                        lp[f"default-{i // 3:04}"] = i // 3
+            self.assertTrue(seen_migration, probing)
+            self.assertEqual(len(lp), 2000, probing)
+            self.assertEqual(sorted(lp.values()), list(range(2000)), probing)
+            for i in range(2000):
+                self.assertEqual(lp[f"default-{i:04}"], i, probing)
+            self.assertIsNone(lp.old_array)
+
+    @number("8.8")
+    def test_incremental_bounded_work(self):
+        lp = LinearProbeTable(incremental=True)
+        for i in range(96):
+            lp[f"k{i}"] = i
+        self.assertIsNone(lp.old_array)
+        # Crossing the load factor only allocates the new array.
+        lp["k96"] = 96
+        self.assertEqual(lp.table_size, 389)
+        self.assertEqual(len(lp.old_array), 193)
+        self.assertEqual(lp.migrated, 0)
+        lp["k97"] = 97
+        self.assertEqual(lp.migrated, lp.MIGRATE_STEP)
+        self.assertEqual(set(lp.keys()), {f"k{i}" for i in range(98)})
+
+    @number("8.9")
+    def test_dense_layout(self):
+        for probing in ["linear", "quadratic", "double"]:
+            dp = DenseProbeTable(probing=probing)
+            keys = [f"default-{i:04}" for i in range(500)]
+            for i, key in enumerate(keys):
+                dp[key] = i
+            # Iteration follows insertion order, and only visits entries.
+            self.assertEqual(dp.keys(), keys)
+            self.assertEqual(dp.values(), list(range(500)))
+            for key in keys[::2]:
+                del dp[key]
+            dp[keys[0]] = -1
+            self.assertEqual(dp.keys(), keys[1::2] + [keys[0]], probing)
+            self.assertEqual(dp[keys[0]], -1)
+            self.assertNotIn(keys[2], dp)
+            self.assertEqual(len(dp), 251)
+            self.assertLessEqual(dp.used, len(dp.entry_keys))
+
+        dp = DenseProbeTable(sizes=[13])
+        dp.hash = lambda k: ord(k[0]) % 13
+        dp["Amy"] = 1
+        dp["Ann"] = 2
+        self.assertEqual(dp._linear_probe("Ann", False), 1)
+        self.assertEqual(dp.index[1], 1)
+        self.assertRaises(ValueError, lambda: DenseProbeTable(probing="robin_hood"))
+
+        # A table that can't grow fills its whole index, like LinearProbeTable.
+        dp = DenseProbeTable(sizes=[5])
+        for i in range(5):
+            dp[f"k{i}"] = i
+        self.assertRaises(FullError, lambda: dp.__setitem__("k5", 5))
+        del dp["k0"]
+        dp["k5"] = 5
+        self.assertEqual(dp.keys(), ["k1", "k2", "k3", "k4", "k5"])
+        dt = DoubleKeyTable(sizes=[5], internal_sizes=[5], internal_table=DenseProbeTable)
+        for i in range(5):
+            dt["a", f"m{i}"] = i
+        self.assertEqual(list(dt.values("a")), list(range(5)))
+
+        # Reports the same fields as LinearProbeTable, and a few of its own.
+        self.assertLessEqual(set(LinearProbeTable().stats()), set(dp.stats()))
+        self.assertFalse(dp.stats()["migrating"])
+
+    @number("8.10")
+    def test_unbounded_growth(self):
+        class SmallTable(LinearProbeTable):
+            TABLE_SIZES = [5, 13]
+
+        lp = SmallTable()
+        for i in range(100):
+            lp[f"default-{i:04}"] = i
+        # Grew past the end of TABLE_SIZES through generated primes.
+        self.assertEqual(lp.TABLE_SIZES[:4], [5, 13, 29, 59])
+        self.assertEqual(SmallTable.TABLE_SIZES, [5, 13])
+        self.assertLessEqual(len(lp), lp.table_size / 2)
+        for i in range(100):
+            self.assertEqual(lp[f"default-{i:04}"], i)
+        self.assertEqual(SmallTable.from_items((str(i), i) for i in range(100)).table_size, 257)
+
+        # Explicit sizes are still a hard limit.
+        lp = LinearProbeTable(sizes=[5, 13])
+        for i in range(13):
+            lp[str(i)] = i
+        self.assertEqual(lp.table_size, 13)
+        self.assertEqual(next_prime(1572869 * 2 + 1), 3145739)
+        self.assertEqual([next_prime(n) for n in range(8)], [2, 2, 2, 3, 5, 5, 7, 7])
+
+    @number("8.11")
+    def test_stats(self):
+        lp = LinearProbeTable(sizes=[13], tombstones=True)
+        lp.hash = lambda k: ord(k[0]) % 13
+        lp["Amy"] = 1
+        lp["Ann"] = 2
+        self.assertFalse(lp.stats()["enabled"])
+        self.assertNotIn("probes", lp.stats())
+
+        with lp.collect_stats() as recorded:
+            lp["Ava"] = 3
+            lp["Ava"]
+            self.assertRaises(KeyError, lambda: lp["Abe"])
+            del lp["Ann"]
+            self.assertTrue(lp.stats()["enabled"])
+        # Collection stops with the block.
+        lp["Bob"] = 4
+        self.assertIsNone(lp.recorder)
+
+        probes = recorded.as_dict()["probes"]
+        self.assertEqual(probes["set"]["histogram"], {3: 1})
+        self.assertEqual(probes["get"]["histogram"], {3: 1, 4: 1})
+        self.assertEqual(probes["get"]["mean"], 3.5)
+        self.assertEqual(probes["delete"]["max"], 2)
+        stats = lp.stats()
+        self.assertEqual(stats["load_factor"], 3 / 13)
+        self.assertEqual(stats["tombstones"], 0)
+        self.assertEqual(stats["longest_cluster"], 3)
+
+        lp = LinearProbeTable()
+        recorder = lp.enable_stats()
+        for i in range(100):
+            lp[f"default-{i:04}"] = i
+        self.assertEqual(recorder.rehashes, 6)
+        self.assertEqual(recorder.hashes, 100)
+        self.assertGreater(lp.stats()["rehash_time"], 0)
+        lp.disable_stats()
+        self.assertFalse(lp.stats()["enabled"])
+
+    @number("8.12")
+    def test_dict_methods(self):
+        for table in [LinearProbeTable(), LinearProbeTable(tombstones=True, incremental=True), DenseProbeTable()]:
+            table.update([("Amy", 1), ("Ann", 2)])
+            self.assertEqual(table.get("Amy"), 1)
+            self.assertIsNone(table.get("Bob"))
+            self.assertEqual(table.get("Bob", 0), 0)
+            self.assertEqual(table.setdefault("Amy", 5), 1)
+            self.assertEqual(table.setdefault("Bob", []), [])
+            table.setdefault("Bob", []).append(3)
+            self.assertEqual(table["Bob"], [3])
+            self.assertEqual(table.pop("Ann"), 2)
+            self.assertNotIn("Ann", table)
+            self.assertEqual(table.pop("Ann", None), None)
+            self.assertRaises(KeyError, lambda: table.pop("Ann"))
+            self.assertEqual(sorted(table.items()), [("Amy", 1), ("Bob", [3])])
+
+            copy = LinearProbeTable()
+            copy.update(table)
+            self.assertEqual(sorted(copy.items()), sorted(table.items()))
+            for i in range(200):
+                table.setdefault(f"default-{i:04}", i)
+            for i in range(0, 200, 2):
+                self.assertEqual(table.pop(f"default-{i:04}"), i)
+            self.assertEqual(len(table), 102)
+            self.assertEqual(sorted(value for key, value in table.items() if key.startswith("default")), list(range(1, 200, 2)))
+
+        # Membership never goes through the raising _probe.
+        lp = LinearProbeTable()
+        lp["Amy"] = 1
+        lp._probe = None
+        self.assertIn("Amy", lp)
+        self.assertNotIn("Bob", lp)
+
+    @number("8.13")
+    def test_cuckoo(self):
+        ch = CuckooHashTable()
+        keys = [f"default-{i:04}" for i in range(2000)]
+        for i, key in enumerate(keys):
+            ch[key] = i
+        for i, key in enumerate(keys):
+            self.assertEqual(ch[key], i)
+        # Every lookup, hit or miss, inspects a bounded number of slots.
+        self.assertLessEqual(max(ch.probe_length(key) for key in keys), 2 + ch.STASH_SIZE)
+        self.assertLessEqual(ch.probe_length("missing"), 2 + ch.STASH_SIZE)
+        for key in keys[::2]:
+            del ch[key]
+        self.assertEqual(len(ch), 1000)
+        self.assertEqual(sorted(ch.values()), list(range(1, 2000, 2)))
+        self.assertNotIn(keys[0], ch)
+        self.assertEqual(ch.setdefault(keys[0], -1), -1)
+        self.assertEqual(ch.pop(keys[1]), 1)
+
+        # Two full slots evict their occupant to its other slot.
+        ch = CuckooHashTable(sizes=[13])
+        homes = {"Amy": (0, 1), "Ann": (1, 2), "Ava": (0, 1)}
+        ch._homes = lambda key, key_hash, size: homes[key]
+        ch["Amy"] = 1
+        ch["Ann"] = 2
+        self.assertEqual(ch._linear_probe("Amy", False), 0)
+        self.assertEqual(ch._linear_probe("Ann", False), 1)
+        ch["Ava"] = 3
+        self.assertEqual(ch._linear_probe("Ava", False), 0)
+        self.assertEqual(ch._linear_probe("Amy", False), 1)
+        self.assertEqual(ch._linear_probe("Ann", False), 2)
+        self.assertEqual(sorted(ch.items()), [("Amy", 1), ("Ann", 2), ("Ava", 3)])
+
+        # Entries that can't be placed fall back on the stash.
+        ch = CuckooHashTable(sizes=[13])
+        ch._homes = lambda key, key_hash, size: (0, 1)
+        for i in range(6):
+            ch[str(i)] = i
+        self.assertEqual(ch.stats()["stash"], 4)
+        self.assertEqual(sorted(ch.values()), list(range(6)))
+        self.assertRaises(ValueError, lambda: CuckooHashTable(incremental=True))
+
+        # Once the stash is full too, a table that can't grow is full,
+        # whether or not it grew first, and is left as it was.
+        for sizes in ([13], [13, 17]):
+            ch = CuckooHashTable(sizes=sizes)
+            ch._homes = lambda key, key_hash, size: (0, 1)
+            for i in range(6):
+                ch[str(i)] = i
+            with self.assertRaises(FullError):
+                ch["6"] = 6
+            self.assertEqual(len(ch), 6)
+            self.assertEqual(len(ch.stash), ch.STASH_SIZE)
+            self.assertEqual(sorted(ch.items()), [(str(i), i) for i in range(6)])
+            self.assertNotIn("6", ch)
+            ch["0"] = "updated"
+            self.assertEqual(ch["0"], "updated")
+
+    @number("8.14")
+    def test_swiss(self):
+        sp = SwissProbeTable()
+        keys = [f"default-{i:04}" for i in range(2500)]
+        highest_load = 0
+        for i, key in enumerate(keys):
+            sp[key] = i
+            highest_load = max(highest_load, len(sp) / sp.table_size)
+        self.assertGreater(highest_load, 0.85)
+        # Half the slots of a LinearProbeTable holding the same keys.
+        self.assertEqual(sp.table_size, 3079)
+        self.assertEqual(LinearProbeTable.from_items((key, None) for key in keys).table_size, 6151)
+        for i, key in enumerate(keys):
+            self.assertEqual(sp[key], i)
+        # Most lookups only scan their first group.
+        groups = [sp.probe_length(key) for key in keys]
+        self.assertLess(sum(groups) / len(groups), 1.5)
+
+        for key in keys[::2]:
+            del sp[key]
+        for i, key in enumerate(keys):
+            self.assertEqual(key in sp, i % 2 == 1)
+        for key in keys[::2]:
+            sp[key] = -1
+        self.assertEqual(len(sp), 2500)
+        self.assertEqual(sorted(sp.values())[1250:], list(range(1, 2500, 2)))
+        self.assertLessEqual(len(sp) + sp.tombstones, sp.table_size * sp.MAX_LOAD + 1)
+
+        # Tags only let through keys with the same low hash bits.
+        sp = SwissProbeTable(sizes=[13])
+        sp.hash = lambda k: ord(k[0]) % 13
+        sp["Amy"] = 1
+        sp["Ann"] = 2
+        sp["Bob"] = 3
+        self.assertEqual(sp._linear_probe("Amy", False), 0)
+        self.assertEqual(sp._linear_probe("Ann", False), 1)
+        self.assertEqual(sp.ctrl[1], 0)
+        self.assertEqual(sp.ctrl[13 + 1], 0)
+        del sp["Amy"]
+        self.assertEqual(sp["Ann"], 2)
+        sp["Ava"] = 4
+        self.assertEqual(sp._linear_probe("Ava", False), 0)
+        self.assertEqual(sorted(sp.items()), [("Ann", 2), ("Ava", 4), ("Bob", 3)])
+
+    @number("8.15")
+    def test_shrink(self):
+        for table_type in (LinearProbeTable, DenseProbeTable, CuckooHashTable, SwissProbeTable):
+            table = table_type()
+            for i in range(1000):
+                table[f"k{i}"] = i
+            size = table.table_size
+            self.assertFalse(table.shrink())
+            for i in range(990):
+                del table[f"k{i}"]
+            self.assertEqual(table.table_size, size, table_type)
+            self.assertTrue(table.shrink(), table_type)
+            self.assertLess(table.table_size, size / 16, table_type)
+            self.assertFalse(table.shrink())
+            self.assertEqual(sorted(table.values()), list(range(990, 1000)), table_type)
+
+    @number("8.16")
+    def test_snapshot(self):
+        for table_type in (LinearProbeTable, DenseProbeTable, CuckooHashTable, SwissProbeTable):
+            table = table_type()
+            for i in range(100):
+                table[f"k{i}"] = i
+            snapshot = table.snapshot()
+            if table_type is LinearProbeTable:
+                # The snapshot shares the table's array until the table is written to.
+                self.assertIs(snapshot.array, table.array)
+            for i in range(100, 300):
+                table[f"k{i}"] = i
+            for i in range(50):
+                del table[f"k{i}"]
+            table["k60"] = "new"
+            self.assertEqual(len(snapshot), 100, table_type)
+            self.assertEqual(sorted(snapshot.values()), list(range(100)), table_type)
+            self.assertEqual(snapshot["k0"], 0)
+            self.assertEqual(snapshot["k60"], 60)
+            self.assertNotIn("k150", snapshot)
+            self.assertEqual(table["k60"], "new")
+            self.assertEqual(len(table), 250)
+            self.assertRaises(TypeError, lambda: snapshot.__setitem__("k0", 1))
+            self.assertRaises(TypeError, lambda: snapshot.pop("k0"))
+
+            copy = snapshot.copy()
+            copy["k0"] = "copy"
+            self.assertEqual(copy["k0"], "copy")
+            self.assertEqual(snapshot["k0"], 0)
+
+        # Snapshots of incremental tables finish the resize first.
+        table = LinearProbeTable(incremental=True)
+        for i in range(30):
+            table[f"k{i}"] = i
+        self.assertIsNotNone(table.old_array)
+        snapshot = table.snapshot()
+        self.assertIsNone(table.old_array)
+        for i in range(30, 200):
+            table[f"k{i}"] = i
+        self.assertEqual(sorted(snapshot.values()), list(range(30)))
@@ -1,7 +1,10 @@
+import threading
 import unittest
 from ed_utils.decorators import number
 
 from infinite_hash_table import InfiniteHashTable
+from data_structures.array_node import ArrayNode
+from data_structures.bitmap_node import BitmapNode
 
 class TestInfiniteHash(unittest.TestCase):
 
@@ -92,3 +95,278 @@ class TestInfiniteHash(unittest.TestCase):
             "mining"
         ]
         self.assertListEqual(res, expected)
+
+    @number("4.4")
+    def test_stats(self):
+        ih = InfiniteHashTable()
+        with ih.collect_stats() as recorded:
+            ih["lin"] = 1
+            ih["leg"] = 2
+            ih["mine"] = 3
+            ih["linked"] = 4
+            ih["linked"]
+            self.assertRaises(KeyError, lambda: ih["zoo"])
+        probes = recorded.as_dict()["probes"]
+        self.assertEqual(probes["set"]["histogram"], {1: 3, 2: 1})
+        self.assertEqual(probes["get"]["histogram"], {1: 1, 4: 1})
+        stats = ih.stats()
+        self.assertFalse(stats["enabled"])
+        self.assertEqual(stats["depths"], {1: 1, 2: 1, 4: 2})
+        self.assertEqual(stats["max_depth"], 4)
+        self.assertEqual(stats["nodes"], 4)
+        self.assertEqual(stats["load_factor"], 4 / (4 * 27))
+
+    @number("4.5")
+    def test_dict_methods(self):
+        ih = InfiniteHashTable()
+        ih.update([("lin", 1), ("leg", 2)])
+        self.assertEqual(ih.get("lin"), 1)
+        self.assertIsNone(ih.get("linked"))
+        self.assertEqual(ih.get("mine", 0), 0)
+        self.assertEqual(ih.setdefault("lin", 5), 1)
+        ih.setdefault("linked", []).append(3)
+        self.assertEqual(ih["linked"], [3])
+        self.assertEqual(ih.get_location("linked"), [4, 1, 6, 3])
+        self.assertIn("linked", ih)
+        self.assertNotIn("link", ih)
+        self.assertEqual(ih.pop("leg"), 2)
+        self.assertEqual(ih.pop("leg", None), None)
+        self.assertRaises(KeyError, lambda: ih.pop("leg"))
+        self.assertEqual(sorted(ih.items()), [("lin", 1), ("linked", [3])])
+        self.assertEqual(len(ih), 2)
+
+        copy = InfiniteHashTable()
+        copy.update(ih)
+        self.assertEqual(sorted(copy.items()), sorted(ih.items()))
+
+    @number("4.6")
+    def test_bloom_filter(self):
+        ih = InfiniteHashTable(bloom=True)
+        words = [f"{a}{b}{c}" for a in "lmn" for b in "aeiou" for c in "xyz"]
+        for i, word in enumerate(words):
+            ih[word] = i
+        ih.setdefault("linked", 0)
+        self.assertEqual(ih.bloom.count, len(words) + 1)
+
+        with ih.collect_stats() as recorded:
+            for word in words:
+                self.assertNotIn(word + "s", ih)
+                self.assertEqual(ih.get(word), words.index(word))
+        self.assertLess(recorded.as_dict()["probes"]["get"]["count"], 2 * len(words))
+        stats = ih.stats()["bloom"]
+        self.assertEqual(stats["rejections"] + stats["false_positives"], len(words))
+        self.assertLess(stats["false_positive_rate"], 0.1)
+
+        for word in words[::2]:
+            del ih[word]
+        self.assertEqual(ih.pop("linked"), 0)
+        for i, word in enumerate(words):
+            self.assertEqual(word in ih, i % 2 == 1)
+        self.assertEqual(ih.bloom.count, len(ih))
+        self.assertNotIn("bloom", InfiniteHashTable().stats())
+
+    @number("4.7")
+    def test_iter_sorted(self):
+        ih = InfiniteHashTable()
+        words = ["lin", "leg", "mine", "linked", "limp", "mining", "jake", "linger", "li", "l", "zebra", "a"]
+        for i, word in enumerate(words):
+            ih[word] = i
+        self.assertEqual(list(ih.iter_sorted()), sorted(words))
+        self.assertEqual(ih.sort_keys(), sorted(words))
+        self.assertEqual(list(ih.iter_sorted("lin")), ["lin", "linger", "linked"])
+        self.assertEqual(list(ih.iter_sorted("li")), ["li", "limp", "lin", "linger", "linked"])
+        self.assertEqual(list(ih.iter_sorted("j")), ["jake"])
+        self.assertEqual(list(ih.iter_sorted("ja")), ["jake"])
+        self.assertEqual(list(ih.iter_sorted("jo")), [])
+        self.assertEqual(list(ih.iter_sorted("q")), [])
+        self.assertEqual(list(ih.iter_sorted(start="lin")), ["lin", "linger", "linked", "mine", "mining", "zebra"])
+        self.assertEqual(list(ih.iter_sorted(start="linh")), ["linked", "mine", "mining", "zebra"])
+        self.assertEqual(list(ih.iter_sorted("li", start="lio")), [])
+        self.assertEqual(list(ih.iter_sorted("li", start="k")), ["li", "limp", "lin", "linger", "linked"])
+        self.assertEqual(list(ih.iter_sorted("li", start="m")), [])
+        self.assertEqual(list(ih.iter_sorted("l", start="lim", limit=3)), ["limp", "lin", "linger"])
+        self.assertEqual(list(ih.iter_sorted(limit=0)), [])
+
+        # start is compared in trie order, which differs from Python's for capitals.
+        for compressed in (False, True):
+            names = InfiniteHashTable(compressed=compressed)
+            for i, name in enumerate(["abc", "Zed", "mount", "Mount", "Mount Cook", "Ben Lomond"]):
+                names[name] = i
+            ordered = names.sort_keys()
+            for i, name in enumerate(ordered):
+                self.assertEqual(list(names.iter_sorted(start=name)), ordered[i:])
+            self.assertEqual(list(names.iter_sorted("Mount", start="Zed")), [])
+
+        # Keys are yielded as they are found.
+        keys = ih.iter_sorted("l")
+        self.assertEqual(next(keys), "l")
+        self.assertEqual(len(InfiniteHashTable().sort_keys()), 0)
+
+    @number("4.8")
+    def test_bitmap_nodes(self):
+        words = ["lin", "leg", "mine", "linked", "limp", "mining", "jake", "linger", "li", "zebra"]
+        ih = InfiniteHashTable()
+        bitmap = InfiniteHashTable(bitmap=True)
+        for i, word in enumerate(words):
+            ih[word] = i
+            bitmap[word] = i
+        for i, word in enumerate(words):
+            self.assertEqual(bitmap.get_location(word), ih.get_location(word))
+            self.assertEqual(bitmap[word], i)
+        self.assertEqual(bitmap.sort_keys(), ih.sort_keys())
+        self.assertEqual(list(bitmap.iter_sorted("lin")), ["lin", "linger", "linked"])
+        self.assertNotIn("lint", bitmap)
+
+        # Each level only has slots for what is stored in it.
+        stats = bitmap.stats()
+        self.assertEqual(stats["nodes"], ih.stats()["nodes"])
+        self.assertEqual(stats["depths"], ih.stats()["depths"])
+        self.assertLess(stats["slots"], 2 * len(words))
+        self.assertEqual(ih.stats()["slots"], stats["nodes"] * 27)
+        self.assertIsInstance(ih.array, ArrayNode)
+        self.assertIsInstance(bitmap.array, BitmapNode)
+        self.assertEqual(ih.array.entries, len(bitmap.array))
+
+        for word in ["linked", "mine", "lin"]:
+            del bitmap[word]
+            del ih[word]
+        self.assertEqual(bitmap.get_location("linger"), ih.get_location("linger"))
+        self.assertEqual(bitmap.get_location("mining"), ih.get_location("mining"))
+        self.assertEqual(sorted(bitmap.items()), sorted(ih.items()))
+        self.assertEqual(len(bitmap), 7)
+
+    @number("4.9")
+    def test_compressed(self):
+        for bitmap in (False, True):
+            ih = InfiniteHashTable(bitmap=bitmap, compressed=True)
+            names = [f"north-ridge-{i:04d}" for i in range(1, 200)]
+            for i, name in enumerate(names):
+                ih[name] = i
+            # One level per branch point: north-ridge-0, then the last three digits.
+            self.assertEqual(ih.get_location("north-ridge-0042"), [6, 22, 0, 24])
+            self.assertEqual(ih.stats()["max_depth"], 4)
+            self.assertEqual(ih.array[6].skip, "orth-ridge-0")
+            for i, name in enumerate(names):
+                self.assertEqual(ih[name], i)
+            self.assertNotIn("north-ridge-0200", ih)
+            self.assertNotIn("north-ridge", ih)
+            self.assertNotIn("north-rim-0042", ih)
+            self.assertEqual(ih.sort_keys(), names)
+            self.assertEqual(list(ih.iter_sorted("north-ridge-01", start="north-ridge-0150", limit=3)),
+                ["north-ridge-0150", "north-ridge-0151", "north-ridge-0152"])
+            self.assertEqual(list(ih.iter_sorted("north-r", start="north-s")), [])
+
+            # Inserting a key that leaves a compressed path splits it.
+            ih["north-rim"] = "rim"
+            ih["north"] = "north"
+            self.assertEqual(ih.get_location("north-rim"), [6, 19, 5])
+            self.assertEqual(ih.array[6].skip, "orth")
+            self.assertEqual(ih["north-ridge-0042"], 41)
+            self.assertEqual(ih.sort_keys(), ["north"] + names + ["north-rim"])
+
+            # Deleting a key merges a level left with one entry into its parent.
+            del ih["north-rim"]
+            self.assertEqual(ih.pop("north"), "north")
+            self.assertEqual(ih.get_location("north-ridge-0042"), [6, 22, 0, 24])
+            self.assertEqual(ih.array[6].skip, "orth-ridge-0")
+            for name in names[:-1]:
+                del ih[name]
+            self.assertEqual(ih.get_location(names[-1]), [6])
+            self.assertEqual(ih.items(), [(names[-1], 198)])
+
+    @number("4.10")
+    def test_concurrent_lookups(self):
+        for compressed in (False, True):
+            ih = InfiniteHashTable(compressed=compressed)
+            words = [f"{a}{b}{c}{d}" for a in "lm" for b in "aeiou" for c in "nrst" for d in "xyz"]
+            for i, word in enumerate(words):
+                ih[word] = i
+            state = dict(vars(ih))
+            self.assertEqual(ih["linx"], words.index("linx"))
+            self.assertIsNone(ih.get("linq"))
+            self.assertNotIn("lin", ih)
+            # Lookups leave nothing behind on the table.
+            self.assertEqual(vars(ih), state)
+
+            def look_up_all(results):
+                for _ in range(20):
+                    results.append(all(ih[word] == i and word + "s" not in ih for i, word in enumerate(words)))
+
+            results = []
+            threads = [threading.Thread(target=look_up_all, args=(results,)) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(results, [True] * 80)
+
+    @number("4.11")
+    def test_delete_many(self):
+        ih = InfiniteHashTable()
+        ih["a"] = 1
+        ih["b"] = 2
+        del ih["a"]
+        self.assertEqual(ih.items(), [("b", 2)])
+        self.assertEqual(ih.get_location("b"), [20])
+
+        words = ["lin", "leg", "mine", "linked", "limp", "mining", "jake", "linger", "li", "zebra"]
+        for bitmap in (False, True):
+            for compressed in (False, True):
+                ih = InfiniteHashTable(bitmap=bitmap, compressed=compressed)
+                for i, word in enumerate(words):
+                    ih[word] = i
+                self.assertEqual(ih.delete_many(["linked", "linger", "lin", "mining", "missing", "linked"]), 4)
+                self.assertEqual(len(ih), 6)
+                self.assertEqual(ih.sort_keys(), ["jake", "leg", "li", "limp", "mine", "zebra"])
+
+                # Collapsing leaves the same shape as inserting the remaining keys.
+                fresh = InfiniteHashTable(bitmap=bitmap, compressed=compressed)
+                for word in ih.sort_keys():
+                    fresh[word] = ih[word]
+                for word in fresh.sort_keys():
+                    self.assertEqual(ih.get_location(word), fresh.get_location(word))
+                self.assertEqual(ih.stats()["nodes"], fresh.stats()["nodes"])
+
+                self.assertEqual(ih.delete_many(ih.sort_keys()), 6)
+                self.assertEqual(ih.items(), [])
+                self.assertEqual(ih.stats()["nodes"], 1)
+
+    @number("4.12")
+    def test_from_sorted(self):
+        words = ["lin", "leg", "mine", "linked", "limp", "mining", "jake", "linger", "li", "zebra"]
+        for bitmap in (False, True):
+            for compressed in (False, True):
+                ih = InfiniteHashTable(bitmap=bitmap, compressed=compressed)
+                for i, word in enumerate(words):
+                    ih[word] = i
+                built = InfiniteHashTable.from_sorted(((key, ih[key]) for key in ih.sort_keys()), bitmap=bitmap, compressed=compressed)
+                self.assertEqual(len(built), len(words))
+                self.assertEqual(built.stats()["nodes"], ih.stats()["nodes"])
+                for i, word in enumerate(words):
+                    self.assertEqual(built.get_location(word), ih.get_location(word))
+                    self.assertEqual(built[word], i)
+                self.assertEqual(built.sort_keys(), ih.sort_keys())
+
+                # The built table can be changed like any other.
+                built["linen"] = 10
+                del built["lin"]
+                self.assertEqual(list(built.iter_sorted("lin")), ["linen", "linger", "linked"])
+
+        ih = InfiniteHashTable.from_sorted([("a", 1), ("b", 2), ("b", 3)], bloom=True)
+        self.assertEqual(sorted(ih.items()), [("a", 1), ("b", 3)])
+        self.assertNotIn("c", ih)
+        self.assertEqual(ih.stats()["bloom"]["count"], 2)
+        self.assertEqual(len(InfiniteHashTable.from_sorted([])), 0)
+        self.assertEqual(sorted(InfiniteHashTable.from_sorted([("b", 1), ("a", 2), ("b", 3)]).items()), [("a", 2), ("b", 3)])
+
+        # Capitalised names come out of sort_keys in trie order, not Python's.
+        for bitmap in (False, True):
+            for compressed in (False, True):
+                ih = InfiniteHashTable(bitmap=bitmap, compressed=compressed)
+                for i, name in enumerate(["abc", "Zed", "mount", "Mount", "Mount Cook", "Ben Lomond"]):
+                    ih[name] = i
+                built = InfiniteHashTable.from_sorted(((key, ih[key]) for key in ih.sort_keys()), bitmap=bitmap, compressed=compressed)
+                self.assertEqual(built.sort_keys(), ih.sort_keys())
+                self.assertEqual(sorted(built.items()), sorted(ih.items()))
+                for key in ih.sort_keys():
+                    self.assertEqual(built.get_location(key), ih.get_location(key))
@@ -56,3 +56,30 @@ class TestInfiniteHash(unittest.TestCase):
         self.assertEqual(len(res), 4)
 
         self.assertEqual(make_set(res[3]), make_set([m10]))
+
+    @number("5.2")
+    def test_from_mountains(self):
+        mountains = [Mountain(f"m{i}", i % 4, i) for i in range(40)]
+        mm = MountainManager.from_mountains(mountains)
+        res = mm.group_by_difficulty()
+        self.assertEqual(len(res), 4)
+        for diff in range(4):
+            self.assertEqual(set(id(x) for x in res[diff]), set(id(x) for x in mountains[diff::4]))
+        mm.edit_mountain(mountains[0], Mountain("m0", 3, 0))
+        self.assertEqual(len(mm.mountains_with_difficulty(0)), 9)
+        self.assertEqual(len(mm.mountains_with_difficulty(3)), 11)
+
+    @number("5.3")
+    def test_add_remove_mountains(self):
+        mountains = [Mountain(f"m{i}", i % 5, i) for i in range(100)]
+        mm = MountainManager()
+        mm.add_mountain(mountains[0])
+        mm.add_mountains(mountains)
+        res = mm.group_by_difficulty()
+        self.assertEqual(len(res), 5)
+        for diff in range(5):
+            self.assertEqual(set(id(x) for x in res[diff]), set(id(x) for x in mountains[diff::5]))
+        mm.remove_mountains(mountains[::5] + [Mountain("gone", 9, 1)])
+        self.assertEqual(len(mm.group_by_difficulty()), 4)
+        self.assertEqual(mm.mountains_with_difficulty(0), [])
+        self.assertEqual(len(mm.mountains_with_difficulty(1)), 20)